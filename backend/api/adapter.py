@@ -1,97 +1,49 @@
 """
 API路径适配器 - 提供兼容性路径
+
+兼容路径在进程内分发，不再回环调用本机HTTP端口:
+- 只差末尾斜杠的路径由 PathAliasMiddleware 在路由前改写，请求体原样流式传给目标路由
+- 登录路径的请求体格式不同（JSON而非表单），转换后直接调用 /api/auth/token 的处理函数
 """
 
-from fastapi import APIRouter, Depends, Request, Response
-from fastapi.responses import JSONResponse
-import httpx
+from fastapi import APIRouter, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from backend.api import auth
 
 router = APIRouter()
 
+# (方法, 兼容路径) -> 实际路径
+PATH_ALIASES = {
+    ("POST", "/api/upload"): "/api/upload/",
+    ("GET", "/api/personas"): "/api/personas/",
+    ("POST", "/api/personas"): "/api/personas/",
+}
+
+
+class PathAliasMiddleware:
+    """ASGI中间件: 在路由匹配前把兼容路径改写为实际路径"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            target = PATH_ALIASES.get((scope["method"], scope["path"]))
+            if target is not None:
+                scope = dict(scope, path=target, raw_path=target.encode())
+        await self.app(scope, receive, send)
+
+
 # 登录路径适配
 @router.post("/api/auth/login")
 async def login_adapter(request: Request):
-    """将/api/auth/login重定向到/api/auth/token"""
+    """接受JSON格式的/api/auth/login，转换为OAuth2表单后交给/api/auth/token处理"""
     body = await request.json()
-    
-    # 转换为OAuth2格式
-    form_data = {
-        "username": body.get("email", body.get("username", "")),
-        "password": body.get("password", ""),
-        "grant_type": "password"
-    }
-    
-    # 调用真实的token端点
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "http://localhost:8000/api/auth/token",
-            data=form_data,
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return JSONResponse(
-                status_code=response.status_code,
-                content=response.json()
-            )
-
-# 上传路径适配（处理末尾斜杠）
-@router.post("/api/upload")
-async def upload_adapter(request: Request):
-    """处理不带斜杠的上传路径"""
-    # 获取原始body
-    body = await request.body()
-    headers = dict(request.headers)
-    
-    # 转发到正确的路径
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "http://localhost:8000/api/upload/",
-            content=body,
-            headers=headers
-        )
-        
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=dict(response.headers)
-        )
 
-# 人格路径适配
-@router.get("/api/personas")
-async def personas_list_adapter(request: Request):
-    """处理人格列表路径"""
-    headers = dict(request.headers)
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "http://localhost:8000/api/personas/",
-            headers=headers
-        )
-        
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=dict(response.headers)
-        )
-
-@router.post("/api/personas")
-async def personas_create_adapter(request: Request):
-    """处理人格创建路径"""
-    body = await request.json()
-    headers = dict(request.headers)
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "http://localhost:8000/api/personas/",
-            json=body,
-            headers=headers
-        )
-        
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=dict(response.headers)
-        )
+    form_data = OAuth2PasswordRequestForm(
+        grant_type="password",
+        username=body.get("email", body.get("username", "")),
+        password=body.get("password", ""),
+    )
+    return await auth.login(form_data)
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import timedelta
 from backend.core.config import settings
+from backend.core.security import PasswordHashBusy
 from backend.schemas.user import UserCreate, UserResponse, Token
 from backend.services.auth import AuthService
 
@@ -19,7 +20,10 @@ async def register(
 ):
     """用户注册"""
     auth_service = AuthService()
-    user = await auth_service.create_user(user_data)
+    try:
+        user = await auth_service.create_user(user_data)
+    except PasswordHashBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -42,9 +46,12 @@ async def login(
 ):
     """用户登录"""
     auth_service = AuthService()
-    user = await auth_service.authenticate_user(
-        form_data.username, form_data.password
-    )
+    try:
+        user = await auth_service.authenticate_user(
+            form_data.username, form_data.password
+        )
+    except PasswordHashBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
     if not user:
         raise HTTPException(
@@ -3,11 +3,14 @@
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from beanie import PydanticObjectId
 from backend.core.deps import get_current_user
+from backend.core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, next_cursor
+from backend.models.chat_model import ChatMessage
 from backend.models.user import User
+from backend.schemas.chat import ChatDetail, ChatSummary, SendMessageResponse
 from backend.services.chat_service import ChatService
 
 router = APIRouter()
@@ -22,23 +25,33 @@ class SendMessageRequest(BaseModel):
     content: str
 
 
-@router.get("/")
+@router.get("/", response_model=List[ChatSummary])
 async def list_chats(
+    response: Response,
     current_user: User = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None
 ):
-    """获取用户的对话列表"""
+    """获取用户的对话列表，下一页游标在响应头 X-Next-Cursor 中"""
     chat_service = ChatService()
-    chats = await chat_service.get_user_chats(
-        user_id=str(current_user.id),
-        skip=skip,
-        limit=limit
-    )
+    try:
+        chats = await chat_service.get_user_chats(
+            user_id=str(current_user.id),
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    token = next_cursor(chats, limit, "updated_at")
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
     return chats
 
 
-@router.post("/")
+@router.post("/", response_model=ChatDetail)
 async def create_chat(
     data: CreateChatRequest,
     current_user: User = Depends(get_current_user)
@@ -53,7 +66,7 @@ async def create_chat(
     return chat
 
 
-@router.get("/{chat_id}")
+@router.get("/{chat_id}", response_model=ChatDetail)
 async def get_chat(
     chat_id: str,
     current_user: User = Depends(get_current_user)
@@ -72,7 +85,7 @@ async def get_chat(
     return chat
 
 
-@router.post("/{chat_id}/messages")
+@router.post("/{chat_id}/messages", response_model=SendMessageResponse)
 async def send_message(
     chat_id: str,
     data: SendMessageRequest,
@@ -97,7 +110,7 @@ async def send_message(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/{chat_id}/messages/{message_index}/regenerate")
+@router.post("/{chat_id}/messages/{message_index}/regenerate", response_model=ChatMessage)
 async def regenerate_message(
     chat_id: str,
     message_index: int,
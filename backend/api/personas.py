@@ -2,30 +2,53 @@
 人格管理API
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Optional
 from beanie import PydanticObjectId
 
 from backend.core.deps import get_current_user
+from backend.core.identity_map import load
+from backend.core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, after_cursor, next_cursor
 from backend.models.user import User
-from backend.models.persona import Persona
-from backend.models.message import Message
-from backend.models.chat_model import Chat
-from backend.schemas.persona import PersonaResponse, PersonaCreate
+from backend.models.persona import Persona, PersonaStatus
+from backend.models.backfill_checkpoint import BackfillCheckpoint
+from backend.models.persona_topics import PersonaTopics
+from backend.schemas.message import MessageSummary
+from backend.schemas.persona import PersonaCreate, PersonaResponse, PersonaSummary, PersonaUpdate
+from backend.services.embedding_backfill import EmbeddingBackfillJob
+from backend.services.message_service import MessageService
+from backend.services.persona_deletion import PersonaImporting, mark_for_deletion
+from backend.services.persona_stats import PersonaStatsService
+from backend.services.topic_clustering import TopicClusteringService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[PersonaResponse])
 async def list_personas(
+    response: Response,
     current_user: User = Depends(get_current_user),
     skip: int = 0,
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None
 ):
-    """获取用户的所有人格"""
-    personas = await Persona.find(
-        {"user_id": current_user.id}
-    ).skip(skip).limit(limit).to_list()
+    """获取用户的所有人格（最近创建的在前），下一页游标在响应头 X-Next-Cursor 中"""
+    try:
+        query = after_cursor(
+            {"user_id": current_user.id, "status": {"$ne": PersonaStatus.DELETING}}, "created_at", cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    find = Persona.find(query).sort("-created_at", "-_id").project(PersonaSummary)
+    if not cursor and skip:
+        find = find.skip(skip)
+    personas = await find.limit(limit).to_list()
+    
+    token = next_cursor(personas, limit, "created_at")
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
     return personas
 
 
@@ -54,9 +77,9 @@ async def get_persona(
     current_user: User = Depends(get_current_user)
 ):
     """获取单个人格详情"""
-    persona = await Persona.get(PydanticObjectId(persona_id))
+    persona = await load(Persona, persona_id)
     
-    if not persona:
+    if not persona or persona.status == PersonaStatus.DELETING:
         raise HTTPException(status_code=404, detail="人格不存在")
     
     # 验证权限
@@ -69,25 +92,26 @@ async def get_persona(
 @router.patch("/{persona_id}")
 async def update_persona(
     persona_id: str,
-    update_data: dict,
+    update_data: PersonaUpdate,
     current_user: User = Depends(get_current_user)
 ):
-    """更新人格信息"""
+    """更新人格信息（只更新名称、头像，其余字段由导入和删除任务维护）"""
+    # 读-改-写不走缓存
     persona = await Persona.get(PydanticObjectId(persona_id))
     
-    if not persona:
+    if not persona or persona.status == PersonaStatus.DELETING:
         raise HTTPException(status_code=404, detail="人格不存在")
     
     # 验证权限
     if persona.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="无权操作")
     
-    # 更新字段
-    for key, value in update_data.items():
-        if hasattr(persona, key):
-            setattr(persona, key, value)
-    
-    await persona.save()
+    # 只$set请求中给出的字段，不整体覆盖导入任务同时在更新的计数和状态
+    updates = update_data.model_dump(exclude_unset=True)
+    if updates.get("name") is None:
+        updates.pop("name", None)
+    if updates:
+        await persona.set({**updates, "updated_at": datetime.utcnow()})
     return persona
 
 
@@ -96,8 +120,8 @@ async def delete_persona(
     persona_id: str,
     current_user: User = Depends(get_current_user)
 ):
-    """删除人格"""
-    persona = await Persona.get(PydanticObjectId(persona_id))
+    """删除人格: 标记为删除中后立即返回，关联数据由后台任务分批删除"""
+    persona = await load(Persona, persona_id)
     
     if not persona:
         raise HTTPException(status_code=404, detail="人格不存在")
@@ -106,14 +130,206 @@ async def delete_persona(
     if persona.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="无权操作")
     
-    # 删除相关数据
-    # 删除消息
-    await Message.find({"persona_id": persona.id}).delete()
+    # 导入进行中的人格还会继续写入关联数据，等导入结束后再删除
+    try:
+        await mark_for_deletion(persona)
+    except PersonaImporting as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return {"message": "删除中", "status": PersonaStatus.DELETING}
+
+
+@router.get("/{persona_id}/deletion")
+async def get_deletion_progress(
+    persona_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """删除进度: 各集合已删除的文档数；人格已不存在表示删除完成"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona:
+        return {"status": "deleted", "progress": None}
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权访问")
+    
+    if persona.status != PersonaStatus.DELETING:
+        raise HTTPException(status_code=409, detail="人格未在删除中")
     
-    # 删除对话
-    await Chat.find({"persona_id": persona.id}).delete()
+    return {"status": PersonaStatus.DELETING, "progress": persona.deletion_progress}
+
+
+@router.get("/{persona_id}/stats")
+async def get_persona_stats(
+    persona_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """人格统计：发送者分布、活跃时间、时间范围、消息长度（服务端聚合）"""
+    persona = await load(Persona, persona_id)
     
-    # 删除人格
-    await persona.delete()
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
     
-    return {"message": "删除成功"}
\ No newline at end of file
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权访问")
+    
+    return await PersonaStatsService().get_stats(persona_id)
+
+
+@router.post("/{persona_id}/embeddings/backfill")
+async def start_embedding_backfill(
+    persona_id: str,
+    include_mock: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """后台补生成缺失的向量；include_mock为True时同时替换降级写入的模拟向量"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权操作")
+    
+    job = EmbeddingBackfillJob(persona_id=persona_id, include_mock=include_mock)
+    started = job.start()
+    
+    return {
+        "job_id": job.job_id,
+        "status": "started" if started else "running"
+    }
+
+
+@router.get("/{persona_id}/embeddings/backfill")
+async def get_embedding_backfill(
+    persona_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """查询向量回填进度（速率、预计剩余时间）"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权访问")
+    
+    return await BackfillCheckpoint.find(
+        {"persona_id": persona.id}
+    ).sort("-updated_at").to_list()
+
+
+@router.post("/{persona_id}/topics")
+async def start_topic_clustering(
+    persona_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """后台重新聚类人格话题"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权操作")
+    
+    TopicClusteringService().start(persona_id)
+    
+    return {"status": "started"}
+
+
+@router.get("/{persona_id}/topics")
+async def get_persona_topics(
+    persona_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """话题列表: 每个话题的代表词和成员数，按成员数降序"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权访问")
+    
+    # 不读取话题中心向量
+    topics = await PersonaTopics.get_motor_collection().find_one(
+        {"persona_id": persona.id},
+        {"labels": 1, "counts": 1, "fitted_at": 1}
+    )
+    if not topics:
+        return {"topics": [], "fitted_at": None}
+    
+    return {
+        "topics": sorted(
+            (
+                {"topic_id": i, "labels": labels, "count": count}
+                for i, (labels, count) in enumerate(zip(topics["labels"], topics["counts"]))
+            ),
+            key=lambda topic: -topic["count"]
+        ),
+        "fitted_at": topics["fitted_at"],
+    }
+
+
+@router.get("/{persona_id}/messages", response_model=List[MessageSummary])
+async def list_persona_messages(
+    persona_id: str,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """按时间倒序浏览聊天记录，用响应头 X-Next-Cursor 中的游标翻页"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权访问")
+    
+    limit = min(max(limit, 1), 500)
+    try:
+        messages = await MessageService().get_messages(
+            persona_id, limit=limit, cursor=cursor, projection_model=MessageSummary
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    token = next_cursor(messages, limit, "timestamp")
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return messages
+
+
+@router.get("/{persona_id}/messages/search", response_model=List[MessageSummary])
+async def search_persona_messages(
+    persona_id: str,
+    q: str,
+    limit: int = 20,
+    search_type: str = "text",
+    current_user: User = Depends(get_current_user)
+):
+    """搜索聊天记录: text为子串匹配（按时间倒序），hybrid为关键词加权的混合检索"""
+    persona = await load(Persona, persona_id)
+    
+    if not persona or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+    
+    # 验证权限
+    if persona.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="无权访问")
+    
+    messages = await MessageService().search_messages(
+        persona_id, q, limit=min(max(limit, 1), 100), search_type=search_type,
+        projection_model=MessageSummary
+    )
+    return [MessageSummary.model_validate(message) for message in messages]
@@ -2,26 +2,75 @@
 文件上传API - 简化版
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from pydantic import BaseModel
 import aiofiles
 import os
 from uuid import uuid4
 import asyncio
 
 from backend.core.deps import get_current_user
+from backend.core.identity_map import load
 from backend.models.user import User
+from backend.models.persona import Persona, PersonaStatus
 from backend.core.config import settings
 from backend.services.data_processor import DataProcessorService
+from backend.services.upload_session import (
+    ALLOWED_EXTENSIONS,
+    ChecksumMismatchError,
+    OffsetMismatchError,
+    UploadSessionService,
+)
 
 router = APIRouter()
 
 
+class InitUploadRequest(BaseModel):
+    filename: str
+    total_size: int
+    sha256: Optional[str] = None
+    persona_id: Optional[str] = None  # 追加导入到已有人格
+
+
+async def _verify_target_persona(persona_id: Optional[str], user: User):
+    """追加导入时校验目标人格存在且属于当前用户"""
+    if persona_id is None:
+        return
+    try:
+        persona = await load(Persona, persona_id)
+    except Exception:
+        persona = None
+    if not persona or persona.user_id != user.id or persona.status == PersonaStatus.DELETING:
+        raise HTTPException(status_code=404, detail="人格不存在")
+
+
+def _start_processing(
+    file_path: str,
+    user_id: str,
+    persona_id: Optional[str] = None
+) -> str:
+    """创建后台处理任务（使用asyncio而不是Celery）"""
+    task_id = str(uuid4())
+    processor = DataProcessorService()
+    asyncio.create_task(
+        processor.process_chat_data(
+            file_path=file_path,
+            user_id=user_id,
+            task_id=task_id,
+            persona_id=persona_id
+        )
+    )
+    return task_id
+
+
 @router.post("/")
 async def upload_chat_data(
     file: UploadFile = File(...),
+    persona_id: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user)
 ):
-    """上传聊天记录文件"""
+    """上传聊天记录文件，指定persona_id时增量追加到已有人格"""
     
     # 检查文件大小 (100MB)
     MAX_SIZE = 100 * 1024 * 1024
@@ -32,43 +81,155 @@ async def upload_chat_data(
         )
     
     # 检查文件类型
-    allowed_extensions = ['.zip', '.db', '.txt', '.json', '.html']
     file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"不支持的文件类型 {file_ext}"
         )
     
+    await _verify_target_persona(persona_id, current_user)
+    
     # 保存文件
     file_id = str(uuid4())
-    upload_dir = "uploads"
+    upload_dir = settings.UPLOAD_DIR
     file_path = os.path.join(upload_dir, f"{file_id}{file_ext}")
     
     # 确保目录存在
     os.makedirs(upload_dir, exist_ok=True)
     
-    # 异步写入文件
+    # 分块写入文件，避免整个文件驻留内存
     async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-    
-    # 创建处理任务（使用asyncio而不是Celery）
-    task_id = str(uuid4())
+        while True:
+            chunk = await file.read(1024 * 1024)
+            if not chunk:
+                break
+            await f.write(chunk)
     
     # 在后台处理文件
-    processor = DataProcessorService()
-    asyncio.create_task(
-        processor.process_chat_data(
-            file_path=file_path,
+    task_id = _start_processing(file_path, str(current_user.id), persona_id)
+    
+    return {
+        "task_id": task_id,
+        "status": "processing",
+        "message": "文件上传成功，正在处理中..."
+    }
+
+
+@router.post("/sessions")
+async def init_upload_session(
+    data: InitUploadRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """创建分块上传会话"""
+    await _verify_target_persona(data.persona_id, current_user)
+    
+    service = UploadSessionService()
+    try:
+        meta = await service.init_session(
+            user_id=str(current_user.id),
+            filename=data.filename,
+            total_size=data.total_size,
+            sha256=data.sha256,
+            persona_id=data.persona_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "upload_id": meta["upload_id"],
+        "offset": meta["offset"],
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE
+    }
+
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """查询上传进度（断点续传时获取应继续的偏移量）"""
+    service = UploadSessionService()
+    try:
+        meta = await service.get_session(upload_id, str(current_user.id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    
+    return {
+        "upload_id": upload_id,
+        "offset": meta["offset"],
+        "total_size": meta["total_size"],
+        "status": meta["status"]
+    }
+
+
+@router.put("/sessions/{upload_id}/chunks")
+async def put_upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """上传一个分块，请求体为原始字节"""
+    service = UploadSessionService()
+    try:
+        meta = await service.put_chunk(
+            upload_id=upload_id,
             user_id=str(current_user.id),
-            task_id=task_id
+            offset=offset,
+            stream=request.stream()
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except OffsetMismatchError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "offset": e.expected}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"upload_id": upload_id, "offset": meta["offset"]}
+
+
+@router.post("/sessions/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """完成分块上传并开始处理"""
+    service = UploadSessionService()
+    try:
+        meta = await service.complete(upload_id, str(current_user.id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except OffsetMismatchError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "文件尚未上传完整", "offset": e.expected}
         )
+    except ChecksumMismatchError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "offset": e.expected}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    task_id = _start_processing(
+        meta["file_path"], str(current_user.id), meta.get("persona_id")
     )
     
     return {
         "task_id": task_id,
         "status": "processing",
+        "sha256": meta["sha256"],
         "message": "文件上传成功，正在处理中..."
     }
 
@@ -76,6 +237,25 @@ async def upload_chat_data(
 # 简单的任务状态存储（生产环境应使用Redis）
 task_status_store = {}
 
+@router.delete("/sessions/{upload_id}")
+async def abort_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """放弃未完成的分块上传"""
+    service = UploadSessionService()
+    try:
+        await service.abort(upload_id, str(current_user.id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"upload_id": upload_id, "status": "aborted"}
+
+
 @router.get("/status/{task_id}")
 async def check_upload_status(
     task_id: str,
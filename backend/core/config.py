@@ -2,7 +2,7 @@
 配置管理 - Azure优化版
 """
 
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -25,6 +25,21 @@ class Settings(BaseSettings):
     )
     DATABASE_NAME: str = "secondself"
     
+    # MongoDB连接池: 连接数上下限、空闲回收、超时（毫秒，socket超时为空表示不限制），
+    # 线上传输压缩（按顺序协商，zstd需安装zstandard，未安装时自动跳过）
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGODB_COMPRESSORS: str = "zstd,zlib"
+    # 统计类读取的读偏好（副本集部署时可分流到从节点）
+    MONGODB_ANALYTICS_READ_PREFERENCE: str = "secondaryPreferred"
+    # 命令监控: 慢查询阈值（毫秒）、单个请求的命令数告警阈值（发现N+1查询）
+    MONGODB_SLOW_QUERY_MS: float = 100
+    MONGODB_REQUEST_COMMAND_WARN: int = 50
+    
     # CORS配置
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -49,6 +64,8 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
     UPLOAD_DIR: str = "./uploads"
     TEMP_DIR: str = "./temp"
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # 分块上传单块上限 8MB
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # 未完成的分块上传会话无活动超过该秒数后删除
     
     # Azure Blob Storage配置
     AZURE_STORAGE_CONNECTION_STRING: str = Field(default="", description="Azure存储连接字符串")
@@ -57,8 +74,65 @@ class Settings(BaseSettings):
     # 性能优化配置
     EMBEDDING_BATCH_SIZE: int = 100
     CACHE_EMBEDDINGS: bool = True
+    EMBEDDING_FILTER_ENABLED: bool = True  # 向量化前过滤重复和低信息量消息
+    LOW_INFO_MAX_CHARS: int = 2
+    NEAR_DUPLICATE_THRESHOLD: float = 0.7
+    
+    # 向量化单元: window（按会话窗口）或 message（逐条消息）
+    EMBEDDING_UNIT: str = "window"
+    SESSION_GAP_MINUTES: int = 30
+    WINDOW_MAX_MESSAGES: int = 12
+    WINDOW_MAX_CHARS: int = 400
     MAX_RETRIES: int = 3
     
+    # 回复对: 对方一轮发言之后多久内人格的发言算作回复，每侧最多保留的消息数
+    REPLY_PAIRS_ENABLED: bool = True
+    REPLY_PAIR_MAX_GAP_MINUTES: int = 30
+    REPLY_PAIR_MAX_MESSAGES: int = 4
+    
+    # 导入批量写入: 分块上限（条数/估算字节数）、同时在途的块数、写关注
+    BULK_WRITE_CHUNK_DOCS: int = 1000
+    BULK_WRITE_CHUNK_BYTES: int = 8 * 1024 * 1024
+    BULK_WRITE_IN_FLIGHT: int = 4
+    IMPORT_WRITE_CONCERN_W: Union[int, str] = 1
+    IMPORT_WRITE_CONCERN_J: bool = False
+    
+    # 向量回填: 每批读取的文档数、同时进行的向量请求数
+    BACKFILL_BATCH_SIZE: int = 256
+    BACKFILL_CONCURRENCY: int = 4
+    
+    # 人格删除: 后台每批删除的文档数、批间暂停秒数
+    DELETION_BATCH_SIZE: int = 1000
+    DELETION_BATCH_PAUSE: float = 0.05
+    
+    # 话题聚类: 最大话题数、开始聚类的最少文档数、增量分配达到训练规模的比例后重新训练，
+    # 文档数达到TOPIC_SEARCH_MIN_DOCS的人格检索时只对最近的TOPIC_PROBE个话题打分
+    TOPIC_CLUSTERS_MAX: int = 64
+    TOPIC_MIN_DOCS: int = 200
+    TOPIC_REFIT_RATIO: float = 0.5
+    TOPIC_SEARCH_MIN_DOCS: int = 5000
+    TOPIC_PROBE: int = 4
+    
+    # 情绪/提问/打招呼/口头禅词典（JSON文件，{类别: [词, ...]}），为空时使用内置词典
+    LEXICON_FILE: Optional[str] = None
+    
+    # 中文分词: 前缀词典缓存目录、批量分词的进程数及启用进程池的最小批量
+    TOKENIZER_CACHE_DIR: str = "./cache/jieba"
+    TOKENIZER_WORKERS: int = 2
+    TOKENIZER_POOL_MIN_TEXTS: int = 5000
+    
+    # 密码哈希: bcrypt专用线程数、排队上限（超过时登录/注册返回503）；已验证令牌的缓存条数
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    TOKEN_CACHE_SIZE: int = 4096
+    
+    # 文档读缓存: User、Persona 的进程内读穿缓存秒数（0为关闭）和最多缓存的文档数
+    DOCUMENT_CACHE_TTL: float = 30.0
+    DOCUMENT_CACHE_SIZE: int = 1024
+    
+    # 消息子串检索: 进程内最多缓存多少个人格的N-gram倒排索引
+    NGRAM_INDEX_MAX_PERSONAS: int = 8
+    
     # Feature Flags
     USE_MOCK_EMBEDDINGS: str = Field(default="false", description="是否使用模拟embeddings")
     
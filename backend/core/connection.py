@@ -0,0 +1,178 @@
+"""
+MongoDB连接管理 - 进程内唯一的客户端和连接池
+
+- 连接池大小、超时、线上传输压缩统一由配置决定，应用、测试包装类和脚本共用同一个客户端
+- 按负载选择读偏好: default 走主节点，analytics（统计、画像重算等可接受轻微延迟的读）
+  可分流到从节点
+- 注册命令监听器，记录每类命令的延迟、每个路由的数据库命令数，并输出慢查询日志；
+  单个请求的命令数过多（N+1）时告警
+"""
+
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.read_preferences import Primary, make_read_preference, read_pref_mode_from_name
+
+from backend.core.config import settings
+from backend.core.logger import logger
+
+DEFAULT = "default"
+ANALYTICS = "analytics"
+
+
+class RequestStats:
+    """单个HTTP请求内的数据库命令统计"""
+
+    __slots__ = ("route", "commands", "total_ms")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.commands = 0
+        self.total_ms = 0.0
+
+
+# 当前请求的统计（由main中的中间件设置；motor在线程池执行命令时会复制上下文）
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """命令监听器: 按 命令:集合 聚合延迟，按路由聚合每个请求的命令数"""
+
+    def __init__(self, slow_ms: Optional[float] = None):
+        self.slow_ms = settings.MONGODB_SLOW_QUERY_MS if slow_ms is None else slow_ms
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, Tuple[str, str, Optional[RequestStats]]] = {}
+        self.commands: Dict[str, Dict[str, float]] = {}
+        self.routes: Dict[str, Dict[str, float]] = {}
+        self.slow_queries = 0
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self.commands.clear()
+            self.routes.clear()
+            self.slow_queries = 0
+
+    def started(self, event):
+        # find/aggregate/insert等命令的值是集合名，getMore另有collection字段
+        collection = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                event.command_name, collection, current_request.get()
+            )
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+            if pending is None:
+                return
+            command_name, collection, request = pending
+            duration_ms = event.duration_micros / 1000
+            key = f"{command_name}:{collection}" if collection else command_name
+            stats = self.commands.setdefault(
+                key, {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            stats["count"] += 1
+            stats["failures"] += failed
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            if request is not None:
+                request.commands += 1
+                request.total_ms += duration_ms
+            slow = duration_ms >= self.slow_ms
+            if slow:
+                self.slow_queries += 1
+        if slow:
+            route = request.route if request is not None else "-"
+            logger.warning(f"慢查询 {key} {duration_ms:.1f}ms 路由 {route}")
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def record_request(self, request: RequestStats):
+        """请求结束时按路由汇总命令数"""
+        with self._lock:
+            stats = self.routes.setdefault(
+                request.route, {"requests": 0, "commands": 0, "max_commands": 0, "total_ms": 0.0}
+            )
+            stats["requests"] += 1
+            stats["commands"] += request.commands
+            stats["max_commands"] = max(stats["max_commands"], request.commands)
+            stats["total_ms"] += request.total_ms
+        if request.commands >= settings.MONGODB_REQUEST_COMMAND_WARN:
+            logger.warning(f"路由 {request.route} 单次请求执行了 {request.commands} 条数据库命令")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "commands": {
+                    key: {**stats, "avg_ms": stats["total_ms"] / stats["count"]}
+                    for key, stats in sorted(self.commands.items(), key=lambda item: -item[1]["total_ms"])
+                },
+                "routes": {
+                    route: {**stats, "avg_commands": stats["commands"] / stats["requests"]}
+                    for route, stats in sorted(self.routes.items(), key=lambda item: -item[1]["commands"])
+                },
+                "slow_queries": self.slow_queries,
+            }
+
+
+class MongoConnectionManager:
+    """唯一的Motor客户端，按负载提供不同读偏好的数据库句柄"""
+
+    def __init__(self, url: Optional[str] = None, metrics: Optional[CommandMetrics] = None):
+        self.url = url or settings.MONGODB_URL
+        self.metrics = metrics or CommandMetrics()
+        self._client: Optional[AsyncIOMotorClient] = None
+
+    def client_options(self) -> Dict:
+        options = {
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+            "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+            "event_listeners": [self.metrics],
+        }
+        if settings.MONGODB_COMPRESSORS:
+            # 服务端和客户端都支持的第一个算法生效，未安装对应模块的算法会被跳过
+            options["compressors"] = settings.MONGODB_COMPRESSORS
+        return options
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = AsyncIOMotorClient(self.url, **self.client_options())
+        return self._client
+
+    def read_preference(self, workload: str = DEFAULT):
+        if workload == ANALYTICS:
+            mode = read_pref_mode_from_name(settings.MONGODB_ANALYTICS_READ_PREFERENCE)
+            return make_read_preference(mode, None)
+        return Primary()
+
+    def database(self, name: Optional[str] = None, workload: str = DEFAULT):
+        return self.client.get_database(
+            name or settings.DATABASE_NAME, read_preference=self.read_preference(workload)
+        )
+
+    def for_workload(self, collection, workload: str):
+        """同一集合的另一种读偏好视图（如 Message.get_motor_collection()）"""
+        return collection.with_options(read_preference=self.read_preference(workload))
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+connection_manager = MongoConnectionManager()
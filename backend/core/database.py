@@ -2,27 +2,32 @@
 MongoDB数据库配置
 """
 
-from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
-from backend.core.config import settings
+from backend.core.connection import connection_manager
+from backend.core.indexes import ensure_indexes, start_index_build
 from backend.models.user import User
 from backend.models.persona import Persona
 from backend.models.message import Message
+from backend.models.message_window import MessageWindow
 from backend.models.chat import ChatHistory
 from backend.models.chat_model import Chat
+from backend.models.backfill_checkpoint import BackfillCheckpoint
+from backend.models.reply_pair import ReplyPair
+from backend.models.persona_topics import PersonaTopics
 
 # MongoDB客户端
 motor_client = None
 database = None
+index_task = None
 
 
 async def init_db():
     """初始化MongoDB连接"""
-    global motor_client, database
+    global motor_client, database, index_task
     
-    # 创建MongoDB客户端
-    motor_client = AsyncIOMotorClient(settings.MONGODB_URL)
-    database = motor_client[settings.DATABASE_NAME]
+    # 共享连接池的客户端（连接池、超时、压缩、命令监控见 connection.py）
+    motor_client = connection_manager.client
+    database = connection_manager.database()
     
     # 初始化Beanie ODM
     await init_beanie(
@@ -31,34 +36,29 @@ async def init_db():
             User,
             Persona,
             Message,
+            MessageWindow,
             ChatHistory,
-            Chat
+            Chat,
+            BackfillCheckpoint,
+            ReplyPair,
+            PersonaTopics
         ]
     )
     
-    # 创建索引
-    await create_indexes()
+    # 后台创建索引，不阻塞启动
+    index_task = start_index_build(database)
 
 
 async def create_indexes():
-    """创建必要的索引"""
-    # 用户邮箱唯一索引
-    await User.get_motor_collection().create_index("email", unique=True)
-    await User.get_motor_collection().create_index("username", unique=True)
-    
-    # 人格索引
-    await Persona.get_motor_collection().create_index("user_id")
-    
-    # 消息索引 - 支持向量搜索
-    await Message.get_motor_collection().create_index("persona_id")
-    await Message.get_motor_collection().create_index("timestamp")
-    
-    # 如果使用MongoDB Atlas，可以创建向量搜索索引
-    # 这需要在Atlas UI中配置或使用特定API
+    """按索引注册表创建索引（等待完成）"""
+    await ensure_indexes(database)
 
 
 async def close_db():
     """关闭数据库连接"""
     global motor_client
+    if index_task is not None and not index_task.done():
+        index_task.cancel()
     if motor_client:
-        motor_client.close()
\ No newline at end of file
+        connection_manager.close()
+        motor_client = None
\ No newline at end of file
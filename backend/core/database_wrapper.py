@@ -1,8 +1,8 @@
 """
 数据库包装类，用于测试和统一接口
 """
-from motor.motor_asyncio import AsyncIOMotorClient
-from backend.core.config import settings
+from backend.core.connection import connection_manager
+from backend.core.indexes import ensure_indexes
 from typing import Optional
 
 
@@ -17,8 +17,9 @@ class Database:
     
     def __init__(self):
         if not hasattr(self, 'initialized'):
-            self.client = AsyncIOMotorClient(settings.MONGODB_URL)
-            self.db = self.client[settings.DATABASE_NAME]
+            # 与应用共用同一个客户端和连接池
+            self.client = connection_manager.client
+            self.db = connection_manager.database()
             
             # 集合引用
             self.users = self.db.users
@@ -40,21 +41,8 @@ class Database:
                 await self.db.create_collection(collection)
     
     async def create_indexes(self):
-        """创建索引"""
-        # 用户索引
-        await self.users.create_index("username", unique=True)
-        await self.users.create_index("email", unique=True)
-        
-        # 人格索引
-        await self.personas.create_index("user_id")
-        
-        # 消息索引
-        await self.messages.create_index("persona_id")
-        await self.messages.create_index([("persona_id", 1), ("timestamp", -1)])
-        
-        # 聊天索引
-        await self.chats.create_index("user_id")
-        await self.chats.create_index([("user_id", 1), ("created_at", -1)])
+        """按索引注册表创建索引"""
+        await ensure_indexes(self.db)
     
     async def create_vector_index(self):
         """创建向量搜索索引"""
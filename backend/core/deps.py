@@ -7,12 +7,28 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from backend.core.config import settings
+from backend.core.identity_map import load
+from backend.core.security import token_cache
 from backend.models.user import User
-from beanie import PydanticObjectId
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 
+def token_subject(token: str) -> Optional[str]:
+    """验证令牌并返回sub，验证结果缓存到令牌过期"""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("sub")
+    if user_id is not None:
+        token_cache.put(token, user_id, payload.get("exp"))
+    return user_id
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """获取当前用户"""
     credentials_exception = HTTPException(
@@ -21,21 +37,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    user_id = token_subject(token)
+    if user_id is None:
         raise credentials_exception
     
-    user = await User.get(PydanticObjectId(user_id))
+    user = await load(User, user_id)
     if user is None:
         raise credentials_exception
     
     return user
 
 
+async def get_current_superuser(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """获取当前管理员用户"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough privileges")
+    return current_user
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -0,0 +1,113 @@
+"""
+文档加载: 请求级身份映射 + 进程级短TTL读穿缓存
+
+- 身份映射: 同一请求内按 (模型, _id) 只加载一次文档，路由里的权限校验和服务层拿到的是
+  同一个实例（作用域由main中的中间件开启；请求外调用不做去重）
+- 读穿缓存: 注册过的模型（User、Persona，读多写少）在进程内缓存 DOCUMENT_CACHE_TTL 秒，
+  最多 DOCUMENT_CACHE_SIZE 个，按最近使用淘汰。缓存里存的是副本，每个请求拿到自己的拷贝，
+  请求内修改不会污染缓存
+- 失效: 实例上的 save/set/delete 由模型的Beanie事件调用 invalidate()；直接对集合
+  update 的地方需要自己调用。多进程部署时其他进程的写入最多延迟一个TTL可见
+"""
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple, Type, TypeVar
+
+from beanie import Document, PydanticObjectId
+
+from backend.core.config import settings
+
+D = TypeVar("D", bound=Document)
+
+_identity_map: ContextVar[Optional[Dict[Tuple[str, str], Optional[Document]]]] = ContextVar(
+    "identity_map", default=None
+)
+
+
+class DocumentCache:
+    """按 (模型, _id) 缓存文档副本的TTL/LRU缓存"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.models = set()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Document]]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Document]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, document = entry
+        if expires < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return document.model_copy(deep=True)
+
+    def put(self, key: Tuple[str, str], document: Document):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, document.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, model: Type[Document], document_id):
+        key = _key(model, document_id)
+        self._entries.pop(key, None)
+        scope = _identity_map.get()
+        if scope is not None:
+            scope.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+document_cache = DocumentCache(settings.DOCUMENT_CACHE_TTL, settings.DOCUMENT_CACHE_SIZE)
+
+
+def read_through(model: Type[D]) -> Type[D]:
+    """类装饰器: 该模型经 load() 读取时使用进程级缓存"""
+    document_cache.models.add(model)
+    return model
+
+
+def _key(model: Type[Document], document_id) -> Tuple[str, str]:
+    return model.__name__, str(document_id)
+
+
+@contextmanager
+def identity_scope():
+    """开启一个身份映射作用域（一个请求）"""
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+async def load(model: Type[D], document_id) -> Optional[D]:
+    """
+    按 _id 加载文档，依次查请求内身份映射、进程缓存、数据库
+
+    不存在时返回None（同一请求内也会记住不存在）。
+    """
+    document_id = PydanticObjectId(document_id)
+    key = _key(model, document_id)
+    scope = _identity_map.get()
+    if scope is not None and key in scope:
+        return scope[key]
+
+    cached = model in document_cache.models
+    document = document_cache.get(key) if cached else None
+    if document is None:
+        document = await model.get(document_id)
+        if cached and document is not None:
+            document_cache.put(key, document)
+
+    if scope is not None:
+        scope[key] = document
+    return document
@@ -0,0 +1,158 @@
+"""
+索引注册表 - 所有集合的索引在这里统一声明
+
+模型上不再声明索引（Indexed / Settings.indexes），启动时由 ensure_indexes
+按注册表在后台创建，已存在的索引由MongoDB直接跳过。
+
+HOT_QUERIES 是线上热点查询的形状，tests/integration/test_index_plans.py
+对每个形状执行 explain()，计划中出现 COLLSCAN 或内存 SORT 即失败。
+新增热点查询时在这里补充形状和所需索引。
+"""
+
+import asyncio
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from backend.core.logger import logger
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+    "personas": [
+        # 用户的人格列表（键集分页）、最近创建的人格
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_created_at_id"
+        ),
+    ],
+    "messages": [
+        # 人格内按时间排序/分页、时间范围和时间类聚合统计
+        IndexModel(
+            [("persona_id", ASCENDING), ("timestamp", ASCENDING), ("sender", ASCENDING)],
+            name="persona_timestamp_sender"
+        ),
+        # 聊天记录浏览/导出的键集分页
+        IndexModel(
+            [("persona_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="persona_timestamp_id"
+        ),
+        # 情绪/提问检索通道: 人格内按特征过滤并按时间倒序
+        IndexModel(
+            [("persona_id", ASCENDING), ("emotion", ASCENDING), ("timestamp", DESCENDING)],
+            name="persona_emotion_timestamp"
+        ),
+        IndexModel(
+            [("persona_id", ASCENDING), ("is_question", ASCENDING), ("timestamp", DESCENDING)],
+            name="persona_question_timestamp"
+        ),
+        # 重复导入去重
+        IndexModel(
+            [("persona_id", ASCENDING), ("fingerprint", ASCENDING)],
+            name="persona_fingerprint",
+            unique=True,
+            partialFilterExpression={"fingerprint": {"$type": "string"}}
+        ),
+        # MongoDB Atlas Vector Search索引需要在Atlas UI中创建
+    ],
+    "message_windows": [
+        IndexModel([("persona_id", ASCENDING), ("start_time", ASCENDING)], name="persona_start_time"),
+    ],
+    "reply_pairs": [
+        IndexModel([("persona_id", ASCENDING), ("prompt_time", ASCENDING)], name="persona_prompt_time"),
+    ],
+    "persona_topics": [
+        IndexModel([("persona_id", ASCENDING)], unique=True),
+    ],
+    "backfill_checkpoints": [
+        IndexModel([("job_id", ASCENDING)], unique=True),
+        IndexModel([("persona_id", ASCENDING), ("updated_at", DESCENDING)], name="persona_updated_at"),
+    ],
+    "chats": [
+        # 用户的对话列表按最近更新倒序（键集分页）
+        IndexModel(
+            [("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_updated_at_id"
+        ),
+        IndexModel([("persona_id", ASCENDING)]),
+    ],
+    "chat_history": [
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("persona_id", ASCENDING)]),
+        IndexModel([("session_id", ASCENDING)]),
+    ],
+}
+
+# 热点查询形状: (名称, 集合, 查询条件, 排序)，占位值只用于生成计划
+_ID = "000000000000000000000000"
+HOT_QUERIES = [
+    ("login_by_email", "users", {"email": "a@example.com"}, None),
+    ("list_personas", "personas", {
+        "user_id": _ID, "status": {"$ne": "deleting"},
+    }, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("list_personas_page", "personas", {"user_id": _ID, "status": {"$ne": "deleting"}, "$or": [
+        {"created_at": {"$lt": "2024-06-01"}}, {"created_at": "2024-06-01", "_id": {"$lt": _ID}},
+    ]}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("latest_persona", "personas", {"user_id": _ID}, [("created_at", DESCENDING)]),
+    ("get_messages", "messages", {
+        "persona_id": _ID, "timestamp": {"$gte": "2024-01-01", "$lte": "2024-12-31"},
+    }, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("get_messages_page", "messages", {"persona_id": _ID, "$or": [
+        {"timestamp": {"$lt": "2024-06-01"}}, {"timestamp": "2024-06-01", "_id": {"$lt": _ID}},
+    ]}, [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("style_scan", "messages", {"persona_id": _ID}, [("timestamp", ASCENDING)]),
+    ("ngram_index_build", "messages", {"persona_id": _ID}, None),
+    ("emotion_channel", "messages", {
+        "persona_id": _ID, "filter_reason": None, "emotion": "positive",
+    }, [("timestamp", DESCENDING)]),
+    ("question_channel", "messages", {
+        "persona_id": _ID, "filter_reason": None, "is_question": True,
+    }, [("timestamp", DESCENDING)]),
+    ("existing_fingerprints", "messages", {"persona_id": _ID, "fingerprint": {"$in": ["x"]}}, None),
+    ("window_vectors", "message_windows", {"persona_id": _ID, "embedding": {"$ne": None}}, None),
+    ("pair_vectors", "reply_pairs", {"persona_id": _ID, "embedding": {"$ne": None}}, None),
+    ("persona_topics", "persona_topics", {"persona_id": _ID}, None),
+    ("cascade_delete_chats", "chats", {"persona_id": _ID}, None),
+    ("cascade_delete_windows", "message_windows", {"persona_id": _ID}, None),
+    ("backfill_progress", "backfill_checkpoints", {"persona_id": _ID}, [("updated_at", DESCENDING)]),
+    ("get_user_chats", "chats", {"user_id": _ID}, [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("get_user_chats_page", "chats", {"user_id": _ID, "$or": [
+        {"updated_at": {"$lt": "2024-06-01"}}, {"updated_at": "2024-06-01", "_id": {"$lt": _ID}},
+    ]}, [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+]
+
+
+async def _ensure_collection(db, name: str, indexes: List[IndexModel]):
+    try:
+        await db[name].create_indexes(indexes)
+    except OperationFailure as e:
+        # 已存在同键不同名/不同选项的旧索引时不阻塞其他索引
+        logger.warning(f"集合 {name} 创建索引失败: {str(e)}")
+        for index in indexes:
+            try:
+                await db[name].create_indexes([index])
+            except OperationFailure as index_error:
+                logger.warning(f"跳过索引 {index.document['name']}: {str(index_error)}")
+
+
+async def ensure_indexes(db):
+    """按注册表创建全部索引"""
+    await asyncio.gather(*(
+        _ensure_collection(db, name, indexes) for name, indexes in INDEXES.items()
+    ))
+    logger.info(f"索引检查完成: {sum(len(i) for i in INDEXES.values())} 个索引")
+
+
+async def _build(db):
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"后台创建索引失败: {str(e)}")
+
+
+def start_index_build(db) -> asyncio.Task:
+    """启动时在后台建索引，不阻塞应用开始服务"""
+    return asyncio.create_task(_build(db))
@@ -0,0 +1,57 @@
+"""
+键集分页 - 按 (排序字段, _id) 倒序翻页的不透明游标
+
+游标记录上一页最后一条文档的排序字段值和 _id，下一页从它之后开始，
+配合 (过滤字段, 排序字段, _id) 复合索引，任意一页的代价都和第一页相同，
+不像 skip 需要逐条跳过前面的索引项。
+
+列表接口在响应头 X-Next-Cursor 中返回下一页游标，最后一页不返回。
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(value: datetime, doc_id: Any) -> str:
+    raw = json.dumps({"v": value.isoformat(), "id": str(doc_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, PydanticObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["v"]), PydanticObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor(f"无效的分页游标: {cursor}") from e
+
+
+def after_cursor(query: Dict, field: str, cursor: Optional[str]) -> Dict:
+    """在查询条件上追加"排在游标之后"（倒序）的条件"""
+    if not cursor:
+        return query
+    value, doc_id = decode_cursor(cursor)
+    keyset = {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": doc_id}},
+    ]}
+    return {"$and": [query, keyset]}
+
+
+def next_cursor(items: Sequence, limit: int, field: str) -> Optional[str]:
+    """取满一页时返回下一页游标"""
+    if limit <= 0 or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, field), last.id)
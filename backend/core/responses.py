@@ -0,0 +1,35 @@
+"""
+JSON响应 - 基于orjson
+
+作为应用的默认响应类: 声明了response_model的路由由pydantic-core完成校验和序列化，
+这里只负责用orjson编码；datetime由orjson原生处理，ObjectId、pydantic模型（含Beanie文档）
+在default中转换，直接返回 ORJSONResponse(文档) 时不经过 jsonable_encoder。
+"""
+
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(by_alias=True)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(
+        content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,8 +1,14 @@
 """
 安全相关功能
 """
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from passlib.context import CryptContext
 import jwt
 from backend.core.config import settings
@@ -10,6 +16,18 @@ from backend.core.config import settings
 # 密码上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt刻意消耗CPU（每次约100ms），在专用线程池中执行，不阻塞事件循环；
+# 线程数限制同时进行的哈希数，排队数超过上限时直接拒绝，避免登录风暴无限堆积
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_pending = 0
+_hash_lock = threading.Lock()
+
+
+class PasswordHashBusy(RuntimeError):
+    """密码哈希排队已满"""
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
@@ -21,6 +39,73 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_hash(func, *args):
+    global _hash_pending
+    with _hash_lock:
+        if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHashBusy("密码校验繁忙，请稍后重试")
+        _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        with _hash_lock:
+            _hash_pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在哈希线程池中验证密码"""
+    return await _run_hash(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在哈希线程池中计算密码哈希"""
+    return await _run_hash(get_password_hash, password)
+
+
+class TokenCache:
+    """
+    已验证令牌缓存: sha256(token) -> (sub, exp)
+    
+    签名只在首次出现时验证，之后直到exp前直接返回sub；按最近使用淘汰。
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        subject, expires = entry
+        if expires <= time.time():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return subject
+    
+    def put(self, token: str, subject: str, expires: Optional[float]):
+        # 没有exp的令牌不缓存
+        if expires is None or self.max_size <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (subject, float(expires))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建访问令牌"""
     to_encode = data.copy()
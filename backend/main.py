@@ -3,15 +3,23 @@ Second Self - FastAPI Backend
 主应用入口 - 简化版
 """
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from dotenv import load_dotenv
 
 from backend.api import auth, personas, chat_api, upload, adapter
 from backend.core.config import settings
+from backend.core.connection import RequestStats, connection_manager, current_request
 from backend.core.database import init_db, close_db
+from backend.core.deps import get_current_superuser
+from backend.core.identity_map import identity_scope
+from backend.core.pagination import NEXT_CURSOR_HEADER
+from backend.core.responses import ORJSONResponse
+from backend.services.persona_deletion import resume_pending
+from backend.services.tokenizer import Tokenizer, shutdown_pool
 
 # 加载环境变量
 load_dotenv()
@@ -27,9 +35,14 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up Second Self backend...")
     # 初始化数据库
     await init_db()
+    # 继续未完成的人格删除
+    await resume_pending()
+    # 预加载分词词典，避免首个请求承担冷启动
+    await asyncio.to_thread(Tokenizer.instance().warm)
     yield
     # 关闭数据库连接
     await close_db()
+    shutdown_pool()
     logger.info("Shutting down...")
 
 
@@ -38,7 +51,8 @@ app = FastAPI(
     title="Second Self API",
     description="AI对话伴侣后端服务",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS配置
@@ -48,8 +62,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 前端跨域部署，翻页游标在响应头中，需要显式暴露给浏览器
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# 兼容路径在路由前改写为实际路径（进程内分发）
+app.add_middleware(adapter.PathAliasMiddleware)
+
+
+@app.middleware("http")
+async def track_db_commands(request: Request, call_next):
+    """统计每个请求执行的数据库命令数，按路由模板汇总；同时开启请求内的文档身份映射"""
+    stats = RequestStats("unmatched")
+    token = current_request.set(stats)
+    try:
+        with identity_scope():
+            return await call_next(request)
+    finally:
+        current_request.reset(token)
+        route = request.scope.get("route")
+        if route is not None:
+            stats.route = f"{request.method} {route.path}"
+        connection_manager.metrics.record_request(stats)
+
+
 # 注册路由
 app.include_router(adapter.router)  # API兼容性适配器
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
@@ -73,4 +109,10 @@ async def health_check():
         "status": "healthy",
         "database": "connected",
         "version": settings.VERSION
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/metrics/mongo", dependencies=[Depends(get_current_superuser)])
+async def mongo_metrics():
+    """数据库命令延迟、各路由每个请求的命令数、慢查询数（仅管理员）"""
+    return connection_manager.metrics.snapshot()
@@ -1,6 +1,10 @@
 from backend.models.user import User
 from backend.models.persona import Persona
 from backend.models.message import Message
+from backend.models.message_window import MessageWindow
 from backend.models.chat import ChatHistory
+from backend.models.backfill_checkpoint import BackfillCheckpoint
+from backend.models.reply_pair import ReplyPair
+from backend.models.persona_topics import PersonaTopics
 
-__all__ = ["User", "Persona", "Message", "ChatHistory"]
\ No newline at end of file
+__all__ = ["User", "Persona", "Message", "MessageWindow", "ChatHistory", "BackfillCheckpoint", "ReplyPair", "PersonaTopics"]
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+向量回填任务检查点 - 支持中断后续传
+"""
+
+from datetime import datetime
+from typing import Optional
+from pydantic import Field
+from beanie import Document, PydanticObjectId
+
+
+class BackfillCheckpoint(Document):
+    """向量回填进度，按 _id 顺序推进"""
+    
+    job_id: str
+    target: str  # messages 或 message_windows
+    persona_id: Optional[PydanticObjectId] = None  # 为空表示全部人格
+    include_mock: bool = False  # 是否重新生成降级时写入的模拟向量
+    
+    # 进度
+    last_id: Optional[PydanticObjectId] = None  # 已完整写回的最后一个文档
+    total: int = 0
+    processed: int = 0
+    rate: float = 0.0  # docs/s
+    eta_seconds: Optional[float] = None
+    
+    status: str = "running"  # running, completed, failed
+    error: Optional[str] = None
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "backfill_checkpoints"
@@ -5,15 +5,15 @@
 from datetime import datetime
 from typing import Optional
 from pydantic import Field
-from beanie import Document, Indexed, PydanticObjectId
+from beanie import Document, PydanticObjectId
 
 
 class ChatHistory(Document):
     """聊天历史文档模型"""
     
     # 关联
-    user_id: Indexed(PydanticObjectId)
-    persona_id: Indexed(PydanticObjectId)
+    user_id: PydanticObjectId
+    persona_id: PydanticObjectId
     
     # 对话内容
     user_message: str
@@ -30,10 +30,4 @@ class ChatHistory(Document):
     feedback: Optional[str] = None
     
     class Settings:
-        name = "chat_history"
-        indexes = [
-            "user_id",
-            "persona_id",
-            "timestamp",
-            "session_id"
-        ]
\ No newline at end of file
+        name = "chat_history"
\ No newline at end of file
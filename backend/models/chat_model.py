@@ -5,7 +5,9 @@
 from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from beanie import Document, Indexed, PydanticObjectId
+from beanie import Document, PydanticObjectId
+
+PREVIEW_CHARS = 60  # 对话列表中最后一条消息的预览长度
 
 
 class ChatMessage(BaseModel):
@@ -19,17 +21,31 @@ class Chat(Document):
     """对话会话文档模型"""
     
     # 关联
-    user_id: Indexed(PydanticObjectId)
-    persona_id: Indexed(PydanticObjectId)
+    user_id: PydanticObjectId
+    persona_id: PydanticObjectId
     
     # 会话信息
     title: str
     messages: List[ChatMessage] = Field(default_factory=list)
     
+    # 列表摘要 - 写入时由messages维护，对话列表只投影这些字段
+    message_count: int = 0
+    last_message: Optional[str] = None  # 最后一条消息的预览
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    
     # 时间戳
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
     
+    def refresh_summary(self):
+        """根据messages重算列表摘要，保存前调用"""
+        self.message_count = len(self.messages)
+        last = self.messages[-1] if self.messages else None
+        self.last_message = last.content[:PREVIEW_CHARS] if last else None
+        self.last_message_role = last.role if last else None
+        self.last_message_at = last.timestamp if last else None
+    
     class Settings:
         name = "chats"
         
@@ -5,50 +5,51 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import Field
-from beanie import Document, Indexed, PydanticObjectId
+from beanie import Document, PydanticObjectId
 
 
 class Message(Document):
     """消息文档模型 - 原始聊天记录"""
     
     # 关联
-    persona_id: Indexed(PydanticObjectId)
+    persona_id: PydanticObjectId
     
     # 消息内容
     content: str
     sender: str  # 发送者名称
-    timestamp: Indexed(datetime)
+    timestamp: datetime
     
     # 向量嵌入 - 用于语义搜索
     embedding: Optional[List[float]] = None
+    topic_id: Optional[int] = None  # 话题聚类编号
+    filter_reason: Optional[str] = None  # 未向量化的原因: duplicate, near_duplicate, placeholder, low_info
     
     # 元数据
     message_type: str = "text"  # text, image, voice, video, file
     media_url: Optional[str] = None  # 媒体文件URL
     
     # 分析数据
-    emotion: Optional[str] = None  # 情绪标签
+    emotion: Optional[str] = None  # 情绪标签: positive, negative, neutral
     keywords: Optional[List[str]] = Field(default_factory=list)
+    is_question: bool = False
+    length_bucket: Optional[int] = None  # 长度区间下标，对应风格画像的长度直方图
     
     # 导入信息
     original_id: Optional[str] = None  # 原平台的消息ID
     import_batch: Optional[str] = None  # 导入批次标识
+    fingerprint: Optional[str] = None  # 发送者+时间+内容的指纹，用于重复导入去重
     
     class Settings:
         name = "messages"
-        indexes = [
-            "persona_id",
-            "timestamp",
-            "sender",
-            # MongoDB Atlas Vector Search索引需要在Atlas UI中创建
-            # 索引配置示例：
-            # {
-            #   "type": "vectorSearch",
-            #   "fields": [{
-            #     "type": "vector",
-            #     "path": "embedding",
-            #     "numDimensions": 1536,
-            #     "similarity": "cosine"
-            #   }]
-            # }
-        ]
\ No newline at end of file
+        # 索引统一在 backend/core/indexes.py 中声明
+        # MongoDB Atlas Vector Search索引需要在Atlas UI中创建
+        # 索引配置示例：
+        # {
+        #   "type": "vectorSearch",
+        #   "fields": [{
+        #     "type": "vector",
+        #     "path": "embedding",
+        #     "numDimensions": 1536,
+        #     "similarity": "cosine"
+        #   }]
+        # }
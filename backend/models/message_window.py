@@ -0,0 +1,34 @@
+"""
+对话窗口模型 - 按会话切分的检索单元
+"""
+
+from datetime import datetime
+from typing import Optional, List
+from pydantic import Field
+from beanie import Document, PydanticObjectId
+
+
+class MessageWindow(Document):
+    """对话窗口文档模型 - 一段连续对话作为一个向量检索单元"""
+    
+    # 关联
+    persona_id: PydanticObjectId
+    message_ids: List[PydanticObjectId] = Field(default_factory=list)
+    
+    # 窗口内容（"发送者: 内容" 按行拼接）
+    text: str
+    senders: List[str] = Field(default_factory=list)
+    message_count: int = 0
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    
+    # 向量嵌入
+    embedding: Optional[List[float]] = None
+    topic_id: Optional[int] = None  # 话题聚类编号
+    
+    # 导入信息
+    import_batch: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "message_windows"
@@ -5,7 +5,8 @@
 from datetime import datetime
 from typing import Optional, List, Dict
 from pydantic import Field
-from beanie import Document, Indexed, PydanticObjectId
+from beanie import Delete, Document, PydanticObjectId, Replace, Save, SaveChanges, Update, after_event
+from backend.core.identity_map import document_cache, read_through
 from enum import Enum
 
 
@@ -13,13 +14,15 @@ class PersonaStatus(str, Enum):
     PROCESSING = "processing"
     READY = "ready"
     ERROR = "error"
+    DELETING = "deleting"  # 已标记删除，后台任务正在删除关联数据
 
 
+@read_through
 class Persona(Document):
     """人格文档模型"""
     
     # 关联
-    user_id: Indexed(PydanticObjectId)
+    user_id: PydanticObjectId
     
     # 基本信息
     name: str
@@ -29,6 +32,7 @@ class Persona(Document):
     
     # 统计信息
     message_count: int = 0
+    messages_version: int = 0  # 消息每次增删时递增，进程内的消息索引缓存据此判断是否过期
     date_range_start: Optional[datetime] = None
     date_range_end: Optional[datetime] = None
     
@@ -42,14 +46,26 @@ class Persona(Document):
     frequent_words: Optional[List[str]] = Field(default_factory=list)
     sentence_patterns: Optional[Dict] = Field(default_factory=dict)
     
+    # 活跃时间分布（按小时/星期）和回复间隔
+    activity_profile: Optional[Dict] = Field(default_factory=dict)
+    
+    # 可合并的风格摘要（计数器、直方图、频繁项），画像字段由它派生
+    style_summary: Optional[Dict] = Field(default_factory=dict)
+    
+    # 导入统计（重复、占位、低信息量消息计数）
+    ingest_stats: Optional[Dict] = Field(default_factory=dict)
+    
+    # 删除进度（各集合已删除的文档数），仅在 deleting 状态下有值
+    deletion_progress: Optional[Dict] = Field(default_factory=dict)
+    
     # 时间戳
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_cache(self):
+        """实例写入后使进程内读缓存失效"""
+        document_cache.invalidate(Persona, self.id)
+    
     class Settings:
-        name = "personas"
-        indexes = [
-            "user_id",
-            "status",
-            "created_at"
-        ]
\ No newline at end of file
+        name = "personas"
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+人格话题模型 - 向量聚类得到的话题中心
+"""
+
+from datetime import datetime
+from typing import List
+from pydantic import Field
+from beanie import Document, PydanticObjectId
+
+
+class PersonaTopics(Document):
+    """人格的话题聚类结果，检索时先比较话题中心再对命中话题的成员打分"""
+    
+    persona_id: PydanticObjectId
+    target: str  # 聚类的集合: messages 或 message_windows
+    
+    # 每个话题的中心（行归一化）、成员数和代表词
+    centroids: List[List[float]] = Field(default_factory=list)
+    counts: List[int] = Field(default_factory=list)
+    labels: List[List[str]] = Field(default_factory=list)
+    
+    # 全量训练时的文档数，以及之后增量分配的文档数（达到比例后重新训练）
+    fitted_count: int = 0
+    assigned_since_fit: int = 0
+    version: int = 0  # 中心每次变化递增，检索侧据此刷新缓存
+    
+    fitted_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "persona_topics"
@@ -0,0 +1,35 @@
+"""
+回复对模型 - 对方说了什么、人格如何回复
+"""
+
+from datetime import datetime
+from typing import Optional, List
+from pydantic import Field
+from beanie import Document, PydanticObjectId
+
+
+class ReplyPair(Document):
+    """回复对文档模型 - 以对方的话向量化，命中后直接带回人格的真实回复"""
+    
+    # 关联
+    persona_id: PydanticObjectId
+    prompt_message_ids: List[PydanticObjectId] = Field(default_factory=list)
+    reply_message_ids: List[PydanticObjectId] = Field(default_factory=list)
+    
+    # 对方的一轮发言和人格紧接着的一轮回复（多条消息按行拼接）
+    prompt: str
+    reply: str
+    prompt_sender: Optional[str] = None
+    prompt_time: Optional[datetime] = None
+    reply_time: Optional[datetime] = None
+    latency_seconds: Optional[float] = None
+    
+    # 向量嵌入（prompt一侧）
+    embedding: Optional[List[float]] = None
+    
+    # 导入信息
+    import_batch: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "reply_pairs"
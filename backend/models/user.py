@@ -5,15 +5,17 @@
 from datetime import datetime
 from typing import Optional
 from pydantic import EmailStr, Field
-from beanie import Document, Indexed
+from beanie import Delete, Document, Replace, Save, SaveChanges, Update, after_event
+from backend.core.identity_map import document_cache, read_through
 
 
+@read_through
 class User(Document):
     """用户文档模型"""
     
     # 基本信息
-    email: Indexed(EmailStr, unique=True)
-    username: Indexed(str, unique=True)
+    email: EmailStr
+    username: str
     hashed_password: str
     
     # 状态
@@ -27,6 +29,11 @@ class User(Document):
     # 用户配置
     settings: Optional[dict] = None
     
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_cache(self):
+        """实例写入后使进程内读缓存失效"""
+        document_cache.invalidate(User, self.id)
+    
     class Settings:
         name = "users"
         
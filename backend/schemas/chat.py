@@ -2,10 +2,13 @@
 聊天相关Schema
 """
 
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from datetime import datetime
 from uuid import UUID
 from typing import List, Optional
+from beanie import PydanticObjectId
+from backend.models import chat_model
+from backend.models.chat_model import PREVIEW_CHARS
 
 
 class ChatMessage(BaseModel):
@@ -26,4 +29,59 @@ class MessageHistory(BaseModel):
     timestamp: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ChatSummary(BaseModel):
+    """对话列表的读模型 - 按投影读取，不传输messages数组"""
+    id: PydanticObjectId = Field(validation_alias=AliasChoices("_id", "id"))
+    user_id: PydanticObjectId
+    persona_id: PydanticObjectId
+    title: str
+    message_count: int = 0
+    last_message: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    class Settings:
+        # 摘要字段出现之前写入的对话，在服务端由messages推算
+        projection = {
+            "user_id": 1,
+            "persona_id": 1,
+            "title": 1,
+            "created_at": 1,
+            "updated_at": 1,
+            "message_count": {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]},
+            "last_message": {"$ifNull": ["$last_message", {
+                "$substrCP": [{"$ifNull": [{"$arrayElemAt": ["$messages.content", -1]}, ""]}, 0, PREVIEW_CHARS]
+            }]},
+            "last_message_role": {"$ifNull": ["$last_message_role", {"$arrayElemAt": ["$messages.role", -1]}]},
+            "last_message_at": {"$ifNull": ["$last_message_at", {"$arrayElemAt": ["$messages.timestamp", -1]}]},
+        }
+
+
+class ChatDetail(BaseModel):
+    """对话详情的响应模型"""
+    id: PydanticObjectId = Field(validation_alias=AliasChoices("_id", "id"))
+    user_id: PydanticObjectId
+    persona_id: PydanticObjectId
+    title: str
+    messages: List[chat_model.ChatMessage] = []
+    message_count: int = 0
+    last_message: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SendMessageResponse(BaseModel):
+    """发送消息的响应模型"""
+    user_message: chat_model.ChatMessage
+    assistant_message: Optional[chat_model.ChatMessage] = None
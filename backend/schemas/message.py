@@ -0,0 +1,20 @@
+"""
+消息相关Schema
+"""
+
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
+from datetime import datetime
+from typing import Optional
+from beanie import PydanticObjectId
+
+
+class MessageSummary(BaseModel):
+    """聊天记录浏览/搜索的读模型 - 按投影读取，不含向量"""
+    id: PydanticObjectId = Field(validation_alias=AliasChoices("_id", "id"))
+    content: str
+    sender: str
+    timestamp: datetime
+    message_type: str = "text"
+    emotion: Optional[str] = None
+    
+    model_config = ConfigDict(from_attributes=True)
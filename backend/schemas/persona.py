@@ -2,7 +2,7 @@
 人格相关Schema
 """
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import AliasChoices, BaseModel, Field, field_validator
 from datetime import datetime
 from uuid import UUID
 from typing import Optional, Dict, List
@@ -46,4 +46,9 @@ class PersonaResponse(PersonaBase):
         return v
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class PersonaSummary(PersonaResponse):
+    """人格列表的读模型 - 只投影响应需要的字段，不读取风格摘要、句式等大字段"""
+    id: str = Field(validation_alias=AliasChoices("_id", "id"))
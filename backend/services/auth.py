@@ -4,17 +4,22 @@
 
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from beanie import PydanticObjectId
 
 from backend.core.config import settings
+from backend.core.deps import token_subject
+from backend.core.identity_map import load
+from backend.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    verify_password,
+    verify_password_async,
+)
 from backend.models.user import User
 from backend.schemas.user import UserCreate
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 
@@ -22,11 +27,11 @@ class AuthService:
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """验证密码"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return verify_password(plain_password, hashed_password)
     
     def get_password_hash(self, password: str) -> str:
         """密码哈希"""
-        return pwd_context.hash(password)
+        return get_password_hash(password)
     
     async def create_user(self, user_data: UserCreate) -> Optional[User]:
         """创建用户"""
@@ -48,7 +53,7 @@ class AuthService:
         user = User(
             email=user_data.email,
             username=user_data.username,
-            hashed_password=self.get_password_hash(user_data.password)
+            hashed_password=await get_password_hash_async(user_data.password)
         )
         await user.save()
         return user
@@ -63,7 +68,7 @@ class AuthService:
             ]}
         )
         
-        if not user or not self.verify_password(password, user.hashed_password):
+        if not user or not await verify_password_async(password, user.hashed_password):
             return None
         return user
     
@@ -80,16 +85,11 @@ class AuthService:
     
     async def get_current_user(self, token: str) -> Optional[User]:
         """从token获取当前用户"""
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            user_id: str = payload.get("sub")
-            if user_id is None:
-                return None
-        except JWTError:
+        user_id = token_subject(token)
+        if user_id is None:
             return None
         
-        user = await User.get(PydanticObjectId(user_id))
-        return user
+        return await load(User, user_id)
 
 
 async def get_current_user(
@@ -0,0 +1,171 @@
+"""
+批量写入器 - 导入时的分块无序写入
+
+原始字典按条数和估算字节数切分成块，每块一次 unordered bulk_write，
+最多 max_in_flight 个块同时在途；每块写完后回调一次，用于合并计数器更新。
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+from backend.core.config import settings
+from backend.core.logger import logger
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def import_write_concern() -> WriteConcern:
+    """导入使用的写关注，默认 w=1 且不等待journal"""
+    w = settings.IMPORT_WRITE_CONCERN_W
+    if isinstance(w, str) and w.isdigit():
+        w = int(w)
+    return WriteConcern(w=w, j=settings.IMPORT_WRITE_CONCERN_J or None)
+
+
+def estimate_bson_size(value) -> int:
+    """粗略估算BSON大小，只用于切块，不需要精确"""
+    if isinstance(value, dict):
+        return 5 + sum(len(key) + 2 + estimate_bson_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (int, float)):
+            # 向量: 每个元素 类型1 + 下标键约5 + double 8
+            return 5 + 14 * len(value)
+        return 5 + sum(6 + estimate_bson_size(item) for item in value)
+    if isinstance(value, str):
+        return 5 + len(value.encode("utf-8"))
+    return 8
+
+
+@dataclass
+class BulkWriteStats:
+    """写入统计"""
+    inserted: int = 0
+    duplicates: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.inserted / self.elapsed if self.elapsed else 0.0
+
+
+class BulkWriter:
+    """
+    分块、无序、并发的批量插入
+
+    用法:
+        async with BulkWriter(collection, on_chunk=inc_counter) as writer:
+            for doc in docs:
+                await writer.insert(doc)
+
+    重复键错误（指纹唯一索引）视为已导入，计入duplicates而不中断导入，
+    被跳过的文档的_id记在duplicate_ids中，调用方据此只处理实际写入的文档。
+    """
+
+    def __init__(
+        self,
+        collection,
+        chunk_docs: Optional[int] = None,
+        chunk_bytes: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        write_concern: Optional[WriteConcern] = None,
+        on_chunk: Optional[Callable[[int], Awaitable[None]]] = None,
+    ):
+        self.collection = collection.with_options(
+            write_concern=write_concern or import_write_concern()
+        )
+        self.chunk_docs = chunk_docs or settings.BULK_WRITE_CHUNK_DOCS
+        self.chunk_bytes = chunk_bytes or settings.BULK_WRITE_CHUNK_BYTES
+        self.on_chunk = on_chunk
+        self.stats = BulkWriteStats()
+        self.duplicate_ids: Set = set()
+
+        self._semaphore = asyncio.Semaphore(max_in_flight or settings.BULK_WRITE_IN_FLIGHT)
+        self._tasks: Set[asyncio.Task] = set()
+        self._buffer: List[Dict] = []
+        self._buffer_bytes = 0
+        self._started: Optional[float] = None
+        self._error: Optional[BaseException] = None
+
+    async def __aenter__(self) -> "BulkWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.flush()
+        else:
+            # 出错时等待在途的写入结束，不再提交剩余缓冲
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def insert(self, doc: Dict):
+        """缓冲一条文档，攒满一块后提交"""
+        if self._error is not None:
+            raise self._error
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._buffer.append(doc)
+        self._buffer_bytes += estimate_bson_size(doc)
+        if len(self._buffer) >= self.chunk_docs or self._buffer_bytes >= self.chunk_bytes:
+            await self._submit()
+
+    async def insert_many(self, docs: Iterable[Dict]):
+        for doc in docs:
+            await self.insert(doc)
+
+    async def flush(self) -> BulkWriteStats:
+        """提交剩余缓冲并等待所有在途写入完成"""
+        if self._buffer:
+            await self._submit()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._error is not None:
+            raise self._error
+        if self._started is not None:
+            self.stats.elapsed = time.perf_counter() - self._started
+        return self.stats
+
+    async def _submit(self):
+        chunk, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        # 在途块数达到上限时在这里等待，形成背压
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._write_chunk(chunk))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write_chunk(self, chunk: List[Dict]):
+        try:
+            try:
+                result = await self.collection.bulk_write(
+                    [InsertOne(doc) for doc in chunk], ordered=False
+                )
+                inserted = result.inserted_count
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if e.details.get("writeConcernErrors") or any(
+                    err.get("code") != DUPLICATE_KEY_ERROR for err in errors
+                ):
+                    raise
+                inserted = e.details.get("nInserted", 0)
+                self.stats.duplicates += len(errors)
+                self.duplicate_ids.update(
+                    chunk[err["index"]]["_id"] for err in errors if "_id" in chunk[err["index"]]
+                )
+                logger.info(f"批量写入跳过 {len(errors)} 条重复文档")
+
+            self.stats.inserted += inserted
+            self.stats.chunks += 1
+            if self.on_chunk and inserted:
+                await self.on_chunk(inserted)
+        except Exception as e:
+            # 记录第一个错误，由下一次insert或flush抛出
+            if self._error is None:
+                self._error = e
+            raise
+        finally:
+            self._semaphore.release()
@@ -2,14 +2,18 @@
 对话服务
 """
 
+import asyncio
 from typing import List, Optional, Dict
 from datetime import datetime
 from beanie import PydanticObjectId
 from backend.models.chat_model import Chat, ChatMessage
-from backend.models.persona import Persona
+from backend.models.persona import Persona, PersonaStatus
 from backend.services.rag_service import RAGService
 from backend.services.message_service import MessageService
+from backend.core.identity_map import load
 from backend.core.logger import logger
+from backend.core.pagination import after_cursor
+from backend.schemas.chat import ChatSummary
 
 
 class ChatService:
@@ -20,6 +24,24 @@ class ChatService:
         self.rag_service = RAGService()
         self.message_service = MessageService()
     
+    async def _retrieve(self, persona_id: str, query: str) -> Dict:
+        """各检索通道并发执行，查询向量只生成一次"""
+        query_embedding = await self.rag_service.generate_embedding(query)
+        context_messages, context_windows, exemplars = await asyncio.gather(
+            self.rag_service.hybrid_search(persona_id=persona_id, query=query, limit=10),
+            self.rag_service.search_windows(
+                persona_id=persona_id, query=query, query_embedding=query_embedding
+            ),
+            self.rag_service.search_exemplars(
+                persona_id=persona_id, query=query, query_embedding=query_embedding
+            ),
+        )
+        return {
+            "context_messages": context_messages,
+            "context_windows": context_windows,
+            "exemplars": exemplars,
+        }
+    
     async def create_chat(
         self,
         user_id: str,
@@ -29,8 +51,8 @@ class ChatService:
         """创建新对话"""
         try:
             # 验证人格存在
-            persona = await Persona.get(PydanticObjectId(persona_id))
-            if not persona:
+            persona = await load(Persona, persona_id)
+            if not persona or persona.status == PersonaStatus.DELETING:
                 raise ValueError("人格不存在")
             
             # 创建对话
@@ -53,7 +75,7 @@ class ChatService:
     async def get_chat(self, chat_id: str) -> Optional[Chat]:
         """获取对话"""
         try:
-            return await Chat.get(PydanticObjectId(chat_id))
+            return await load(Chat, chat_id)
         except Exception as e:
             logger.error(f"获取对话失败: {str(e)}")
             raise
@@ -62,13 +84,20 @@ class ChatService:
         self,
         user_id: str,
         limit: int = 20,
-        skip: int = 0
-    ) -> List[Chat]:
-        """获取用户的对话列表"""
+        skip: int = 0,
+        cursor: Optional[str] = None
+    ) -> List[ChatSummary]:
+        """
+        获取用户的对话列表（按最近更新倒序，传入cursor时按游标翻页，忽略skip）
+        
+        只投影摘要字段，不读取messages数组。
+        """
         try:
-            chats = await Chat.find(
-                {"user_id": PydanticObjectId(user_id)}
-            ).sort("-updated_at").skip(skip).limit(limit).to_list()
+            query = after_cursor({"user_id": PydanticObjectId(user_id)}, "updated_at", cursor)
+            find = Chat.find(query).sort("-updated_at", "-_id").project(ChatSummary)
+            if not cursor and skip:
+                find = find.skip(skip)
+            chats = await find.limit(limit).to_list()
             
             return chats
             
@@ -85,7 +114,7 @@ class ChatService:
         """发送消息并获取回复"""
         try:
             # 获取对话
-            chat = await Chat.get(PydanticObjectId(chat_id))
+            chat = await load(Chat, chat_id)
             if not chat:
                 raise ValueError("对话不存在")
             
@@ -104,11 +133,7 @@ class ChatService:
             
             if generate_response:
                 # 搜索相关上下文
-                context_messages = await self.rag_service.hybrid_search(
-                    persona_id=str(chat.persona_id),
-                    query=content,
-                    limit=10
-                )
+                retrieved = await self._retrieve(str(chat.persona_id), content)
                 
                 # 构建聊天历史
                 chat_history = [
@@ -120,8 +145,8 @@ class ChatService:
                 response_content = await self.rag_service.generate_response(
                     persona_id=str(chat.persona_id),
                     user_input=content,
-                    context_messages=context_messages,
-                    chat_history=chat_history
+                    chat_history=chat_history,
+                    **retrieved
                 )
                 
                 # 创建助手消息
@@ -136,6 +161,7 @@ class ChatService:
                 result["assistant_message"] = assistant_message
             
             # 保存对话
+            chat.refresh_summary()
             await chat.save()
             
             return result
@@ -152,7 +178,7 @@ class ChatService:
         """重新生成回复"""
         try:
             # 获取对话
-            chat = await Chat.get(PydanticObjectId(chat_id))
+            chat = await load(Chat, chat_id)
             if not chat:
                 raise ValueError("对话不存在")
             
@@ -182,18 +208,14 @@ class ChatService:
                 ]
             
             # 搜索相关上下文
-            context_messages = await self.rag_service.hybrid_search(
-                persona_id=str(chat.persona_id),
-                query=user_input,
-                limit=10
-            )
+            retrieved = await self._retrieve(str(chat.persona_id), user_input)
             
             # 生成新回复
             response_content = await self.rag_service.generate_response(
                 persona_id=str(chat.persona_id),
                 user_input=user_input,
-                context_messages=context_messages,
-                chat_history=chat_history
+                chat_history=chat_history,
+                **retrieved
             )
             
             # 更新消息
@@ -202,6 +224,7 @@ class ChatService:
             chat.updated_at = datetime.now()
             
             # 保存对话
+            chat.refresh_summary()
             await chat.save()
             
             return chat.messages[message_index]
@@ -213,7 +236,7 @@ class ChatService:
     async def delete_chat(self, chat_id: str) -> bool:
         """删除对话"""
         try:
-            chat = await Chat.get(PydanticObjectId(chat_id))
+            chat = await load(Chat, chat_id)
             if chat:
                 await chat.delete()
                 return True
@@ -226,12 +249,13 @@ class ChatService:
     async def clear_chat_history(self, chat_id: str) -> Chat:
         """清空对话历史"""
         try:
-            chat = await Chat.get(PydanticObjectId(chat_id))
+            chat = await load(Chat, chat_id)
             if not chat:
                 raise ValueError("对话不存在")
             
             chat.messages = []
             chat.updated_at = datetime.now()
+            chat.refresh_summary()
             await chat.save()
             
             return chat
@@ -243,12 +267,12 @@ class ChatService:
     async def export_chat(self, chat_id: str) -> Dict:
         """导出对话"""
         try:
-            chat = await Chat.get(PydanticObjectId(chat_id))
+            chat = await load(Chat, chat_id)
             if not chat:
                 raise ValueError("对话不存在")
             
             # 获取人格信息
-            persona = await Persona.get(chat.persona_id)
+            persona = await load(Persona, chat.persona_id)
             
             export_data = {
                 "chat_id": str(chat.id),
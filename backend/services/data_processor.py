@@ -4,9 +4,11 @@
 
 import os
 import json
+import asyncio
 import zipfile
 import chardet
-from typing import List, Dict, Optional, Tuple
+from collections import Counter
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 from datetime import datetime
 import logging
 from pathlib import Path
@@ -16,7 +18,10 @@ from backend.models.persona import Persona, PersonaStatus
 from backend.models.message import Message
 from backend.services.message_service import MessageService
 from backend.services.rag_service import RAGService
+from backend.services.html_chat_parser import iter_html_chat_batches
+from backend.services.persona_stats import PersonaStatsService
 from backend.core.config import settings
+from backend.core.identity_map import document_cache, load
 from beanie import PydanticObjectId
 
 logger = logging.getLogger(__name__)
@@ -36,14 +41,21 @@ class DataProcessorService:
         }
         self.message_service = MessageService()
         self.rag_service = RAGService()
+        self.stats_service = PersonaStatsService()
     
     async def process_chat_data(
         self,
         file_path: str,
         user_id: str,
-        task_id: str
+        task_id: str,
+        persona_id: Optional[str] = None
     ) -> Dict:
-        """处理聊天数据的主入口"""
+        """
+        处理聊天数据的主入口
+        
+        指定persona_id时为追加模式：按消息指纹跳过已导入的部分，
+        只为新增消息生成向量并写入。
+        """
         # 导入task_status_store
         from backend.api.upload import task_status_store
         
@@ -55,45 +67,71 @@ class DataProcessorService:
             if file_ext not in self.supported_formats:
                 raise ValueError(f"不支持的文件类型: {file_ext}")
             
-            # 2. 创建Persona记录
-            persona = await self._create_persona(user_id, file_path)
-            
-            # 3. 解析聊天记录
-            messages = await self.supported_formats[file_ext](file_path)
-            logger.info(f"解析出 {len(messages)} 条消息")
-            
-            if not messages:
-                await self._update_persona_status(persona, PersonaStatus.ERROR)
-                raise ValueError("未能解析出任何消息")
-            
-            # 4. 数据清洗和分析
-            cleaned_messages = self._clean_messages(messages)
-            persona_info = self._analyze_persona_info(cleaned_messages)
+            # 2. 创建Persona记录（追加模式下使用已有的Persona）
+            append_mode = persona_id is not None
+            if append_mode:
+                persona = await self._get_user_persona(user_id, persona_id)
+            else:
+                persona = await self._create_persona(user_id, file_path)
             
-            # 5. 保存消息到数据库（包含向量生成）
-            await self._save_messages_with_embeddings(cleaned_messages, persona.id)
+            if file_ext == '.html':
+                # 3-5. HTML导出可能有数百MB，逐批解析、清洗、写入，不整体载入内存
+                persona_info, cleaned_count, new_count = await self._ingest_html_stream(
+                    file_path, persona, task_id, append_mode
+                )
+            else:
+                # 3. 解析聊天记录
+                messages = await self.supported_formats[file_ext](file_path)
+                logger.info(f"解析出 {len(messages)} 条消息")
+                
+                if not messages:
+                    if not append_mode:
+                        await self._update_persona_status(persona, PersonaStatus.ERROR)
+                    raise ValueError("未能解析出任何消息")
+                
+                # 4. 数据清洗和分析
+                cleaned_messages = self._clean_messages(messages)
+                del messages
+                persona_info = self._analyze_persona_info(cleaned_messages)
+                cleaned_count = len(cleaned_messages)
+                
+                # 5. 保存消息到数据库（包含向量生成）
+                created = await self._save_messages_with_embeddings(
+                    cleaned_messages,
+                    persona.id,
+                    import_batch=task_id,
+                    skip_existing=append_mode,
+                    target_sender=persona.name if append_mode else persona_info['name']
+                )
+                new_count = len(created)
             
             # 7. 更新Persona信息
-            await self._update_persona_info(persona, persona_info, len(cleaned_messages))
+            message_count = persona.message_count + new_count
+            await self._update_persona_info(
+                persona, persona_info, keep_name=append_mode
+            )
             
             # 8. 清理临时文件
             self._cleanup_temp_file(file_path)
             
-            logger.info(f"处理完成: {persona.name}")
+            logger.info(f"处理完成: {persona.name}，新增 {new_count} 条消息")
             
             # 更新任务状态
             task_status_store[task_id] = {
                 "task_id": task_id,
                 "status": "completed",
                 "persona_id": str(persona.id),
-                "message_count": len(cleaned_messages),
+                "message_count": message_count,
+                "new_message_count": new_count,
+                "skipped_count": cleaned_count - new_count,
                 "error": None
             }
             
             return {
                 "status": "success",
                 "persona_id": str(persona.id),
-                "message_count": len(cleaned_messages)
+                "message_count": message_count,
+                "new_message_count": new_count
             }
             
         except Exception as e:
@@ -113,6 +151,17 @@ class DataProcessorService:
                 "error": str(e)
             }
     
+    async def _get_user_persona(self, user_id: str, persona_id: str) -> Persona:
+        """获取追加导入的目标Persona并校验归属"""
+        persona = await load(Persona, persona_id)
+        if (
+            not persona
+            or persona.user_id != PydanticObjectId(user_id)
+            or persona.status == PersonaStatus.DELETING
+        ):
+            raise ValueError("人格不存在")
+        return persona
+    
     async def _create_persona(self, user_id: str, file_path: str) -> Persona:
         """创建Persona记录"""
         persona = Persona(
@@ -177,23 +226,18 @@ class DataProcessorService:
             # 处理匹配结果
             for match in best_matches:
                 if best_format == 'simple':
-                    # 简单格式没有时间戳
+                    # 简单格式没有时间戳，留空（写入时补当前时间，指纹不受影响）
                     sender, content = match
                     messages.append({
-                        'timestamp': datetime.now(),  # 使用当前时间作为默认
+                        'timestamp': None,
                         'sender': sender.strip(),
                         'content': content.strip()
                     })
                 else:
                     # 其他格式有时间戳
                     timestamp_str, sender, content = match
-                    try:
-                        timestamp = self._parse_timestamp(timestamp_str)
-                    except:
-                        timestamp = datetime.now()  # 解析失败时使用当前时间
-                    
                     messages.append({
-                        'timestamp': timestamp,
+                        'timestamp': self._parse_timestamp(timestamp_str),
                         'sender': sender.strip(),
                         'content': content.strip()
                     })
@@ -215,10 +259,12 @@ class DataProcessorService:
         # 标准化字段名
         standardized = []
         for msg in messages:
+            original_id = msg.get('id') or msg.get('message_id')
             standardized.append({
                 'timestamp': msg.get('timestamp') or msg.get('time') or msg.get('date'),
                 'sender': msg.get('sender') or msg.get('from') or msg.get('author'),
-                'content': msg.get('content') or msg.get('text') or msg.get('message')
+                'content': msg.get('content') or msg.get('text') or msg.get('message'),
+                'original_id': str(original_id) if original_id is not None else None
             })
         
         return standardized
@@ -242,9 +288,71 @@ class DataProcessorService:
     
     async def _parse_html_chat(self, file_path: str) -> List[Dict]:
         """解析HTML格式的聊天记录（如微信导出）"""
-        # TODO: 实现HTML解析
-        # 使用BeautifulSoup解析
-        return []
+        messages = []
+        encoding = self._detect_encoding(file_path)
+        
+        # 增量解析，不构建DOM；每批之间让出事件循环
+        for batch in iter_html_chat_batches(
+            file_path,
+            encoding=encoding,
+            timestamp_parser=self._parse_timestamp
+        ):
+            messages.extend(batch)
+            await asyncio.sleep(0)
+        
+        return messages
+    
+    def _iter_clean_html_batches(self, file_path: str, encoding: str) -> Iterator[List[Dict]]:
+        """逐批解析并清洗HTML聊天记录"""
+        for batch in iter_html_chat_batches(
+            file_path,
+            encoding=encoding,
+            timestamp_parser=self._parse_timestamp
+        ):
+            cleaned = self._clean_messages(batch)
+            if cleaned:
+                yield cleaned
+    
+    async def _ingest_html_stream(
+        self,
+        file_path: str,
+        persona: Persona,
+        import_batch: str,
+        append_mode: bool
+    ) -> Tuple[Dict, int, int]:
+        """
+        流式导入HTML聊天记录，返回 (人格信息, 清洗后消息数, 新增消息数)
+        
+        第一遍只统计发送者和时间范围以确定被模拟的发送者（在线程中执行，不保留消息），
+        第二遍逐批清洗并写入；指纹的出现序号跨批次累计，与整体导入时一致。
+        """
+        encoding = self._detect_encoding(file_path)
+        persona_info = await asyncio.to_thread(
+            self._analyze_persona_info,
+            (msg for batch in self._iter_clean_html_batches(file_path, encoding) for msg in batch)
+        )
+        if persona_info is None:
+            if not append_mode:
+                await self._update_persona_status(persona, PersonaStatus.ERROR)
+            raise ValueError("未能解析出任何消息")
+        
+        target_sender = persona.name if append_mode else persona_info['name']
+        occurrences: Dict[tuple, int] = {}
+        cleaned_count = new_count = 0
+        for batch in self._iter_clean_html_batches(file_path, encoding):
+            cleaned_count += len(batch)
+            created = await self._save_messages_with_embeddings(
+                batch,
+                persona.id,
+                import_batch=import_batch,
+                skip_existing=append_mode,
+                target_sender=target_sender,
+                occurrences=occurrences
+            )
+            new_count += len(created)
+        
+        logger.info(f"流式解析出 {cleaned_count} 条消息")
+        return persona_info, cleaned_count, new_count
     
     async def _parse_db_chat(self, file_path: str) -> List[Dict]:
         """解析数据库格式的聊天记录（如微信.db）"""
@@ -285,8 +393,13 @@ class DataProcessorService:
         
         return messages
     
-    def _parse_timestamp(self, timestamp_str: str) -> datetime:
-        """解析时间戳"""
+    def _parse_timestamp(self, timestamp_str: str) -> Union[datetime, str]:
+        """
+        解析时间戳，无法识别时原样返回字符串
+        
+        不能用当前时间兜底: 指纹包含时间，否则同一份导出每次导入的指纹都不同，增量导入无法去重。
+        写入时再由coerce_timestamp统一转换。
+        """
         # 尝试多种时间格式
         formats = [
             '%Y/%m/%d, %H:%M:%S',     # 2024/1/1, 10:30:45
@@ -310,8 +423,7 @@ class DataProcessorService:
             except:
                 continue
         
-        # 如果都失败，返回当前时间
-        return datetime.now()
+        return timestamp_str
     
     def _clean_messages(self, messages: List[Dict]) -> List[Dict]:
         """清洗消息数据"""
@@ -328,76 +440,104 @@ class DataProcessorService:
             cleaned.append({
                 'content': msg['content'].strip(),
                 'sender': msg['sender'],
-                'timestamp': msg.get('timestamp') or datetime.now()
+                'timestamp': msg.get('timestamp'),
+                'original_id': msg.get('original_id')
             })
         
         return cleaned
     
-    def _analyze_persona_info(self, messages: List[Dict]) -> Dict:
-        """分析人格信息"""
-        # 找出最常见的发送者（非用户）
-        from collections import Counter
-        senders = Counter(msg['sender'] for msg in messages)
+    def _analyze_persona_info(self, messages: Iterable[Dict]) -> Optional[Dict]:
+        """分析人格信息（单遍遍历，可传入生成器），没有消息时返回None"""
+        senders = Counter()
+        date_start = date_end = None
+        for msg in messages:
+            senders[msg['sender']] += 1
+            timestamp = msg.get('timestamp')
+            if isinstance(timestamp, datetime):
+                date_start = timestamp if date_start is None else min(date_start, timestamp)
+                date_end = timestamp if date_end is None else max(date_end, timestamp)
+        if not senders:
+            return None
         
+        # 找出最常见的发送者（非用户）
         # 假设出现次数第二多的是对方（第一多的可能是用户）
         most_common = senders.most_common(2)
         persona_name = most_common[1][0] if len(most_common) > 1 else most_common[0][0]
         
-        # 获取时间范围
-        timestamps = [msg['timestamp'] for msg in messages if isinstance(msg.get('timestamp'), datetime)]
-        date_start = min(timestamps) if timestamps else None
-        date_end = max(timestamps) if timestamps else None
-        
         return {
             'name': persona_name,
             'date_range_start': date_start,
             'date_range_end': date_end
         }
     
-    async def _save_messages_with_embeddings(self, messages: List[Dict], persona_id: PydanticObjectId):
-        """保存消息到数据库（包含向量生成）"""
+    async def _save_messages_with_embeddings(
+        self,
+        messages: List[Dict],
+        persona_id: PydanticObjectId,
+        import_batch: Optional[str] = None,
+        skip_existing: bool = False,
+        target_sender: Optional[str] = None,
+        occurrences: Optional[Dict[tuple, int]] = None
+    ) -> List[Dict]:
+        """保存消息到数据库（包含向量生成和风格摘要更新），返回实际新增的消息"""
         # 准备消息数据
         messages_data = []
         for msg in messages:
             messages_data.append({
                 'content': msg['content'],
                 'sender': msg['sender'],
-                'timestamp': msg.get('timestamp', datetime.now()),
+                'timestamp': msg.get('timestamp'),
+                'original_id': msg.get('original_id'),
                 'metadata': msg.get('metadata', {})
             })
         
         # 使用MessageService批量创建消息（会自动生成向量）
-        if messages_data:
-            await self.message_service.batch_create_messages(
-                persona_id=str(persona_id),
-                messages_data=messages_data
-            )
+        if not messages_data:
+            return []
+        return await self.message_service.batch_create_messages(
+            persona_id=str(persona_id),
+            messages_data=messages_data,
+            import_batch=import_batch,
+            skip_existing=skip_existing,
+            target_sender=target_sender,
+            occurrences=occurrences
+        )
     
-    async def _update_persona_info(self, persona: Persona, info: Dict, message_count: int):
-        """更新Persona信息"""
-        persona.name = info['name']
-        persona.message_count = message_count
-        persona.date_range_start = info.get('date_range_start')
-        persona.date_range_end = info.get('date_range_end')
-        persona.status = PersonaStatus.READY
+    async def _update_persona_info(
+        self,
+        persona: Persona,
+        info: Dict,
+        keep_name: bool = False
+    ):
+        """
+        更新Persona信息
         
-        # 使用RAG服务分析对话模式
-        patterns = await self.rag_service.analyze_conversation_patterns(
-            persona_id=str(persona.id),
-            sample_size=100
-        )
+        只$set分析得出的字段，message_count和ingest_stats已在写入消息时
+        原子递增，整体save()会用内存中的旧值覆盖它们；风格画像由写入
+        消息时增量更新的摘要派生。已标记删除的人格不再改写状态。
+        """
+        updates = {"status": PersonaStatus.READY}
+        if not keep_name:
+            updates["name"] = info['name']
         
-        if patterns:
-            persona.style_features = patterns.get('emotional_patterns', {})
-            persona.sentence_patterns = patterns.get('response_patterns', {})
-            persona.topic_preferences = patterns.get('topic_transitions', [])
+        # 时间范围取数据库中该人格的全部消息（追加导入时自然合并）
+        updates.update(await self.stats_service.date_range(str(persona.id)))
         
-        await persona.save()
+        updates["updated_at"] = datetime.utcnow()
+        await self._set_unless_deleting(persona, updates)
     
     async def _update_persona_status(self, persona: Persona, status: PersonaStatus):
         """更新Persona状态"""
-        persona.status = status
-        await persona.save()
+        await self._set_unless_deleting(persona, {"status": status, "updated_at": datetime.utcnow()})
+    
+    async def _set_unless_deleting(self, persona: Persona, updates: Dict):
+        """只在人格未被标记删除时写入，避免导入结束时把 deleting 覆盖回 ready/error"""
+        await Persona.find_one(
+            {"_id": persona.id, "status": {"$ne": PersonaStatus.DELETING}}
+        ).update({"$set": updates})
+        document_cache.invalidate(Persona, persona.id)
+        for key, value in updates.items():
+            setattr(persona, key, value)
     
     def _cleanup_temp_file(self, file_path: str):
         """清理临时文件"""
@@ -0,0 +1,235 @@
+"""
+向量回填任务 - 为缺失向量（或降级写入了模拟向量）的文档补生成向量
+
+- 单个按 _id 升序的游标遍历待处理文档，只取文本字段
+- 每批内按向量接口上限分组，有限并发请求
+- 用 UpdateOne 批量写回，每批写完后记录检查点，中断后从 last_id 继续
+- 向量接口失败时重试，仍失败则任务标记为 failed，不会降级为模拟向量
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from backend.core.config import settings
+from backend.core.logger import logger
+from backend.models.backfill_checkpoint import BackfillCheckpoint
+from backend.models.message import Message
+from backend.models.message_window import MessageWindow
+from backend.models.reply_pair import ReplyPair
+from backend.services.rag_service import RAGService
+
+# Azure OpenAI 每次请求最多16条文本
+EMBEDDING_REQUEST_SIZE = 16
+
+TARGETS = {
+    "messages": (Message, "content"),
+    "message_windows": (MessageWindow, "text"),
+    "reply_pairs": (ReplyPair, "prompt"),
+}
+
+
+def default_target() -> str:
+    return "message_windows" if settings.EMBEDDING_UNIT == "window" else "messages"
+
+
+def backfill_query(
+    target: str,
+    persona_id: Optional[str] = None,
+    include_mock: bool = False,
+    after_id: Optional[PydanticObjectId] = None
+) -> Dict:
+    """待回填文档的查询条件"""
+    query: Dict = {}
+    if persona_id:
+        query["persona_id"] = PydanticObjectId(persona_id)
+    if target == "messages":
+        # 被过滤的消息本来就不生成向量
+        query["filter_reason"] = None
+    if include_mock:
+        # 模拟向量的分量全部在[0, 1)之间，真实向量必然有负分量；
+        # 该条件同时匹配embedding为空或缺失的文档
+        query["embedding"] = {"$not": {"$elemMatch": {"$lt": 0}}}
+    else:
+        query["embedding"] = None
+    if after_id:
+        query["_id"] = {"$gt": after_id}
+    return query
+
+
+class EmbeddingBackfillJob:
+    """可续传的向量回填任务"""
+
+    # 进程内正在运行的任务: job_id -> Task
+    _running: Dict[str, asyncio.Task] = {}
+
+    def __init__(
+        self,
+        persona_id: Optional[str] = None,
+        target: Optional[str] = None,
+        include_mock: bool = False,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        rag_service: Optional[RAGService] = None,
+        on_progress: Optional[Callable[[BackfillCheckpoint], None]] = None,
+    ):
+        self.persona_id = persona_id
+        self.target = target or default_target()
+        if self.target not in TARGETS:
+            raise ValueError(f"不支持的回填目标: {self.target}")
+        self.include_mock = include_mock
+        self.batch_size = batch_size or settings.BACKFILL_BATCH_SIZE
+        self.concurrency = concurrency or settings.BACKFILL_CONCURRENCY
+        self.rag_service = rag_service or RAGService()
+        self.on_progress = on_progress
+
+    @property
+    def job_id(self) -> str:
+        scope = self.persona_id or "all"
+        return f"{self.target}:{scope}:{'mock' if self.include_mock else 'missing'}"
+
+    def start(self) -> bool:
+        """在后台启动任务，同一任务已在运行时返回False"""
+        task = self._running.get(self.job_id)
+        if task and not task.done():
+            return False
+        task = asyncio.create_task(self.run())
+        self._running[self.job_id] = task
+        task.add_done_callback(lambda _: self._running.pop(self.job_id, None))
+        return True
+
+    async def load_checkpoint(self) -> BackfillCheckpoint:
+        """读取检查点；上次已完成则从头开始"""
+        checkpoint = await BackfillCheckpoint.find_one({"job_id": self.job_id})
+        if checkpoint and checkpoint.status != "completed":
+            return checkpoint
+        if checkpoint:
+            await checkpoint.delete()
+        return BackfillCheckpoint(
+            job_id=self.job_id,
+            target=self.target,
+            persona_id=PydanticObjectId(self.persona_id) if self.persona_id else None,
+            include_mock=self.include_mock,
+        )
+
+    async def run(self) -> BackfillCheckpoint:
+        """执行回填，返回最终检查点"""
+        model, text_field = TARGETS[self.target]
+        collection = model.get_motor_collection()
+
+        checkpoint = await self.load_checkpoint()
+        checkpoint.status = "running"
+        checkpoint.error = None
+        query = backfill_query(self.target, self.persona_id, self.include_mock, checkpoint.last_id)
+        remaining = await collection.count_documents(query)
+        checkpoint.total = checkpoint.processed + remaining
+        await checkpoint.save()
+        logger.info(f"向量回填 {self.job_id}: 待处理 {remaining} 条")
+
+        started = time.perf_counter()
+        processed_at_start = checkpoint.processed
+        touched_personas = set()
+        cursor = collection.find(
+            query, {text_field: 1, "persona_id": 1}
+        ).sort("_id", 1).batch_size(self.batch_size)
+
+        try:
+            batch: List[Dict] = []
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    await self._process_batch(collection, batch, text_field, checkpoint)
+                    touched_personas.update(str(d["persona_id"]) for d in batch)
+                    self._update_rate(checkpoint, started, processed_at_start)
+                    await checkpoint.save()
+                    batch = []
+            if batch:
+                await self._process_batch(collection, batch, text_field, checkpoint)
+                touched_personas.update(str(d["persona_id"]) for d in batch)
+                self._update_rate(checkpoint, started, processed_at_start)
+
+            checkpoint.status = "completed"
+            checkpoint.eta_seconds = 0
+        except Exception as e:
+            checkpoint.status = "failed"
+            checkpoint.error = str(e)
+            logger.error(f"向量回填失败 {self.job_id}: {str(e)}，可从 {checkpoint.last_id} 继续")
+        finally:
+            checkpoint.updated_at = datetime.utcnow()
+            await checkpoint.save()
+            cache = {
+                "message_windows": self.rag_service.window_cache,
+                "reply_pairs": self.rag_service.pair_cache,
+            }.get(self.target)
+            if cache is not None:
+                # 文档数量不变，缓存不会按数量失效，需要显式清除
+                for persona_id in touched_personas:
+                    cache.invalidate(persona_id)
+
+        logger.info(
+            f"向量回填 {self.job_id} {checkpoint.status}: "
+            f"{checkpoint.processed}/{checkpoint.total}，{checkpoint.rate:.1f} docs/s"
+        )
+        return checkpoint
+
+    async def _process_batch(
+        self,
+        collection,
+        batch: List[Dict],
+        text_field: str,
+        checkpoint: BackfillCheckpoint
+    ):
+        """并发生成一批向量并批量写回，成功后推进检查点"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def embed(group: List[Dict]) -> List[UpdateOne]:
+            async with semaphore:
+                embeddings = await self._embed_with_retry(
+                    [doc.get(text_field) or "" for doc in group]
+                )
+            return [
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": embedding}})
+                for doc, embedding in zip(group, embeddings)
+            ]
+
+        groups = [
+            batch[i:i + EMBEDDING_REQUEST_SIZE]
+            for i in range(0, len(batch), EMBEDDING_REQUEST_SIZE)
+        ]
+        results = await asyncio.gather(*(embed(group) for group in groups))
+        operations = [op for ops in results for op in ops]
+        await collection.bulk_write(operations, ordered=False)
+
+        checkpoint.last_id = batch[-1]["_id"]
+        checkpoint.processed += len(batch)
+
+    async def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """生成向量，失败时指数退避重试"""
+        for attempt in range(settings.MAX_RETRIES):
+            try:
+                embeddings = await self.rag_service.batch_generate_embeddings(texts, fallback=False)
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"向量数量不匹配: {len(embeddings)} != {len(texts)}")
+                return embeddings
+            except Exception:
+                if attempt == settings.MAX_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    def _update_rate(self, checkpoint: BackfillCheckpoint, started: float, processed_at_start: int):
+        elapsed = time.perf_counter() - started
+        done = checkpoint.processed - processed_at_start
+        checkpoint.rate = done / elapsed if elapsed else 0.0
+        remaining = checkpoint.total - checkpoint.processed
+        checkpoint.eta_seconds = remaining / checkpoint.rate if checkpoint.rate else None
+        checkpoint.updated_at = datetime.utcnow()
+        logger.info(
+            f"向量回填 {self.job_id}: {checkpoint.processed}/{checkpoint.total}，"
+            f"{checkpoint.rate:.1f} docs/s，预计剩余 {checkpoint.eta_seconds or 0:.0f}s"
+        )
+        if self.on_progress:
+            self.on_progress(checkpoint)
@@ -0,0 +1,216 @@
+"""
+HTML聊天记录解析器 - 事件驱动、增量解析
+
+基于标准库 html.parser 的 SAX 风格解析，不构建 DOM，按块读取文件并
+逐批产出消息，适用于数百MB的微信/WhatsApp/Telegram HTML导出。
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 消息容器的class标记
+CONTAINER_TOKENS = {
+    "message", "msg", "chat_message", "message_item", "msg_item", "chat_item",
+}
+
+# 需要跳过的容器（日期分隔、入群提示等系统消息）
+SKIP_TOKENS = {"service", "system", "notice", "date_separator"}
+
+# 字段角色 -> class标记
+ROLE_TOKENS = {
+    "sender": {
+        "from_name", "from", "nickname", "nick", "sender", "author",
+        "name", "username", "display_name", "sender_name",
+    },
+    "timestamp": {
+        "date", "time", "timestamp", "datetime", "msg_time", "send_time",
+    },
+    "content": {
+        "text", "content", "msg_content", "message_text", "message_content",
+        "bubble",
+    },
+}
+
+# 时间元素上可能携带完整时间的属性
+TIME_ATTRIBUTES = ("title", "datetime", "data-time", "data-timestamp")
+
+# 无结束标签的元素
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+# Telegram导出的时间带有时区后缀: 01.01.2024 10:30:45 UTC+08:00
+_TZ_SUFFIX = re.compile(r"\s*UTC[+-]\d{2}:?\d{2}$")
+
+
+def _class_tokens(attrs: List[Tuple[str, Optional[str]]]) -> set:
+    """提取并规范化class标记"""
+    for name, value in attrs:
+        if name == "class" and value:
+            return {token.lower().replace("-", "_") for token in value.split()}
+    return set()
+
+
+class ChatHTMLParser(HTMLParser):
+    """
+    聊天记录HTML的事件驱动解析器
+
+    通过class名识别消息容器及其中的发送者、时间、内容字段，
+    解析出的消息暂存在 pending 中，由调用方在每次 feed 后取走。
+    """
+
+    def __init__(self, timestamp_parser: Optional[Callable[[str], object]] = None):
+        super().__init__(convert_charrefs=True)
+        self.timestamp_parser = timestamp_parser
+        self.pending: List[Dict] = []
+        # 元素栈: (tag, role, is_container)
+        self._stack: List[Tuple[str, Optional[str], bool]] = []
+        self._in_message = False
+        self._skip_message = False
+        self._fields: Dict[str, List[str]] = {}
+        self._time_attr: Optional[str] = None
+        self._last_sender: Optional[str] = None
+
+    def drain(self) -> List[Dict]:
+        """取走已解析完成的消息"""
+        messages, self.pending = self.pending, []
+        return messages
+
+    def _current_role(self) -> Optional[str]:
+        for _, role, is_container in reversed(self._stack):
+            if role:
+                return role
+            if is_container:
+                return None
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        tokens = _class_tokens(attrs)
+
+        if tag in VOID_TAGS:
+            if self._in_message and not self._skip_message:
+                role = self._current_role()
+                if role == "content":
+                    if tag == "br":
+                        self._fields.setdefault("content", []).append("\n")
+                    elif tag == "img":
+                        alt = dict(attrs).get("alt")
+                        self._fields.setdefault("content", []).append(alt or "[图片]")
+            return
+
+        if not self._in_message and tokens & CONTAINER_TOKENS:
+            self._in_message = True
+            self._skip_message = bool(tokens & SKIP_TOKENS)
+            self._fields = {}
+            self._time_attr = None
+            self._stack.append((tag, None, True))
+            return
+
+        role = None
+        if self._in_message and self._current_role() is None:
+            if tag == "time":
+                role = "timestamp"
+            else:
+                for candidate, candidate_tokens in ROLE_TOKENS.items():
+                    if tokens & candidate_tokens and candidate not in self._fields:
+                        role = candidate
+                        break
+            if role == "timestamp":
+                attr_map = dict(attrs)
+                for attr in TIME_ATTRIBUTES:
+                    if attr_map.get(attr):
+                        self._time_attr = attr_map[attr]
+                        break
+            if role:
+                self._fields[role] = []
+
+        self._stack.append((tag, role, False))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+
+        # 弹出到匹配的标签为止（容忍未闭合的子元素）
+        while self._stack:
+            open_tag, _, is_container = self._stack.pop()
+            if is_container:
+                self._finish_message()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self._in_message or self._skip_message:
+            return
+        role = self._current_role()
+        if role:
+            self._fields[role].append(data)
+
+    def _finish_message(self):
+        """容器闭合时产出一条消息"""
+        fields = self._fields
+        skip = self._skip_message
+        self._in_message = False
+        self._skip_message = False
+        self._fields = {}
+
+        if skip:
+            return
+
+        content = "".join(fields.get("content", [])).strip()
+        if not content:
+            return
+
+        sender = " ".join("".join(fields.get("sender", [])).split())
+        if sender:
+            self._last_sender = sender
+        else:
+            # Telegram的连续消息省略发送者，沿用上一条
+            sender = self._last_sender or "Unknown"
+
+        raw_time = self._time_attr or "".join(fields.get("timestamp", []))
+        raw_time = _TZ_SUFFIX.sub("", " ".join(raw_time.split()))
+        timestamp = raw_time or None
+        if raw_time and self.timestamp_parser:
+            timestamp = self.timestamp_parser(raw_time)
+
+        self.pending.append({
+            "timestamp": timestamp,
+            "sender": sender,
+            "content": content,
+        })
+
+
+def iter_html_chat_batches(
+    file_path: str,
+    encoding: str = "utf-8",
+    batch_size: int = 1000,
+    chunk_size: int = 256 * 1024,
+    timestamp_parser: Optional[Callable[[str], object]] = None,
+) -> Iterator[List[Dict]]:
+    """按块读取HTML文件，逐批产出解析出的消息"""
+    parser = ChatHTMLParser(timestamp_parser=timestamp_parser)
+    batch: List[Dict] = []
+
+    with open(file_path, "r", encoding=encoding, errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            batch.extend(parser.drain())
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+
+    parser.close()
+    batch.extend(parser.drain())
+    while batch:
+        yield batch[:batch_size]
+        batch = batch[batch_size:]
@@ -0,0 +1,162 @@
+"""
+词典匹配 - 多模式Aho-Corasick自动机
+
+情绪、提问、打招呼、口头禅等词典构建成一个自动机，一条消息只扫描一遍
+就得到所有类别的命中，代价与词典大小无关。导入时用于填充
+Message.emotion/keywords，检索和生成回复时用于判断用户输入。
+
+词典可通过 LEXICON_FILE（JSON，{类别: [词, ...]}）追加或覆盖。
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.core.config import settings
+from backend.core.logger import logger
+
+POSITIVE = "positive"
+NEGATIVE = "negative"
+NEUTRAL = "neutral"
+QUESTION = "question"
+GREETING = "greeting"
+CATCH_PHRASE = "catch_phrase"
+
+DEFAULT_LEXICONS: Dict[str, List[str]] = {
+    POSITIVE: ["好", "哈哈", "开心", "高兴", "喜欢", "棒", "😊", "😄", "❤️"],
+    NEGATIVE: ["不", "难过", "伤心", "生气", "讨厌", "烦", "唉", "😔", "😢", "😡"],
+    QUESTION: ["？", "?", "吗", "呢", "么", "哪", "什么", "怎么", "为什么"],
+    GREETING: ["你好", "在吗", "早上好", "早安", "晚安", "嗨", "哈喽", "hello", "hi"],
+    CATCH_PHRASE: [],
+}
+
+# 写入Message.keywords的类别（情绪由emotion字段表示，提问标记过于常见）
+KEYWORD_CATEGORIES = (GREETING, CATCH_PHRASE)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and (char.isalnum() or char == "_")
+
+
+class Lexicon:
+    """多类别词典的Aho-Corasick自动机"""
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]]):
+        self.lexicons = {category: sorted(set(terms)) for category, terms in lexicons.items()}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str, bool, bool]]] = [[]]
+
+        for category, terms in self.lexicons.items():
+            for term in terms:
+                if term:
+                    self._add(term, category)
+        self._build_failure_links()
+
+        # 匹配只可能落在词典字符组成的连续片段内，其余文本交给正则在C层跳过
+        alphabet = "".join(sorted(set().union(*self._goto)))
+        self._runs = re.compile(f"[{re.escape(alphabet)}]+") if alphabet else None
+
+    def _add(self, term: str, category: str):
+        state = 0
+        for char in term:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        # 英文词两端需是单词边界，避免"hi"命中"this"、"shipping"
+        self._output[state].append((category, term, _is_word_char(term[0]), _is_word_char(term[-1])))
+
+    def _build_failure_links(self):
+        # 按深度广度优先，失败指针指向最长的真后缀状态，并继承其输出
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """逐个产出命中 (起始位置, 类别, 词)，允许重叠"""
+        if not text or self._runs is None:
+            return
+        goto, fail, output = self._goto, self._fail, self._output
+        for run in self._runs.finditer(text):
+            offset = run.start()
+            state = 0
+            for i, char in enumerate(run.group()):
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                for category, term, bounded_start, bounded_end in output[state]:
+                    start, end = offset + i - len(term) + 1, offset + i + 1
+                    if bounded_start and start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if bounded_end and end < len(text) and _is_word_char(text[end]):
+                        continue
+                    yield start, category, term
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """扫描一次，返回各类别命中的词（按首次出现排序、去重）"""
+        hits: Dict[str, List[str]] = {}
+        for _, category, term in self.finditer(text):
+            terms = hits.setdefault(category, [])
+            if term not in terms:
+                terms.append(term)
+        return hits
+
+    def with_terms(self, category: str, terms: Iterable[str]) -> "Lexicon":
+        """追加某类别的词后构建新的自动机"""
+        lexicons = dict(self.lexicons)
+        lexicons[category] = list(lexicons.get(category, [])) + list(terms)
+        return Lexicon(lexicons)
+
+
+def emotion_of(hits: Dict[str, List[str]]) -> str:
+    """同时命中积极和消极词时视为中性"""
+    positive, negative = POSITIVE in hits, NEGATIVE in hits
+    if positive and not negative:
+        return POSITIVE
+    if negative and not positive:
+        return NEGATIVE
+    return NEUTRAL
+
+
+def annotate(text: str, lexicon: Optional["Lexicon"] = None) -> Tuple[str, List[str]]:
+    """单条消息的情绪标签和关键词"""
+    hits = (lexicon or get_lexicon()).scan(text)
+    keywords = [term for category in KEYWORD_CATEGORIES for term in hits.get(category, [])]
+    return emotion_of(hits), keywords
+
+
+def load_lexicons(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """默认词典合并 LEXICON_FILE 中的配置"""
+    lexicons = {category: list(terms) for category, terms in DEFAULT_LEXICONS.items()}
+    path = path or settings.LEXICON_FILE
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                configured = json.load(f)
+            for category, terms in configured.items():
+                lexicons[category] = list(terms)
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载词典配置失败，使用默认词典: {str(e)}")
+    return lexicons
+
+
+@lru_cache(maxsize=128)
+def _cached_lexicon(catch_phrases: Tuple[str, ...]) -> Lexicon:
+    base = Lexicon(load_lexicons())
+    return base.with_terms(CATCH_PHRASE, catch_phrases) if catch_phrases else base
+
+
+def get_lexicon(catch_phrases: Sequence[str] = ()) -> Lexicon:
+    """进程内共享的自动机，可附加人格口头禅（按口头禅集合缓存）"""
+    return _cached_lexicon(tuple(sorted(set(catch_phrases))))
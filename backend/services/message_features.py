@@ -0,0 +1,44 @@
+"""
+单条消息特征 - 导入时计算并存储
+
+情绪标签、关键词、是否提问、长度区间在导入时一次算好写入Message，
+检索的情绪/提问通道和分析统计直接按字段走索引，不再回头扫描原文。
+"""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+from backend.services.lexicon import KEYWORD_CATEGORIES, QUESTION, Lexicon, emotion_of, get_lexicon
+from backend.services.style_analytics import LENGTH_BUCKETS
+from backend.services.tokenizer import MAX_KEYWORDS
+
+# 占位消息（[图片]等）只保留消息类型
+EMPTY_FEATURES = {"emotion": None, "keywords": [], "is_question": False, "length_bucket": None}
+
+
+def length_bucket(length: int) -> int:
+    """长度区间下标，与风格画像的长度直方图（LENGTH_LABELS）一致"""
+    return max(bisect_right(LENGTH_BUCKETS, length) - 1, 0)
+
+
+def merge_keywords(lexicon_hits: List[str], tokens: List[str]) -> List[str]:
+    """词典命中在前，分词结果去重追加，总数不超过MAX_KEYWORDS"""
+    merged = list(lexicon_hits)
+    merged.extend(word for word in tokens if word not in lexicon_hits)
+    return merged[:MAX_KEYWORDS]
+
+
+def message_features(
+    text: str,
+    tokens: Optional[List[str]] = None,
+    lexicon: Optional[Lexicon] = None
+) -> Dict:
+    """词典扫描一次得到情绪、提问和关键词，tokens为该消息的分词关键词"""
+    hits = (lexicon or get_lexicon()).scan(text)
+    keywords = [term for category in KEYWORD_CATEGORIES for term in hits.get(category, [])]
+    return {
+        "emotion": emotion_of(hits),
+        "keywords": merge_keywords(keywords, tokens or []),
+        "is_question": QUESTION in hits,
+        "length_bucket": length_bucket(len(text)),
+    }
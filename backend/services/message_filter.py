@@ -0,0 +1,223 @@
+"""
+消息过滤服务 - 向量化之前的去重和低信息量过滤
+
+- 占位消息（[图片]、[表情]、<Media omitted> 等）和极短/纯笑声/纯表情消息
+  不生成向量，只计入统计
+- 完全重复的消息只为第一条生成向量
+- 近似重复（转发、复制粘贴后略作修改）用字符shingle的MinHash-LSH找候选，
+  再用Jaccard相似度确认
+"""
+
+import hashlib
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 过滤原因
+DUPLICATE = "duplicate"
+NEAR_DUPLICATE = "near_duplicate"
+PLACEHOLDER = "placeholder"
+LOW_INFO = "low_info"
+
+# 占位消息 -> 消息类型
+PLACEHOLDER_TYPES = {
+    "图片": "image", "照片": "image", "photo": "image", "image": "image",
+    "表情": "sticker", "动画表情": "sticker", "sticker": "sticker", "gif": "sticker",
+    "语音": "voice", "voice": "voice", "audio": "voice",
+    "视频": "video", "video": "video",
+    "文件": "file", "file": "file", "document": "file",
+    "链接": "link", "位置": "location", "红包": "transfer", "转账": "transfer",
+    "media": "media", "媒体": "media",
+}
+
+_PLACEHOLDER_PATTERN = re.compile(
+    r"^[\[<【(（]\s*(?P<kind>" + "|".join(sorted(PLACEHOLDER_TYPES, key=len, reverse=True)) +
+    r")\s*(?:omitted|已省略|消息)?\s*[\]>】)）]$",
+    re.IGNORECASE,
+)
+_OMITTED_PATTERN = re.compile(r"^(?P<kind>\w+) omitted$", re.IGNORECASE)
+
+# 笑声、语气词的重复
+_LAUGHTER_PATTERN = re.compile(r"^(?:[哈嘿呵嘻hH]+|[aA]*(?:ha)+h?|(?:lol)+|(?:233+)|[6]+|[嗯哦噢啊呀额]+)$")
+
+
+def normalize_text(text: str) -> str:
+    """规范化：全角转半角、小写、去掉空白和标点"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(
+        ch for ch in text
+        if not ch.isspace() and not unicodedata.category(ch).startswith("P")
+    )
+
+
+def _is_symbol_only(text: str) -> bool:
+    """纯表情符号/符号"""
+    return bool(text) and all(
+        unicodedata.category(ch)[0] in ("S", "M", "C") for ch in text
+    )
+
+
+def shingles(text: str, size: int = 2) -> frozenset:
+    """字符shingle的哈希集合（中文短句用2-gram效果最好）"""
+    if len(text) <= size:
+        return frozenset([zlib.crc32(text.encode("utf-8"))])
+    return frozenset(
+        zlib.crc32(text[i:i + size].encode("utf-8"))
+        for i in range(len(text) - size + 1)
+    )
+
+
+class MinHasher:
+    """MinHash签名，用于LSH分桶查找近似重复候选"""
+
+    PRIME = 4294967291  # 小于2^32的最大素数
+
+    def __init__(self, num_perm: int = 32, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a < 2^31 保证 a*h 在uint64范围内不溢出
+        self.a = rng.randint(1, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 2 ** 31 - 1, size=num_perm).astype(np.uint64)
+
+    def signature(self, shingle_set: frozenset) -> np.ndarray:
+        hashes = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        values = (hashes[:, None] * self.a + self.b) % np.uint64(self.PRIME)
+        return values.min(axis=0)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _count_stats(reasons: List[Optional[str]], kinds: List[Optional[str]]) -> Dict:
+    """按过滤原因和占位/低信息量细分类别计数"""
+    reason_counts = Counter(reason for reason in reasons if reason)
+    return {
+        "total": len(reasons),
+        "embedded": len(reasons) - sum(reason_counts.values()),
+        **{reason: reason_counts.get(reason, 0)
+           for reason in (DUPLICATE, NEAR_DUPLICATE, PLACEHOLDER, LOW_INFO)},
+        "placeholders": dict(Counter(
+            kind for reason, kind in zip(reasons, kinds) if reason == PLACEHOLDER
+        )),
+        "low_info_kinds": dict(Counter(
+            kind for reason, kind in zip(reasons, kinds) if reason == LOW_INFO
+        )),
+    }
+
+
+@dataclass
+class FilterResult:
+    """过滤结果"""
+    reasons: List[Optional[str]]  # 每条消息的过滤原因，None表示需要向量化
+    message_types: List[str]
+    stats: Dict = field(default_factory=dict)
+    kinds: List[Optional[str]] = field(default_factory=list)  # 占位/低信息量消息的细分类别
+
+    @property
+    def embed_indices(self) -> List[int]:
+        return [i for i, reason in enumerate(self.reasons) if reason is None]
+
+    def subset(self, indices: List[int]) -> "FilterResult":
+        """只保留部分消息（如实际写入的），统计按保留的消息重新计数"""
+        reasons = [self.reasons[i] for i in indices]
+        kinds = [self.kinds[i] for i in indices] if self.kinds else [None] * len(indices)
+        return FilterResult(
+            reasons=reasons,
+            message_types=[self.message_types[i] for i in indices],
+            stats=_count_stats(reasons, kinds),
+            kinds=kinds,
+        )
+
+
+class MessageFilter:
+    """向量化前的消息过滤器"""
+
+    BANDS = 8  # 32个哈希分8段，每段4行，相似度约0.6以上才可能落入同一桶
+
+    def __init__(
+        self,
+        min_chars: int = 2,
+        similarity_threshold: float = 0.7,
+        near_dup_min_chars: int = 8,
+        num_perm: int = 32,
+    ):
+        self.min_chars = min_chars
+        self.similarity_threshold = similarity_threshold
+        self.near_dup_min_chars = near_dup_min_chars
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.rows = num_perm // self.BANDS
+
+    def classify(self, content: str) -> Optional[tuple]:
+        """判断单条消息是否为占位或低信息量消息，返回 (原因, 消息类型, 统计键)"""
+        # iOS版WhatsApp在占位文本前加了U+200E方向标记
+        stripped = content.strip().lstrip("\u200e")
+        match = _PLACEHOLDER_PATTERN.match(stripped) or _OMITTED_PATTERN.match(stripped)
+        if match:
+            kind = match.group("kind").lower()
+            return PLACEHOLDER, PLACEHOLDER_TYPES.get(kind, "media"), kind
+
+        normalized = normalize_text(stripped)
+        if _is_symbol_only(normalized):
+            return LOW_INFO, "text", "emoji"
+        if _LAUGHTER_PATTERN.match(normalized):
+            return LOW_INFO, "text", "laughter"
+        if len(normalized) <= self.min_chars:
+            return LOW_INFO, "text", "short"
+        return None
+
+    def filter(self, contents: List[str]) -> FilterResult:
+        """对一批消息做过滤，保留每类的计数用于风格统计"""
+        reasons: List[Optional[str]] = []
+        message_types: List[str] = []
+        kinds: List[Optional[str]] = []
+
+        seen_exact = set()
+        buckets: Dict[tuple, List[frozenset]] = {}
+
+        for content in contents:
+            reason = None
+            message_type = "text"
+            kind = None
+
+            classified = self.classify(content)
+            if classified:
+                reason, message_type, kind = classified
+            else:
+                normalized = normalize_text(content)
+                digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+                if digest in seen_exact:
+                    reason = DUPLICATE
+                else:
+                    seen_exact.add(digest)
+                    if len(normalized) >= self.near_dup_min_chars:
+                        shingle_set = shingles(normalized)
+                        signature = self.hasher.signature(shingle_set)
+                        bands = [
+                            (b, signature[b * self.rows:(b + 1) * self.rows].tobytes())
+                            for b in range(self.BANDS)
+                        ]
+                        if any(
+                            jaccard(candidate, shingle_set) >= self.similarity_threshold
+                            for band in bands
+                            for candidate in buckets.get(band, ())
+                        ):
+                            reason = NEAR_DUPLICATE
+                        else:
+                            for band in bands:
+                                buckets.setdefault(band, []).append(shingle_set)
+
+            reasons.append(reason)
+            message_types.append(message_type)
+            kinds.append(kind)
+
+        return FilterResult(
+            reasons=reasons, message_types=message_types,
+            stats=_count_stats(reasons, kinds), kinds=kinds,
+        )
@@ -2,21 +2,109 @@
 消息服务
 """
 
-from typing import List, Optional
-from datetime import datetime
+import hashlib
+from typing import Dict, List, Optional, Set, Type
+from datetime import datetime, timezone
 from beanie import PydanticObjectId
+from pydantic import BaseModel
 from backend.models.message import Message
+from backend.models.message_window import MessageWindow
 from backend.models.persona import Persona
+from backend.models.reply_pair import ReplyPair
 from backend.services.rag_service import RAGService
+from backend.services.bulk_writer import BulkWriter
+from backend.services.embedding_backfill import EmbeddingBackfillJob
+from backend.services.persona_profile import PersonaProfileService
+from backend.services.lexicon import get_lexicon
+from backend.services.message_features import EMPTY_FEATURES, message_features
+from backend.services.message_filter import PLACEHOLDER, FilterResult, MessageFilter
+from backend.services.tokenizer import Tokenizer
+from backend.services.topic_clustering import TopicClusteringService
+from backend.services.session_windows import (
+    build_turn_text,
+    build_window_text,
+    extract_reply_pairs,
+    segment_windows,
+)
+from backend.core.config import settings
+from backend.core.identity_map import document_cache, load
+from backend.core.pagination import after_cursor
 from backend.core.logger import logger
 
 
+def compute_fingerprint(sender: str, timestamp, content: str, occurrence: int = 0) -> str:
+    """计算消息指纹: 发送者 + 时间 + 内容 + 同一导出中的出现序号"""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat(timespec="seconds")
+    raw = "\x1f".join([sender or "", str(timestamp or ""), content or "", str(occurrence)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def coerce_timestamp(value) -> datetime:
+    """将解析器产出的时间统一为datetime（原始文档不经过模型校验）"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        # 秒或毫秒级Unix时间戳
+        return datetime.utcfromtimestamp(value / 1000 if value > 1e11 else value)
+    if isinstance(value, str) and value.strip():
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return datetime.now()
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return datetime.now()
+
+
+def fingerprint_messages(
+    messages_data: List[dict],
+    occurrences: Optional[Dict[tuple, int]] = None
+) -> List[str]:
+    """
+    为一次导入中的消息批量计算指纹
+    
+    同一分钟内同一人发送的相同内容（如连发两次"好"）是不同的消息，
+    用出现序号区分；更新后的导出覆盖同一时间段时序号保持一致。
+    分批导入同一份导出时传入同一个occurrences，序号跨批次累计。
+    """
+    if occurrences is None:
+        occurrences = {}
+    fingerprints = []
+    for msg in messages_data:
+        key = (msg.get("sender"), str(msg.get("timestamp")), msg.get("content"))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        fingerprints.append(compute_fingerprint(
+            msg.get("sender", ""), msg.get("timestamp"), msg.get("content", ""), occurrence
+        ))
+    return fingerprints
+
+
 class MessageService:
     """消息管理服务"""
     
     def __init__(self):
         """初始化消息服务"""
         self.rag_service = RAGService()
+        self.profile_service = PersonaProfileService()
+        self.tokenizer = Tokenizer.instance()
+        self.topic_service = TopicClusteringService(self.rag_service)
+        self.message_filter = MessageFilter(
+            min_chars=settings.LOW_INFO_MAX_CHARS,
+            similarity_threshold=settings.NEAR_DUPLICATE_THRESHOLD
+        )
+    
+    def filter_for_embedding(self, texts: List[str]) -> FilterResult:
+        """向量化前过滤重复、占位和低信息量消息"""
+        if not settings.EMBEDDING_FILTER_ENABLED:
+            return FilterResult(
+                reasons=[None] * len(texts),
+                message_types=["text"] * len(texts),
+                stats={"total": len(texts), "embedded": len(texts)}
+            )
+        return self.message_filter.filter(texts)
     
     async def create_message(
         self,
@@ -28,8 +116,10 @@ class MessageService:
     ) -> Message:
         """创建消息"""
         try:
-            # 生成向量
-            embedding = await self.rag_service.generate_embedding(content)
+            # 生成向量（窗口模式下由窗口承担检索，单条消息不再向量化）
+            embedding = None
+            if settings.EMBEDDING_UNIT != "window":
+                embedding = await self.rag_service.generate_embedding(content)
             
             # 创建消息
             message = Message(
@@ -38,7 +128,8 @@ class MessageService:
                 sender=sender,
                 timestamp=timestamp or datetime.now(),
                 embedding=embedding,
-                metadata=metadata or {}
+                metadata=metadata or {},
+                **message_features(content, self.tokenizer.keywords(content))
             )
             
             await message.save()
@@ -46,7 +137,11 @@ class MessageService:
             # 更新人格消息计数
             await Persona.find_one(
                 {"_id": PydanticObjectId(persona_id)}
-            ).update({"$inc": {"message_count": 1}})
+            ).update({"$inc": {"message_count": 1, "messages_version": 1}})
+            document_cache.invalidate(Persona, persona_id)
+            
+            # 增量更新风格摘要
+            await self.profile_service.apply_messages(persona_id, [message.model_dump()])
             
             return message
             
@@ -54,56 +149,289 @@ class MessageService:
             logger.error(f"创建消息失败: {str(e)}")
             raise
     
+    async def get_existing_fingerprints(
+        self,
+        persona_id: str,
+        fingerprints: List[str],
+        chunk_size: int = 5000
+    ) -> Set[str]:
+        """查询人格下已存在的指纹（只取指纹字段，走persona_fingerprint索引）"""
+        existing = set()
+        collection = Message.get_motor_collection()
+        for i in range(0, len(fingerprints), chunk_size):
+            cursor = collection.find(
+                {
+                    "persona_id": PydanticObjectId(persona_id),
+                    "fingerprint": {"$in": fingerprints[i:i + chunk_size]}
+                },
+                {"fingerprint": 1, "_id": 0}
+            )
+            async for doc in cursor:
+                existing.add(doc["fingerprint"])
+        return existing
+    
     async def batch_create_messages(
         self,
         persona_id: str,
-        messages_data: List[dict]
-    ) -> List[Message]:
-        """批量创建消息"""
+        messages_data: List[dict],
+        import_batch: Optional[str] = None,
+        skip_existing: bool = False,
+        target_sender: Optional[str] = None,
+        occurrences: Optional[Dict[tuple, int]] = None
+    ) -> List[Dict]:
+        """
+        批量创建消息，返回实际写入的原始文档
+        
+        skip_existing为True时按指纹跳过该人格已导入过的消息，
+        只为新增部分生成向量并写入（增量导入）。
+        写入后将这批消息合并进风格摘要，target_sender为被模拟的发送者。
+        """
         try:
+            fingerprints = fingerprint_messages(messages_data, occurrences)
+            
+            if skip_existing and messages_data:
+                existing = await self.get_existing_fingerprints(persona_id, fingerprints)
+                pairs = [
+                    (msg, fp) for msg, fp in zip(messages_data, fingerprints)
+                    if fp not in existing
+                ]
+                logger.info(f"增量导入: 跳过 {len(messages_data) - len(pairs)} 条已存在的消息")
+                messages_data = [msg for msg, _ in pairs]
+                fingerprints = [fp for _, fp in pairs]
+            
             # 提取文本内容
             texts = [msg.get("content", "") for msg in messages_data]
             
-            # 批量生成向量
-            embeddings = await self.rag_service.batch_generate_embeddings(texts)
+            # 只为去重后信息量足够的消息生成向量
+            filter_result = self.filter_for_embedding(texts)
+            embeddings = [None] * len(texts)
+            if settings.EMBEDDING_UNIT != "window":
+                embed_indices = filter_result.embed_indices
+                generated = await self.rag_service.batch_generate_embeddings(
+                    [texts[i] for i in embed_indices]
+                )
+                for i, embedding in zip(embed_indices, generated):
+                    embeddings[i] = embedding
+            
+            # 占位消息（[图片]等）不做分词、情绪和关键词标注
+            text_indices = [i for i, reason in enumerate(filter_result.reasons) if reason != PLACEHOLDER]
+            tokens = [[] for _ in texts]
+            for i, words in zip(
+                text_indices,
+                await self.tokenizer.keywords_batch([texts[i] for i in text_indices])
+            ):
+                tokens[i] = words
             
-            # 创建消息对象
-            messages = []
+            # 直接构造原始文档，跳过Beanie模型的逐条校验
+            persona_oid = PydanticObjectId(persona_id)
+            # 口头禅随导入累积更新，用人格当前的口头禅标注关键词
+            persona = await load(Persona, persona_oid)
+            catch_phrases = ((persona.sentence_patterns or {}).get("catch_phrases") or []) if persona else []
+            lexicon = get_lexicon(catch_phrases)
+            docs = []
             for i, msg_data in enumerate(messages_data):
-                message = Message(
-                    persona_id=PydanticObjectId(persona_id),
-                    content=msg_data.get("content", ""),
-                    sender=msg_data.get("sender", "Unknown"),
-                    timestamp=msg_data.get("timestamp", datetime.now()),
-                    embedding=embeddings[i] if i < len(embeddings) else None,
-                    metadata=msg_data.get("metadata", {})
-                )
-                messages.append(message)
+                features = EMPTY_FEATURES
+                if filter_result.reasons[i] != PLACEHOLDER:
+                    features = message_features(texts[i], tokens[i], lexicon)
+                docs.append({
+                    "_id": PydanticObjectId(),  # 预先分配ID，窗口需要引用成员消息
+                    "persona_id": persona_oid,
+                    "content": msg_data.get("content", ""),
+                    "sender": msg_data.get("sender", "Unknown"),
+                    "timestamp": coerce_timestamp(msg_data.get("timestamp")),
+                    "embedding": embeddings[i],
+                    "filter_reason": filter_result.reasons[i],
+                    "message_type": filter_result.message_types[i],
+                    "media_url": None,
+                    **features,
+                    "original_id": msg_data.get("original_id"),
+                    "import_batch": import_batch,
+                    "fingerprint": fingerprints[i],
+                })
             
-            # 批量保存
-            if messages:
-                await Message.insert_many(messages)
+            if docs:
+                if settings.EMBEDDING_UNIT != "window":
+                    await self.topic_service.assign(persona_id, docs, "messages")
                 
-                # 更新人格消息计数
-                await Persona.find_one(
-                    {"_id": PydanticObjectId(persona_id)}
-                ).update({"$inc": {"message_count": len(messages)}})
+                # 每写完一块合并更新一次人格消息计数
+                async with BulkWriter(
+                    Message.get_motor_collection(),
+                    on_chunk=lambda inserted: self._increment_persona(
+                        persona_oid, {"message_count": inserted}
+                    )
+                ) as writer:
+                    await writer.insert_many(docs)
+                logger.info(
+                    f"写入 {writer.stats.inserted} 条消息，{writer.stats.chunks} 块，"
+                    f"{writer.stats.docs_per_sec:.0f} docs/s"
+                )
+                
+                # 并发导入同一人格时指纹唯一索引会拒绝重复消息，后续（含导入统计）只处理实际写入的部分
+                if writer.duplicate_ids:
+                    kept = [i for i, doc in enumerate(docs) if doc["_id"] not in writer.duplicate_ids]
+                    docs = [docs[i] for i in kept]
+                    filter_result = filter_result.subset(kept)
+                reasons = filter_result.reasons
+                
+                stats = dict(filter_result.stats)
+                if settings.EMBEDDING_UNIT == "window":
+                    windows = await self.create_windows(
+                        persona_id, docs, reasons, import_batch
+                    )
+                    stats["windows"] = len(windows)
+                if settings.REPLY_PAIRS_ENABLED:
+                    pairs = await self.create_reply_pairs(
+                        persona_id, docs, target_sender, reasons, import_batch
+                    )
+                    stats["reply_pairs"] = len(pairs)
+                
+                # 导入统计整批只写一次
+                await self._increment_persona(persona_oid, self._ingest_stats_increments(stats))
+                
+                await self.profile_service.apply_messages(persona_id, docs, target_sender)
+                
+                # 首次达到聚类规模或增量过多时在后台重新聚类话题
+                await self.topic_service.maybe_refit(persona_id)
             
-            return messages
+            return docs
             
         except Exception as e:
             logger.error(f"批量创建消息失败: {str(e)}")
             raise
     
+    async def create_windows(
+        self,
+        persona_id: str,
+        messages: List[Dict],
+        filter_reasons: Optional[List[Optional[str]]] = None,
+        import_batch: Optional[str] = None
+    ) -> List[Dict]:
+        """按会话切分消息（原始文档）并为每个窗口生成一个向量"""
+        windows = []
+        for indices in segment_windows(
+            messages,
+            gap_minutes=settings.SESSION_GAP_MINUTES,
+            max_messages=settings.WINDOW_MAX_MESSAGES,
+            max_chars=settings.WINDOW_MAX_CHARS
+        ):
+            text = build_window_text(messages, indices, filter_reasons)
+            if not text:
+                continue
+            members = [messages[i] for i in indices]
+            windows.append({
+                "persona_id": PydanticObjectId(persona_id),
+                "message_ids": [m["_id"] for m in members],
+                "text": text,
+                "senders": sorted({m["sender"] for m in members}),
+                "message_count": len(members),
+                "start_time": members[0]["timestamp"],
+                "end_time": members[-1]["timestamp"],
+                "embedding": None,
+                "import_batch": import_batch,
+                "created_at": datetime.utcnow(),
+            })
+        
+        if windows:
+            embeddings = await self.rag_service.batch_generate_embeddings(
+                [w["text"] for w in windows]
+            )
+            for window, embedding in zip(windows, embeddings):
+                window["embedding"] = embedding
+            await self.topic_service.assign(persona_id, windows, "message_windows")
+            async with BulkWriter(MessageWindow.get_motor_collection()) as writer:
+                await writer.insert_many(windows)
+            self.rag_service.window_cache.invalidate(persona_id)
+        
+        logger.info(f"{len(messages)} 条消息切分为 {len(windows)} 个对话窗口")
+        return windows
+    
+    async def create_reply_pairs(
+        self,
+        persona_id: str,
+        messages: List[Dict],
+        target_sender: Optional[str] = None,
+        filter_reasons: Optional[List[Optional[str]]] = None,
+        import_batch: Optional[str] = None
+    ) -> List[Dict]:
+        """提取回复对（原始文档）并为对方发言一侧生成向量"""
+        if not target_sender:
+            persona = await Persona.get(PydanticObjectId(persona_id))
+            target_sender = persona.name if persona else None
+        
+        pairs = []
+        for prompt, reply in extract_reply_pairs(
+            messages,
+            target_sender,
+            filter_reasons,
+            max_gap_minutes=settings.REPLY_PAIR_MAX_GAP_MINUTES,
+            max_messages=settings.REPLY_PAIR_MAX_MESSAGES
+        ):
+            prompt_time = messages[prompt[-1]]["timestamp"]
+            reply_time = messages[reply[0]]["timestamp"]
+            pairs.append({
+                "persona_id": PydanticObjectId(persona_id),
+                "prompt_message_ids": [messages[i]["_id"] for i in prompt],
+                "reply_message_ids": [messages[i]["_id"] for i in reply],
+                "prompt": build_turn_text(messages, prompt),
+                "reply": build_turn_text(messages, reply),
+                "prompt_sender": messages[prompt[0]]["sender"],
+                "prompt_time": prompt_time,
+                "reply_time": reply_time,
+                "latency_seconds": (reply_time - prompt_time).total_seconds(),
+                "embedding": None,
+                "import_batch": import_batch,
+                "created_at": datetime.utcnow(),
+            })
+        
+        if pairs:
+            embeddings = await self.rag_service.batch_generate_embeddings(
+                [p["prompt"] for p in pairs]
+            )
+            for pair, embedding in zip(pairs, embeddings):
+                pair["embedding"] = embedding
+            async with BulkWriter(ReplyPair.get_motor_collection()) as writer:
+                await writer.insert_many(pairs)
+            self.rag_service.pair_cache.invalidate(persona_id)
+        
+        logger.info(f"提取 {len(pairs)} 个回复对")
+        return pairs
+    
+    async def _increment_persona(self, persona_id: PydanticObjectId, increments: Dict[str, int]):
+        """对人格文档做一次合并的$inc，消息数变化时同时递增messages_version"""
+        if increments.get("message_count"):
+            increments = {**increments, "messages_version": 1}
+        if increments:
+            await Persona.get_motor_collection().update_one(
+                {"_id": persona_id}, {"$inc": increments}
+            )
+            document_cache.invalidate(Persona, persona_id)
+    
+    def _ingest_stats_increments(self, stats: Dict) -> Dict[str, int]:
+        """将过滤统计展开为ingest_stats下的$inc字段"""
+        increments = {}
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                for sub_key, count in value.items():
+                    increments[f"ingest_stats.{key}.{sub_key}"] = count
+            elif value:
+                increments[f"ingest_stats.{key}"] = value
+        return increments
+    
     async def get_messages(
         self,
         persona_id: str,
         limit: int = 50,
         skip: int = 0,
         start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
+        end_time: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        projection_model: Optional[Type[BaseModel]] = None
     ) -> List[Message]:
-        """获取消息列表"""
+        """
+        获取消息列表（按时间倒序，传入cursor时按游标翻页，忽略skip）
+        
+        projection_model为读模型（如MessageSummary）时只投影其字段，不读取向量。
+        """
         try:
             # 构建查询条件
             query = {"persona_id": PydanticObjectId(persona_id)}
@@ -119,7 +447,12 @@ class MessageService:
                     query["timestamp"] = time_filter
             
             # 查询消息
-            messages = await Message.find(query).sort("-timestamp").skip(skip).limit(limit).to_list()
+            find = Message.find(after_cursor(query, "timestamp", cursor)).sort("-timestamp", "-_id")
+            if not cursor and skip:
+                find = find.skip(skip)
+            if projection_model is not None:
+                find = find.project(projection_model)
+            messages = await find.limit(limit).to_list()
             
             return messages
             
@@ -132,9 +465,10 @@ class MessageService:
         persona_id: str,
         query: str,
         limit: int = 10,
-        search_type: str = "hybrid"
+        search_type: str = "hybrid",
+        projection_model: Optional[Type[BaseModel]] = None
     ) -> List[Message]:
-        """搜索消息"""
+        """搜索消息，projection_model只作用于子串搜索（混合检索的结果还要用于生成回复）"""
         try:
             if search_type == "hybrid":
                 # 使用混合搜索
@@ -144,11 +478,10 @@ class MessageService:
                     limit=limit
                 )
             else:
-                # 简单文本搜索
-                messages = await Message.find({
-                    "persona_id": PydanticObjectId(persona_id),
-                    "content": {"$regex": query, "$options": "i"}
-                }).sort("-timestamp").limit(limit).to_list()
+                # 子串搜索（N-gram索引），按时间倒序
+                messages = await self.rag_service.ngram_search.find(
+                    persona_id, query, limit, projection_model=projection_model
+                )
             
             return messages
             
@@ -164,10 +497,16 @@ class MessageService:
                 # 更新人格消息计数
                 await Persona.find_one(
                     {"_id": message.persona_id}
-                ).update({"$inc": {"message_count": -1}})
+                ).update({"$inc": {"message_count": -1, "messages_version": 1}})
+                document_cache.invalidate(Persona, message.persona_id)
                 
                 # 删除消息
                 await message.delete()
+                
+                # 从风格摘要中扣减
+                await self.profile_service.apply_messages(
+                    str(message.persona_id), [message.model_dump()], removed=True
+                )
                 return True
                 
             return False
@@ -177,35 +516,18 @@ class MessageService:
             raise
     
     async def update_embeddings(self, persona_id: str, batch_size: int = 100) -> int:
-        """更新消息向量"""
-        try:
-            updated_count = 0
-            
-            # 查找没有向量的消息
-            while True:
-                messages = await Message.find({
-                    "persona_id": PydanticObjectId(persona_id),
-                    "embedding": None
-                }).limit(batch_size).to_list()
-                
-                if not messages:
-                    break
-                
-                # 提取文本
-                texts = [msg.content for msg in messages]
-                
-                # 生成向量
-                embeddings = await self.rag_service.batch_generate_embeddings(texts)
-                
-                # 更新消息
-                for i, msg in enumerate(messages):
-                    if i < len(embeddings):
-                        msg.embedding = embeddings[i]
-                        await msg.save()
-                        updated_count += 1
-            
-            return updated_count
-            
-        except Exception as e:
-            logger.error(f"更新向量失败: {str(e)}")
-            raise
\ No newline at end of file
+        """
+        补生成缺失的向量（窗口模式下更新窗口向量）
+        
+        由可续传的回填任务执行，返回该任务累计写回的数量；
+        向量服务持续失败时抛出异常，而不是反复重试同一批文档。
+        """
+        job = EmbeddingBackfillJob(
+            persona_id=persona_id,
+            batch_size=batch_size,
+            rag_service=self.rag_service
+        )
+        checkpoint = await job.run()
+        if checkpoint.status == "failed":
+            raise RuntimeError(f"更新向量失败: {checkpoint.error}")
+        return checkpoint.processed
@@ -0,0 +1,272 @@
+"""
+N-gram倒排索引 - 人格消息的中文子串/关键词检索
+
+消息内容（小写）按单字和字符二元组建立倒排表，查询词的所有二元组倒排表
+求交集得到候选，再逐条确认子串确实出现，结果与不区分大小写的子串匹配一致，
+但代价只与候选数有关，不随人格消息总量线性增长，也不受正则元字符影响。
+
+- find(): 整个查询作为子串，按时间倒序（消息搜索接口）
+- search(): 查询词与关键词分别匹配，按 idf 加权得分排序（混合检索）
+
+索引在进程内按人格缓存，以消息数和人格的 messages_version 校验，任一变化后重建。
+"""
+
+import asyncio
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+from beanie import PydanticObjectId
+from pydantic import BaseModel
+
+from backend.core.config import settings
+from backend.core.logger import logger
+from backend.models.message import Message
+from backend.models.persona import Persona
+
+GRAM = 2
+EMPTY_ROWS = np.empty(0, dtype=np.int32)
+# 二元组编码为 (前字码点 << 21) | 后字码点，单字额外带上该标记位
+UNIGRAM_FLAG = 1 << 42
+
+
+def normalize(text: str) -> str:
+    return (text or "").lower()
+
+
+def ngrams(text: str) -> set:
+    """文本的字符二元组（已小写）"""
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def gram_key(gram: str) -> int:
+    if len(gram) == 1:
+        return UNIGRAM_FLAG | ord(gram)
+    return (ord(gram[0]) << 21) | ord(gram[1])
+
+
+class NgramIndex:
+    """一个人格全部消息的单字/二元组倒排表（CSR存储: 编码 -> 升序行号）"""
+
+    def __init__(
+        self,
+        ids: list,
+        texts: Sequence[str],
+        senders: Sequence[str],
+        timestamps: Sequence[datetime]
+    ):
+        self.ids = ids
+        self.texts = [normalize(text) for text in texts]
+        self.timestamps = np.asarray(timestamps, dtype="datetime64[ms]")
+
+        codes: Dict[str, int] = {}
+        self.sender_codes = np.asarray(
+            [codes.setdefault(normalize(sender), len(codes)) for sender in senders], dtype=np.int32
+        )
+        self.sender_names: List[str] = list(codes)
+
+        # 全部文本拼接成码点数组，相邻且属于同一行的两个字组成二元组，全程向量化
+        lengths = np.fromiter(map(len, self.texts), dtype=np.int64, count=len(self.texts))
+        chars = np.frombuffer(
+            "".join(self.texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+        ).astype(np.int64)
+        row_of = np.repeat(np.arange(len(self.texts), dtype=np.int32), lengths)
+        same_row = row_of[:-1] == row_of[1:]
+        keys = np.concatenate(((chars[:-1] << 21 | chars[1:])[same_row], chars | UNIGRAM_FLAG))
+        rows = np.concatenate((row_of[:-1][same_row], row_of))
+
+        # 按 (编码, 行号) 排序去重，每个编码的行号连续且升序
+        order = np.lexsort((rows, keys))
+        keys, rows = keys[order], rows[order]
+        keep = np.ones(len(keys), dtype=bool)
+        keep[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1])
+        keys, self.rows = keys[keep], rows[keep]
+        self.keys, starts = np.unique(keys, return_index=True)
+        self.offsets = np.append(starts, len(keys))
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def postings(self, gram: str) -> np.ndarray:
+        """包含该单字/二元组的行号"""
+        key = gram_key(gram)
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return EMPTY_ROWS
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def match(self, term: str) -> np.ndarray:
+        """包含term（不区分大小写）的行号，升序"""
+        term = normalize(term)
+        if not term:
+            return EMPTY_ROWS
+        if len(term) < GRAM:
+            return self.postings(term)
+
+        # 从最短的倒排表开始求交集，任何一步为空即可结束
+        lists = sorted((self.postings(gram) for gram in ngrams(term)), key=len)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        if len(term) == GRAM:
+            return candidates
+        # 二元组都出现不代表连续出现，逐条确认
+        texts = self.texts
+        return np.asarray([row for row in candidates.tolist() if term in texts[row]], dtype=np.int32)
+
+    def sender_match(self, term: str) -> np.ndarray:
+        """发送者名包含term的行号"""
+        term = normalize(term)
+        codes = [code for code, name in enumerate(self.sender_names) if term in name]
+        if not term or not codes:
+            return EMPTY_ROWS
+        return np.flatnonzero(np.isin(self.sender_codes, codes)).astype(np.int32)
+
+    def _in_range(self, rows: np.ndarray, time_range: Optional[Dict[str, datetime]]) -> np.ndarray:
+        if not time_range or not len(rows):
+            return rows
+        mask = np.ones(len(rows), dtype=bool)
+        if time_range.get("start") is not None:
+            mask &= self.timestamps[rows] >= np.datetime64(time_range["start"], "ms")
+        if time_range.get("end") is not None:
+            mask &= self.timestamps[rows] <= np.datetime64(time_range["end"], "ms")
+        return rows[mask]
+
+    def find(
+        self,
+        term: str,
+        limit: int,
+        time_range: Optional[Dict[str, datetime]] = None
+    ) -> list:
+        """子串匹配，按时间倒序返回消息id"""
+        rows = self._in_range(self.match(term), time_range)
+        newest = rows[np.argsort(-self.timestamps[rows].astype(np.int64), kind="stable")[:limit]]
+        return [self.ids[row] for row in newest.tolist()]
+
+    def search(
+        self,
+        terms: Sequence[str],
+        limit: int,
+        time_range: Optional[Dict[str, datetime]] = None,
+        sender_term: Optional[str] = None
+    ) -> List[Tuple[object, float]]:
+        """
+        多词检索: 每个命中的词按 idf 计分（越少见的词分越高），
+        发送者匹配计最低分；按得分、时间倒序返回 (消息id, 得分)
+        """
+        scores: Dict[int, float] = {}
+        total = len(self.texts)
+        for term in dict.fromkeys(normalize(term) for term in terms if term):
+            rows = self.match(term)
+            if not len(rows):
+                continue
+            weight = 1.0 + math.log((total + 1) / (len(rows) + 1))
+            for row in rows.tolist():
+                scores[row] = scores.get(row, 0.0) + weight
+        if sender_term:
+            for row in self.sender_match(sender_term).tolist():
+                scores[row] = scores.get(row, 0.0) + 1.0
+        if not scores:
+            return []
+
+        rows = self._in_range(np.fromiter(scores, dtype=np.int32, count=len(scores)), time_range)
+        score_values = np.asarray([scores[row] for row in rows.tolist()], dtype=np.float64)
+        order = np.lexsort((-self.timestamps[rows].astype(np.int64), -score_values))[:limit]
+        return [(self.ids[rows[i]], float(score_values[i])) for i in order.tolist()]
+
+
+class NgramSearchService:
+    """按人格缓存N-gram索引，检索结果取回为Message文档"""
+
+    # 进程内共享: persona_id -> ((消息数, 消息版本), 索引)
+    _indexes: Dict[str, Tuple[Tuple[int, int], NgramIndex]] = {}
+    _locks: Dict[str, asyncio.Lock] = {}
+
+    async def _generation(self, persona_oid: PydanticObjectId) -> Tuple[int, int]:
+        """
+        索引的有效性标记: 消息数 + 人格的messages_version
+
+        只比较消息数时，删除后再追加同样数量的消息会继续使用旧索引；
+        版本号在每次增删消息时递增，其他进程的写入也能察觉。
+        """
+        count = await Message.get_motor_collection().count_documents({"persona_id": persona_oid})
+        persona = await Persona.get_motor_collection().find_one(
+            {"_id": persona_oid}, {"messages_version": 1}
+        )
+        return count, (persona or {}).get("messages_version", 0)
+
+    async def get_index(self, persona_id: str) -> NgramIndex:
+        persona_oid = PydanticObjectId(persona_id)
+        collection = Message.get_motor_collection()
+        generation = await self._generation(persona_oid)
+        cached = self._indexes.get(persona_id)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        # 同一人格只构建一次，并发请求等待同一次构建
+        lock = self._locks.setdefault(persona_id, asyncio.Lock())
+        async with lock:
+            cached = self._indexes.get(persona_id)
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+            started = datetime.utcnow()
+            ids, texts, senders, timestamps = [], [], [], []
+            cursor = collection.find({"persona_id": persona_oid}, {"content": 1, "sender": 1, "timestamp": 1})
+            async for doc in cursor:
+                ids.append(doc["_id"])
+                texts.append(doc.get("content") or "")
+                senders.append(doc.get("sender") or "")
+                timestamps.append(doc.get("timestamp"))
+            index = await asyncio.to_thread(NgramIndex, ids, texts, senders, timestamps)
+
+            if persona_id not in self._indexes and len(self._indexes) >= settings.NGRAM_INDEX_MAX_PERSONAS:
+                self._indexes.pop(next(iter(self._indexes)))
+            self._indexes[persona_id] = (generation, index)
+            logger.info(
+                f"人格 {persona_id} N-gram索引构建完成: {len(ids)} 条消息，{len(index.keys)} 个词元，"
+                f"{(datetime.utcnow() - started).total_seconds():.1f}s"
+            )
+            return index
+
+    def invalidate(self, persona_id: str):
+        self._indexes.pop(persona_id, None)
+
+    async def _fetch(self, ids: list, projection_model: Optional[Type[BaseModel]] = None) -> list:
+        """按给定顺序取回消息，可指定投影读模型；未指定时不读取向量字段"""
+        if not ids:
+            return []
+        if projection_model is not None:
+            docs = await Message.find({"_id": {"$in": ids}}).project(projection_model).to_list()
+        else:
+            cursor = Message.get_motor_collection().find({"_id": {"$in": ids}}, {"embedding": 0})
+            docs = [Message(**doc) async for doc in cursor]
+        by_id = {doc.id: doc for doc in docs}
+        return [by_id[i] for i in ids if i in by_id]
+
+    async def find(
+        self,
+        persona_id: str,
+        query: str,
+        limit: int = 10,
+        time_range: Optional[Dict[str, datetime]] = None,
+        projection_model: Optional[Type[BaseModel]] = None
+    ) -> list:
+        """子串搜索，按时间倒序"""
+        index = await self.get_index(persona_id)
+        return await self._fetch(index.find(query, limit, time_range), projection_model)
+
+    async def search(
+        self,
+        persona_id: str,
+        terms: Sequence[str],
+        limit: int = 10,
+        time_range: Optional[Dict[str, datetime]] = None,
+        sender_term: Optional[str] = None
+    ) -> List[Message]:
+        """多词加权检索，按得分排序"""
+        index = await self.get_index(persona_id)
+        hits = index.search(terms, limit, time_range, sender_term)
+        return await self._fetch([message_id for message_id, _ in hits])
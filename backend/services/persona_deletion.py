@@ -0,0 +1,168 @@
+"""
+人格删除任务 - 后台分批级联删除
+
+删除接口只把人格标记为 deleting 并立即返回，读接口随即不再返回该人格；
+后台任务按集合逐批删除关联文档（每批按 _id 删除 DELETION_BATCH_SIZE 条，
+批间暂停 DELETION_BATCH_PAUSE 秒，避免一次性大删除压垮数据库），
+进度写在 Persona.deletion_progress 上，全部完成后清理进程内缓存并删除人格本身。
+
+进程重启后，启动时由 resume_pending() 继续未完成的删除。
+
+单进程限制: 删除完成时只清理执行任务的进程内缓存（窗口/回复对向量矩阵、话题中心、
+N-gram索引）。多进程部署时，其他进程中该人格的缓存不会被主动清理，但不会再被使用:
+接口对不存在或删除中的人格直接返回404，各缓存也按当前文档数/版本号校验。
+这部分内存要等到缓存按容量淘汰（VectorCache 最多32个人格，N-gram索引最多
+NGRAM_INDEX_MAX_PERSONAS 个），或者进程重启后才会释放；话题中心缓存没有容量上限，
+只在进程重启时释放。
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from beanie import PydanticObjectId
+
+from backend.core.config import settings
+from backend.core.identity_map import document_cache
+from backend.core.logger import logger
+from backend.models.backfill_checkpoint import BackfillCheckpoint
+from backend.models.chat import ChatHistory
+from backend.models.chat_model import Chat
+from backend.models.message import Message
+from backend.models.message_window import MessageWindow
+from backend.models.persona import Persona, PersonaStatus
+from backend.models.persona_topics import PersonaTopics
+from backend.models.reply_pair import ReplyPair
+from backend.services.ngram_index import NgramSearchService
+from backend.services.rag_service import RAGService
+
+# 删除顺序: 用户可见的对话先删，体量最大的消息最后删
+CASCADE = [
+    ("chats", Chat),
+    ("chat_history", ChatHistory),
+    ("persona_topics", PersonaTopics),
+    ("backfill_checkpoints", BackfillCheckpoint),
+    ("reply_pairs", ReplyPair),
+    ("message_windows", MessageWindow),
+    ("messages", Message),
+]
+
+
+class PersonaDeletionJob:
+    """单个人格的后台删除任务"""
+
+    # 进程内正在运行的任务: persona_id -> Task
+    _running: Dict[str, asyncio.Task] = {}
+
+    def __init__(
+        self,
+        persona_id: str,
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None
+    ):
+        self.persona_id = persona_id
+        self.batch_size = batch_size or settings.DELETION_BATCH_SIZE
+        self.pause = settings.DELETION_BATCH_PAUSE if pause is None else pause
+
+    def start(self) -> bool:
+        """在后台启动任务，同一人格已在删除时返回False"""
+        task = self._running.get(self.persona_id)
+        if task and not task.done():
+            return False
+        task = asyncio.create_task(self.run())
+        self._running[self.persona_id] = task
+        task.add_done_callback(lambda _: self._running.pop(self.persona_id, None))
+        return True
+
+    async def _delete_batches(self, document, persona_oid: PydanticObjectId, name: str, progress: Dict):
+        collection = document.get_motor_collection()
+        while True:
+            ids: List = [
+                doc["_id"] async for doc in
+                collection.find({"persona_id": persona_oid}, {"_id": 1}).limit(self.batch_size)
+            ]
+            if not ids:
+                return
+            result = await collection.delete_many({"_id": {"$in": ids}})
+            progress[name] = progress.get(name, 0) + result.deleted_count
+            await Persona.find_one({"_id": persona_oid}).update({"$set": {
+                f"deletion_progress.{name}": progress[name],
+                "updated_at": datetime.utcnow(),
+            }})
+            document_cache.invalidate(Persona, persona_oid)
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+    async def run(self) -> bool:
+        """执行删除，人格不存在或未标记删除时返回False"""
+        persona_oid = PydanticObjectId(self.persona_id)
+        persona = await Persona.get(persona_oid)
+        if persona is None or persona.status != PersonaStatus.DELETING:
+            return False
+
+        started = datetime.utcnow()
+        progress = dict(persona.deletion_progress or {})
+        try:
+            for name, document in CASCADE:
+                await self._delete_batches(document, persona_oid, name, progress)
+            # 标记删除前已开始的追加导入可能在前面的集合删完后仍有写入，最后再扫一遍
+            for name, document in CASCADE:
+                await self._delete_batches(document, persona_oid, name, progress)
+        except Exception as e:
+            # 保持 deleting 状态，下次启动或再次删除时继续
+            logger.error(f"删除人格 {self.persona_id} 失败: {str(e)}")
+            return False
+
+        self._invalidate_caches()
+        await persona.delete()
+        logger.info(
+            f"人格 {self.persona_id} 已删除: {progress}，"
+            f"{(datetime.utcnow() - started).total_seconds():.1f}s"
+        )
+        return True
+
+    def _invalidate_caches(self):
+        """只清理本进程的缓存，其他进程见模块说明"""
+        RAGService.window_cache.invalidate(self.persona_id)
+        RAGService.pair_cache.invalidate(self.persona_id)
+        RAGService.centroid_cache.pop(self.persona_id, None)
+        NgramSearchService().invalidate(self.persona_id)
+
+
+class PersonaImporting(ValueError):
+    """人格数据导入中，不能删除"""
+
+
+async def mark_for_deletion(persona: Persona) -> bool:
+    """
+    标记人格为删除中并启动后台任务，已在删除时返回False
+
+    状态以数据库为准（传入的可能是缓存副本）: 条件更新只在既非导入中也非删除中时生效，
+    未生效时重新读取，导入中抛出 PersonaImporting。
+    """
+    result = await Persona.get_motor_collection().update_one(
+        {"_id": persona.id, "status": {"$nin": [PersonaStatus.PROCESSING, PersonaStatus.DELETING]}},
+        {"$set": {
+            "status": PersonaStatus.DELETING,
+            "deletion_progress": {},
+            "updated_at": datetime.utcnow(),
+        }}
+    )
+    document_cache.invalidate(Persona, persona.id)
+    if not result.matched_count:
+        current = await Persona.get(persona.id)
+        if current is None:
+            return False
+        if current.status == PersonaStatus.PROCESSING:
+            raise PersonaImporting("人格数据导入中，请稍后再删除")
+    return PersonaDeletionJob(str(persona.id)).start()
+
+
+async def resume_pending() -> int:
+    """继续上次进程退出时未完成的删除"""
+    pending = await Persona.find({"status": PersonaStatus.DELETING}).to_list()
+    for persona in pending:
+        PersonaDeletionJob(str(persona.id)).start()
+    if pending:
+        logger.info(f"继续删除 {len(pending)} 个人格")
+    return len(pending)
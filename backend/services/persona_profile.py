@@ -0,0 +1,128 @@
+"""
+人格画像维护 - 基于可合并摘要的增量更新
+
+Persona.style_summary 保存 StyleAccumulator 的序列化摘要。
+新增/删除消息时只处理这一批消息并合并到摘要，画像字段
+（style_features、emoji_profile、frequent_words等）由摘要派生。
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from beanie import PydanticObjectId
+
+from backend.core.logger import logger
+from backend.models.persona import Persona
+from backend.services.style_analytics import (
+    SUMMARY_VERSION,
+    StyleAccumulator,
+    StyleAnalyticsService,
+    persona_fields,
+)
+from backend.services.tokenizer import Tokenizer
+
+
+def _columns(messages: List[Dict]) -> tuple:
+    """消息（原始文档或字典）按时间排序后转为列"""
+    ordered = sorted(messages, key=lambda m: m["timestamp"])
+    return (
+        [m.get("content", "") for m in ordered],
+        [m.get("sender") for m in ordered],
+        [m["timestamp"] for m in ordered],
+        [m.get("filter_reason") for m in ordered],
+    )
+
+
+class PersonaProfileService:
+    """人格风格摘要的增量维护"""
+
+    # 同一人格的摘要读-改-写串行化
+    _locks: Dict[str, asyncio.Lock] = {}
+
+    def __init__(self):
+        self.style_analytics = StyleAnalyticsService()
+
+    def _lock(self, persona_id: str) -> asyncio.Lock:
+        if persona_id not in self._locks:
+            self._locks[persona_id] = asyncio.Lock()
+        return self._locks[persona_id]
+
+    @staticmethod
+    def _is_current(persona: Persona, target_sender: str) -> bool:
+        summary = persona.style_summary or {}
+        return (
+            summary.get("version") == SUMMARY_VERSION
+            and summary.get("target_sender") == target_sender
+        )
+
+    async def _save(self, persona: Persona, accumulator: StyleAccumulator):
+        profile = accumulator.result()
+        # 口头禅加入分词用户词典，后续导入和检索不再把它切碎
+        Tokenizer.instance().add_words(profile.get("catch_phrases", []))
+        await persona.set({
+            "style_summary": accumulator.to_summary(),
+            **persona_fields(profile),
+            "updated_at": datetime.utcnow(),
+        })
+
+    async def apply_messages(
+        self,
+        persona_id: str,
+        messages: List[Dict],
+        target_sender: Optional[str] = None,
+        removed: bool = False
+    ):
+        """
+        将一批已写入（或已删除）的消息合并进人格摘要，代价为 O(批大小)
+
+        target_sender 为被模拟的发送者，默认取人格名称。
+        """
+        if not messages:
+            return
+        async with self._lock(persona_id):
+            persona = await Persona.get(PydanticObjectId(persona_id))
+            if not persona:
+                return
+            target_sender = target_sender or persona.name
+
+            if self._is_current(persona, target_sender):
+                accumulator = StyleAccumulator.from_summary(persona.style_summary)
+                batch = StyleAccumulator(target_sender=target_sender)
+                if removed:
+                    batch.update(*_columns(messages))
+                    accumulator.subtract(batch)
+                else:
+                    accumulator.update(*_columns(messages))
+            elif not removed and persona.message_count == len(messages):
+                # 新人格的首批消息就是全部语料，无需回查数据库
+                accumulator = StyleAccumulator(target_sender=target_sender)
+                accumulator.update(*_columns(messages))
+            else:
+                # 没有摘要（历史人格）、格式过旧或目标发送者变化：全量重建，
+                # 调用方在写入/删除之后调用，重建结果已反映这批消息
+                logger.info(f"重建人格风格摘要: {persona_id}")
+                accumulator = await self.style_analytics.build_accumulator(persona_id, target_sender)
+
+            await self._save(persona, accumulator)
+
+    async def rebuild(self, persona_id: str, target_sender: Optional[str] = None) -> Dict:
+        """全量重建摘要并返回画像"""
+        async with self._lock(persona_id):
+            persona = await Persona.get(PydanticObjectId(persona_id))
+            if not persona:
+                return {}
+            accumulator = await self.style_analytics.build_accumulator(
+                persona_id, target_sender or persona.name
+            )
+            await self._save(persona, accumulator)
+            return accumulator.result()
+
+    async def get_profile(self, persona_id: str) -> Dict:
+        """由摘要派生当前画像"""
+        persona = await Persona.get(PydanticObjectId(persona_id))
+        if not persona:
+            return {}
+        if not persona.style_summary:
+            return await self.rebuild(persona_id)
+        return StyleAccumulator.from_summary(persona.style_summary).result()
@@ -0,0 +1,132 @@
+"""
+人格统计 - MongoDB聚合下推
+
+发送者分布、按小时/星期的活跃度、时间范围和消息长度都在服务端用
+聚合管道计算，只有聚合结果经过网络，不再把消息文档（含向量）读到Python。
+
+时间类统计只用到 persona_id/timestamp/sender，由 persona_timestamp_sender
+索引覆盖；长度统计需要读取content，但同样只返回分组结果。
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from beanie import PydanticObjectId
+
+from backend.core.connection import ANALYTICS, DEFAULT, connection_manager
+from backend.core.logger import logger
+from backend.models.message import Message
+
+WEEKDAY_LABELS = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+
+
+def time_stats_pipeline(persona_id: str) -> List[Dict]:
+    """发送者/小时/星期分布和时间范围（索引覆盖）"""
+    return [
+        {"$match": {"persona_id": PydanticObjectId(persona_id)}},
+        {"$project": {"_id": 0, "sender": 1, "timestamp": 1}},
+        {"$facet": {
+            "senders": [
+                {"$group": {
+                    "_id": "$sender",
+                    "count": {"$sum": 1},
+                    "first": {"$min": "$timestamp"},
+                    "last": {"$max": "$timestamp"},
+                }},
+                {"$sort": {"count": -1}},
+            ],
+            # 导出中的时间是原始本地时间，按UTC取小时即为本地小时
+            "hours": [
+                {"$group": {"_id": {"$hour": "$timestamp"}, "count": {"$sum": 1}}},
+            ],
+            "weekdays": [
+                {"$group": {"_id": {"$isoDayOfWeek": "$timestamp"}, "count": {"$sum": 1}}},
+            ],
+        }},
+    ]
+
+
+def length_stats_pipeline(persona_id: str) -> List[Dict]:
+    """按发送者的消息长度统计（不含占位和重复消息）"""
+    return [
+        {"$match": {"persona_id": PydanticObjectId(persona_id), "filter_reason": None}},
+        {"$project": {"_id": 0, "sender": 1, "length": {"$strLenCP": "$content"}}},
+        {"$group": {
+            "_id": "$sender",
+            "count": {"$sum": 1},
+            "avg_length": {"$avg": "$length"},
+            "max_length": {"$max": "$length"},
+        }},
+    ]
+
+
+def parse_time_stats(facets: Dict) -> Dict:
+    """整理时间类聚合结果"""
+    senders = facets.get("senders", [])
+    hours = [0] * 24
+    for row in facets.get("hours", []):
+        hours[row["_id"]] = row["count"]
+    weekdays = [0] * 7
+    for row in facets.get("weekdays", []):
+        weekdays[row["_id"] - 1] = row["count"]
+
+    firsts = [row["first"] for row in senders if row.get("first")]
+    lasts = [row["last"] for row in senders if row.get("last")]
+    return {
+        "message_count": sum(row["count"] for row in senders),
+        "senders": {row["_id"]: row["count"] for row in senders},
+        "date_range_start": min(firsts) if firsts else None,
+        "date_range_end": max(lasts) if lasts else None,
+        "hours": hours,
+        "weekdays": dict(zip(WEEKDAY_LABELS, weekdays)),
+    }
+
+
+class PersonaStatsService:
+    """人格统计（聚合管道；统计接口按analytics负载读取，可分流到从节点）"""
+
+    @staticmethod
+    def _messages(workload: str = ANALYTICS):
+        return connection_manager.for_workload(Message.get_motor_collection(), workload)
+
+    async def time_stats(self, persona_id: str) -> Dict:
+        cursor = self._messages().aggregate(time_stats_pipeline(persona_id))
+        results = await cursor.to_list(length=1)
+        return parse_time_stats(results[0] if results else {})
+
+    async def length_stats(self, persona_id: str) -> Dict[str, Dict]:
+        cursor = self._messages().aggregate(length_stats_pipeline(persona_id))
+        return {
+            row["_id"]: {
+                "count": row["count"],
+                "avg_length": row["avg_length"],
+                "max_length": row["max_length"],
+            }
+            async for row in cursor
+        }
+
+    async def date_range(self, persona_id: str, workload: str = DEFAULT) -> Dict[str, Optional[datetime]]:
+        """
+        时间范围，走 persona_id+timestamp 索引两端各取一条
+
+        导入结束时紧接着写入后调用并持久化到人格上，默认读主节点，避免从节点延迟读到旧范围。
+        """
+        collection = self._messages(workload)
+        query = {"persona_id": PydanticObjectId(persona_id)}
+        projection = {"_id": 0, "timestamp": 1}
+        first = await collection.find_one(query, projection, sort=[("timestamp", 1)])
+        last = await collection.find_one(query, projection, sort=[("timestamp", -1)])
+        return {
+            "date_range_start": first["timestamp"] if first else None,
+            "date_range_end": last["timestamp"] if last else None,
+        }
+
+    async def get_stats(self, persona_id: str) -> Dict:
+        """完整统计"""
+        try:
+            stats = await self.time_stats(persona_id)
+            stats["lengths"] = await self.length_stats(persona_id)
+            return stats
+        except Exception as e:
+            logger.error(f"人格统计失败: {str(e)}")
+            raise
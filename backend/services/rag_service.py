@@ -9,16 +9,38 @@ from beanie import PydanticObjectId
 from openai import AsyncAzureOpenAI
 import numpy as np
 from backend.core.config import settings
+from backend.core.identity_map import load
 from backend.models.message import Message
+from backend.models.message_window import MessageWindow
+from backend.models.persona_topics import PersonaTopics
+from backend.models.reply_pair import ReplyPair
 from backend.models.persona import Persona
 from backend.models.chat import ChatHistory
 from backend.core.logger import logger
+from backend.services.lexicon import NEUTRAL, POSITIVE, QUESTION, emotion_of, get_lexicon
+from backend.services.message_features import message_features
 from backend.services.mock_embeddings import MockEmbeddingService
+from backend.services.ngram_index import NgramSearchService
+from backend.services.tokenizer import Tokenizer
+from backend.services.style_analytics import StyleAnalyticsService
+from backend.services.vector_search import (
+    VectorCache,
+    cosine_top_k,
+    normalize_rows,
+    probe_top_k,
+    sort_by_topic,
+)
 
 
 class RAGService:
     """混合RAG服务"""
     
+    # 进程内共享的窗口/回复对向量缓存
+    window_cache = VectorCache()
+    pair_cache = VectorCache()
+    # persona_id -> (版本号, 话题中心)
+    centroid_cache: Dict[str, tuple] = {}
+    
     def __init__(self):
         """初始化RAG服务"""
         self.client = AsyncAzureOpenAI(
@@ -28,6 +50,7 @@ class RAGService:
         )
         self.embedding_deployment = settings.AZURE_OPENAI_EMBEDDING_DEPLOYMENT
         self.chat_deployment = settings.AZURE_OPENAI_CHAT_DEPLOYMENT
+        self.ngram_search = NgramSearchService()
         
     async def generate_embedding(self, text: str) -> List[float]:
         """生成文本向量"""
@@ -51,8 +74,12 @@ class RAGService:
             logger.warning("Azure OpenAI失败，降级到模拟embedding服务")
             return MockEmbeddingService.generate_embedding(text)
     
-    async def batch_generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """批量生成向量"""
+    async def batch_generate_embeddings(
+        self,
+        texts: List[str],
+        fallback: bool = True
+    ) -> List[List[float]]:
+        """批量生成向量，fallback为False时失败直接抛出而不降级到模拟向量"""
         if not texts:
             return []
             
@@ -81,6 +108,8 @@ class RAGService:
                 return all_embeddings
         except Exception as e:
             logger.error(f"批量生成向量失败: {str(e)}")
+            if not fallback:
+                raise
             # 如果Azure失败，降级到模拟服务
             logger.warning("Azure OpenAI失败，降级到模拟embeddings服务")
             return MockEmbeddingService.generate_embeddings(texts)
@@ -94,56 +123,205 @@ class RAGService:
     ) -> List[Message]:
         """混合检索 - 简化版本"""
         try:
-            # 构建查询条件
-            query_filter = {
-                "persona_id": PydanticObjectId(persona_id),
-                "$or": [
-                    {"content": {"$regex": query, "$options": "i"}},  # 内容匹配
-                    {"sender": {"$regex": query, "$options": "i"}}    # 发送者匹配
-                ]
-            }
+            # 查询按导入时相同的方式提取特征，整句和关键词分别做子串匹配（N-gram索引），
+            # 发送者名包含查询时也算命中
+            features = message_features(query, Tokenizer.instance().keywords(query))
+            messages = await self.ngram_search.search(
+                persona_id,
+                [query, *features["keywords"]],
+                limit=limit,
+                time_range=time_range,
+                sender_term=query
+            )
             
-            # 时间范围过滤
+            # 情绪通道按相同的时间范围过滤
+            time_filter = {}
             if time_range:
-                time_filter = {}
                 if "start" in time_range:
                     time_filter["$gte"] = time_range["start"]
                 if "end" in time_range:
                     time_filter["$lte"] = time_range["end"]
-                if time_filter:
-                    query_filter["timestamp"] = time_filter
             
-            # 执行查询
-            messages = await Message.find(query_filter).limit(limit).to_list()
+            # 情绪通道: 结果不足时补充情绪一致的近期消息（走情绪索引）
+            if features["emotion"] != NEUTRAL and len(messages) < limit:
+                messages += await self.feature_search(
+                    persona_id,
+                    emotion=features["emotion"],
+                    limit=limit - len(messages),
+                    time_range=time_filter or None,
+                    exclude_ids=[m.id for m in messages]
+                )
             
             return messages
             
         except Exception as e:
             logger.error(f"混合搜索失败: {str(e)}")
             # 降级到简单搜索
-            return await Message.find(
-                {"persona_id": PydanticObjectId(persona_id)}
-            ).sort("-timestamp").limit(limit).to_list()
+            return await self._recent_messages({"persona_id": PydanticObjectId(persona_id)}, limit)
+    
+    async def feature_search(
+        self,
+        persona_id: str,
+        emotion: Optional[str] = None,
+        is_question: Optional[bool] = None,
+        message_type: Optional[str] = None,
+        limit: int = 10,
+        time_range: Optional[Dict[str, datetime]] = None,
+        exclude_ids: Optional[List[PydanticObjectId]] = None
+    ) -> List[Message]:
+        """按导入时计算的消息特征过滤，按时间倒序"""
+        query_filter: Dict[str, Any] = {
+            "persona_id": PydanticObjectId(persona_id),
+            "filter_reason": None,
+        }
+        if emotion is not None:
+            query_filter["emotion"] = emotion
+        if is_question is not None:
+            query_filter["is_question"] = is_question
+        if message_type is not None:
+            query_filter["message_type"] = message_type
+        if time_range:
+            query_filter["timestamp"] = time_range
+        if exclude_ids:
+            query_filter["_id"] = {"$nin": exclude_ids}
+        return await self._recent_messages(query_filter, limit)
+    
+    async def _recent_messages(self, query: Dict[str, Any], limit: int) -> List[Message]:
+        """按时间倒序取消息，不读取向量字段"""
+        cursor = Message.get_motor_collection().find(
+            query, {"embedding": 0}
+        ).sort("timestamp", -1).limit(limit)
+        return [Message(**doc) async for doc in cursor]
+    
+    async def _load_vectors(self, document, cache: VectorCache, persona_id: str):
+        """加载人格在某集合中的向量矩阵（按文档数校验缓存）"""
+        query = {
+            "persona_id": PydanticObjectId(persona_id),
+            "embedding": {"$ne": None}
+        }
+        collection = document.get_motor_collection()
+        count = await collection.count_documents(query)
+        cached = cache.get(persona_id, count)
+        if cached is not None:
+            return cached
+        
+        ids, vectors, topic_ids = [], [], []
+        async for doc in collection.find(query, {"embedding": 1, "topic_id": 1}):
+            ids.append(doc["_id"])
+            vectors.append(doc["embedding"])
+            topic_ids.append(doc.get("topic_id"))
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else np.empty((0, 0), dtype=np.float32)
+        
+        # 聚类过的人格按话题排序，两阶段检索时每个话题是连续的行
+        topics = None
+        if any(topic is not None for topic in topic_ids):
+            topics = np.array([-1 if t is None else t for t in topic_ids], dtype=np.int64)
+            ids, matrix, topics = sort_by_topic(ids, matrix, topics)
+        cache.put(persona_id, count, ids, matrix, topics)
+        return ids, matrix
+    
+    async def _load_centroids(self, persona_id: str) -> Optional[np.ndarray]:
+        """话题中心（按版本号校验进程内缓存）"""
+        collection = PersonaTopics.get_motor_collection()
+        query = {"persona_id": PydanticObjectId(persona_id)}
+        current = await collection.find_one(query, {"version": 1})
+        if current is None:
+            return None
+        cached = self.centroid_cache.get(persona_id)
+        if cached is not None and cached[0] == current["version"]:
+            return cached[1]
+        doc = await collection.find_one(query, {"centroids": 1, "version": 1})
+        centroids = normalize_rows(np.asarray(doc["centroids"], dtype=np.float32))
+        self.centroid_cache[persona_id] = (doc["version"], centroids)
+        return centroids
+    
+    async def _vector_search(
+        self,
+        document,
+        cache: VectorCache,
+        persona_id: str,
+        query: str,
+        limit: int,
+        query_embedding: Optional[List[float]] = None
+    ) -> list:
+        """暴力余弦检索后按命中顺序取回文档（不带向量）"""
+        ids, matrix = await self._load_vectors(document, cache, persona_id)
+        if not ids:
+            return []
+        
+        if query_embedding is None:
+            query_embedding = await self.generate_embedding(query)
+        
+        topics = cache.get_topics(persona_id)
+        centroids = None
+        if topics is not None and len(ids) >= settings.TOPIC_SEARCH_MIN_DOCS:
+            centroids = await self._load_centroids(persona_id)
+        if centroids is not None:
+            top, _ = probe_top_k(query_embedding, matrix, topics, centroids, limit, settings.TOPIC_PROBE)
+        else:
+            top, _ = cosine_top_k(query_embedding, matrix, limit)
+        top_ids = [ids[i] for i in top]
+        
+        cursor = document.get_motor_collection().find(
+            {"_id": {"$in": top_ids}}, {"embedding": 0}
+        )
+        by_id = {doc["_id"]: document(**doc) async for doc in cursor}
+        return [by_id[i] for i in top_ids if i in by_id]
+    
+    async def search_windows(
+        self,
+        persona_id: str,
+        query: str,
+        limit: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[MessageWindow]:
+        """语义检索对话窗口，一次命中即带回整段上下文"""
+        try:
+            return await self._vector_search(
+                MessageWindow, self.window_cache, persona_id, query, limit, query_embedding
+            )
+        except Exception as e:
+            logger.error(f"窗口检索失败: {str(e)}")
+            return []
+    
+    async def search_exemplars(
+        self,
+        persona_id: str,
+        query: str,
+        limit: int = 3,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[ReplyPair]:
+        """用户输入匹配过去对方说过的话，带回人格当时的真实回复作为少样本示例"""
+        try:
+            return await self._vector_search(
+                ReplyPair, self.pair_cache, persona_id, query, limit, query_embedding
+            )
+        except Exception as e:
+            logger.error(f"回复示例检索失败: {str(e)}")
+            return []
     
     async def generate_response(
         self,
         persona_id: str,
         user_input: str,
         context_messages: List[Message],
-        chat_history: Optional[List[Dict[str, str]]] = None
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        context_windows: Optional[List[MessageWindow]] = None,
+        exemplars: Optional[List[ReplyPair]] = None
     ) -> str:
         """生成回复"""
         try:
             # 获取人格信息
-            persona = await Persona.get(PydanticObjectId(persona_id))
+            persona = await load(Persona, persona_id)
             if not persona:
                 raise ValueError("人格不存在")
             
             # 构建系统提示
             system_prompt = self._build_system_prompt(persona)
+            system_prompt += self._describe_input(persona, user_input)
             
             # 构建上下文
-            context = self._build_context(context_messages)
+            context = self._build_context(context_messages, context_windows)
             
             # 构建消息历史
             messages = [
@@ -151,6 +329,16 @@ class RAGService:
                 {"role": "system", "content": f"相关上下文:\n{context}"}
             ]
             
+            # 少样本示例: 过去对方说的话和ta当时的真实回复
+            if exemplars:
+                messages.append({
+                    "role": "system",
+                    "content": f"以下是{persona.name}过去真实的回复示例，请参考其语气和回复方式:"
+                })
+                for pair in exemplars:
+                    messages.append({"role": "user", "content": pair.prompt})
+                    messages.append({"role": "assistant", "content": pair.reply})
+            
             # 添加聊天历史
             if chat_history:
                 for msg in chat_history[-10:]:  # 最近10条
@@ -202,8 +390,12 @@ class RAGService:
             prompt += f"\n说话风格:\n"
             if persona.emoji_profile and len(persona.emoji_profile) > 5:
                 prompt += "- 经常使用表情符号\n"
-            if persona.sentence_patterns:
-                prompt += f"- 句式特点: {list(persona.sentence_patterns.keys())[:3]}\n"
+            if persona.sentence_patterns.get("average_message_length"):
+                prompt += f"- 平均每条消息 {persona.sentence_patterns['average_message_length']:.0f} 个字\n"
+            if persona.sentence_patterns.get("catch_phrases"):
+                prompt += f"- 口头禅: {', '.join(persona.sentence_patterns['catch_phrases'][:5])}\n"
+            if persona.sentence_patterns.get("sentence_endings"):
+                prompt += f"- 常用语气词: {''.join(list(persona.sentence_patterns['sentence_endings'])[:3])}\n"
             if persona.frequent_words:
                 prompt += f"- 常用词语: {', '.join(persona.frequent_words[:5])}\n"
         
@@ -213,12 +405,34 @@ class RAGService:
         
         return prompt
     
-    def _build_context(self, messages: List[Message]) -> str:
+    def _describe_input(self, persona: Persona, user_input: str) -> str:
+        """用词典判断用户输入的语气（口头禅按人格附加到词典）"""
+        catch_phrases = (persona.sentence_patterns or {}).get("catch_phrases") or []
+        hits = get_lexicon(catch_phrases).scan(user_input)
+        notes = []
+        if QUESTION in hits:
+            notes.append("- 对方在提问，请直接回答\n")
+        emotion = emotion_of(hits)
+        if emotion != NEUTRAL:
+            notes.append(f"- 对方的情绪偏{'积极' if emotion == POSITIVE else '消极'}\n")
+        if not notes:
+            return ""
+        return "\n当前输入:\n" + "".join(notes)
+    
+    def _build_context(
+        self,
+        messages: List[Message],
+        windows: Optional[List[MessageWindow]] = None
+    ) -> str:
         """构建上下文"""
-        if not messages:
+        if not messages and not windows:
             return "暂无相关上下文"
         
         context_parts = []
+        for window in windows or []:
+            started = window.start_time.strftime("%Y-%m-%d %H:%M") if window.start_time else ""
+            context_parts.append(f"[对话片段 {started}]\n{window.text}")
+        
         for msg in messages[:5]:  # 最多5条相关消息
             timestamp = msg.timestamp.strftime("%Y-%m-%d %H:%M")
             context_parts.append(f"[{timestamp}] {msg.sender}: {msg.content}")
@@ -228,111 +442,11 @@ class RAGService:
     async def analyze_conversation_patterns(
         self,
         persona_id: str,
-        sample_size: int = 100
+        target_sender: Optional[str] = None
     ) -> Dict[str, Any]:
-        """分析对话模式"""
+        """分析对话模式（全部消息）"""
         try:
-            # 获取样本消息
-            messages = await Message.find(
-                {"persona_id": PydanticObjectId(persona_id)}
-            ).sort("-timestamp").limit(sample_size).to_list()
-            
-            if not messages:
-                return {}
-            
-            # 分析模式
-            patterns = {
-                "response_patterns": self._analyze_response_patterns(messages),
-                "topic_transitions": self._analyze_topic_transitions(messages),
-                "emotional_patterns": self._analyze_emotional_patterns(messages),
-                "time_patterns": self._analyze_time_patterns(messages)
-            }
-            
-            return patterns
-            
+            return await StyleAnalyticsService().analyze_persona(persona_id, target_sender)
         except Exception as e:
             logger.error(f"分析对话模式失败: {str(e)}")
             return {}
-    
-    def _analyze_response_patterns(self, messages: List[Message]) -> Dict[str, Any]:
-        """分析回复模式"""
-        # 简化实现
-        total_length = sum(len(m.content) for m in messages)
-        avg_length = total_length / len(messages) if messages else 0
-        
-        # 分析回复速度（假设连续消息）
-        response_times = []
-        for i in range(1, len(messages)):
-            if messages[i].sender != messages[i-1].sender:
-                time_diff = (messages[i-1].timestamp - messages[i].timestamp).total_seconds()
-                if 0 < time_diff < 3600:  # 1小时内的回复
-                    response_times.append(time_diff)
-        
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
-        
-        return {
-            "average_message_length": avg_length,
-            "average_response_time_seconds": avg_response_time,
-            "message_count": len(messages)
-        }
-    
-    def _analyze_topic_transitions(self, messages: List[Message]) -> List[str]:
-        """分析话题转换"""
-        # 简化实现：识别问句
-        topics = []
-        for msg in messages:
-            if "？" in msg.content or "?" in msg.content:
-                topics.append(msg.content[:20] + "...")
-        return topics[:5]  # 返回前5个话题
-    
-    def _analyze_emotional_patterns(self, messages: List[Message]) -> Dict[str, float]:
-        """分析情感模式"""
-        # 简化实现：基于关键词
-        emotions = {
-            "positive": 0,
-            "negative": 0,
-            "neutral": 0
-        }
-        
-        positive_words = ["好", "哈哈", "开心", "喜欢", "棒", "😊", "😄", "❤️"]
-        negative_words = ["不", "难过", "生气", "讨厌", "烦", "😔", "😢", "😡"]
-        
-        for msg in messages:
-            content = msg.content.lower()
-            has_positive = any(word in content for word in positive_words)
-            has_negative = any(word in content for word in negative_words)
-            
-            if has_positive and not has_negative:
-                emotions["positive"] += 1
-            elif has_negative and not has_positive:
-                emotions["negative"] += 1
-            else:
-                emotions["neutral"] += 1
-        
-        # 转换为比例
-        total = sum(emotions.values())
-        if total > 0:
-            for key in emotions:
-                emotions[key] = emotions[key] / total
-        
-        return emotions
-    
-    def _analyze_time_patterns(self, messages: List[Message]) -> Dict[str, Any]:
-        """分析时间模式"""
-        # 活跃时间段分析
-        hour_distribution = {}
-        for msg in messages:
-            hour = msg.timestamp.hour
-            hour_distribution[hour] = hour_distribution.get(hour, 0) + 1
-        
-        # 找出最活跃的时间段
-        if hour_distribution:
-            peak_hour = max(hour_distribution, key=hour_distribution.get)
-            peak_period = f"{peak_hour}:00-{(peak_hour+1)%24}:00"
-        else:
-            peak_period = "未知"
-        
-        return {
-            "peak_activity_period": peak_period,
-            "hour_distribution": hour_distribution
-        }
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+会话窗口切分 - 把聊天时间线切成适合向量化的对话片段
+
+先按时间间隔切成会话，再在会话内按轮次边界（发送者切换）切成大小受限的窗口。
+单条消息通常只有几个字，以窗口为单位向量化能显著减少向量数并带回完整上下文。
+
+同样按轮次边界提取回复对（对方的一轮发言 -> 人格紧接着的一轮回复），作为少样本示例。
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# 不进入窗口文本的消息（占位和重复消息对检索没有帮助）
+EXCLUDED_FILTER_REASONS = {"placeholder", "duplicate", "near_duplicate"}
+
+
+def _gap_exceeded(previous, current, gap: timedelta) -> bool:
+    if isinstance(previous, datetime) and isinstance(current, datetime):
+        return current - previous > gap
+    return False
+
+
+def segment_windows(
+    messages: List[Dict],
+    gap_minutes: int = 30,
+    max_messages: int = 12,
+    max_chars: int = 400
+) -> List[List[int]]:
+    """
+    切分窗口，返回每个窗口包含的消息下标
+    
+    - 相邻消息间隔超过gap_minutes开始新会话
+    - 窗口达到max_messages或max_chars后，在下一个发送者切换处结束；
+      同一人连续刷屏时以两倍上限强制切分
+    """
+    gap = timedelta(minutes=gap_minutes)
+    windows: List[List[int]] = []
+    current: List[int] = []
+    chars = 0
+
+    for i, msg in enumerate(messages):
+        if current:
+            previous = messages[current[-1]]
+            new_session = _gap_exceeded(previous.get("timestamp"), msg.get("timestamp"), gap)
+            full = len(current) >= max_messages or chars >= max_chars
+            turn_boundary = msg.get("sender") != previous.get("sender")
+            overflow = len(current) >= 2 * max_messages or chars >= 2 * max_chars
+            if new_session or (full and turn_boundary) or overflow:
+                windows.append(current)
+                current, chars = [], 0
+
+        current.append(i)
+        chars += len(msg.get("content") or "")
+
+    if current:
+        windows.append(current)
+    return windows
+
+
+def build_window_text(
+    messages: List[Dict],
+    indices: List[int],
+    filter_reasons: Optional[List[Optional[str]]] = None
+) -> str:
+    """拼接窗口文本，跳过占位和重复消息"""
+    lines = []
+    for i in indices:
+        if filter_reasons and filter_reasons[i] in EXCLUDED_FILTER_REASONS:
+            continue
+        msg = messages[i]
+        lines.append(f"{msg.get('sender', 'Unknown')}: {msg.get('content', '')}")
+    return "\n".join(lines)
+
+
+def _turns(
+    messages: List[Dict],
+    gap: timedelta,
+    filter_reasons: Optional[List[Optional[str]]] = None
+) -> List[List[int]]:
+    """同一发送者的连续发言合并为一轮，间隔过长时另起一轮"""
+    turns: List[List[int]] = []
+    for i, msg in enumerate(messages):
+        if filter_reasons and filter_reasons[i] in EXCLUDED_FILTER_REASONS:
+            continue
+        if turns:
+            previous = messages[turns[-1][-1]]
+            if (
+                msg.get("sender") == previous.get("sender")
+                and not _gap_exceeded(previous.get("timestamp"), msg.get("timestamp"), gap)
+            ):
+                turns[-1].append(i)
+                continue
+        turns.append([i])
+    return turns
+
+
+def extract_reply_pairs(
+    messages: List[Dict],
+    target_sender: str,
+    filter_reasons: Optional[List[Optional[str]]] = None,
+    max_gap_minutes: int = 30,
+    max_messages: int = 4
+) -> List[Tuple[List[int], List[int]]]:
+    """
+    提取回复对，返回 (对方发言的消息下标, 人格回复的消息下标)
+    
+    对方的一轮发言之后max_gap_minutes内人格的下一轮发言即为回复；
+    每侧只保留紧挨着交接处的max_messages条。
+    """
+    gap = timedelta(minutes=max_gap_minutes)
+    turns = _turns(messages, gap, filter_reasons)
+    pairs = []
+    for prompt, reply in zip(turns, turns[1:]):
+        if (
+            messages[reply[0]].get("sender") == target_sender
+            and messages[prompt[0]].get("sender") != target_sender
+            and not _gap_exceeded(
+                messages[prompt[-1]].get("timestamp"), messages[reply[0]].get("timestamp"), gap
+            )
+        ):
+            pairs.append((prompt[-max_messages:], reply[:max_messages]))
+    return pairs
+
+
+def build_turn_text(messages: List[Dict], indices: List[int]) -> str:
+    """一轮发言的文本（只含内容，按行拼接）"""
+    return "\n".join(messages[i].get("content", "") for i in indices)
@@ -0,0 +1,485 @@
+"""
+说话风格分析 - 全量语料、列式批处理
+
+消息按批转换为列（内容、发送者、时间），在 NumPy 码点数组和整段文本的
+正则扫描上完成统计，一遍扫描得到完整画像：
+长度分布、表情频率、口头禅、标点习惯、按小时/星期的活跃度、回复间隔。
+
+统计量都是可合并的摘要（计数器、直方图、Space-Saving频繁项），
+可以序列化保存在Persona上，新增或删除消息时按批增量更新。
+"""
+
+import heapq
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Dict, List, Optional
+
+import numpy as np
+from beanie import PydanticObjectId
+
+from backend.core.logger import logger
+from backend.models.message import Message
+from backend.services.lexicon import NEGATIVE, POSITIVE, get_lexicon
+from backend.services.message_filter import PLACEHOLDER, PLACEHOLDER_TYPES
+
+# Unicode表情 + 微信/QQ的文字表情（[捂脸]、[旺柴]），排除[图片]等占位文本
+EMOJI_PATTERN = re.compile(
+    r"[\U0001F300-\U0001FAFF\U0001F000-\U0001F02F\u2600-\u27BF\u2B50]\uFE0F?"
+    r"|\[(?!(?:" + "|".join(PLACEHOLDER_TYPES) + r")\])[\u4e00-\u9fff]{1,4}\]"
+)
+ASCII_WORD_PATTERN = re.compile(r"[a-z]{2,}")
+
+PUNCTUATION = "，。！？、…~～!?,."
+QUESTION_MARKS = "?？"
+EXCLAMATION_MARKS = "!！"
+SENTENCE_ENDINGS = "吧呢啊呀啦嘛哦哈噢咯喔嘞"
+
+# 含这些虚词的二字组不作为常用词
+STOP_CHARS = set("的了是我你他她它在就都也和与这那有个吗么")
+
+LENGTH_BUCKETS = [1, 3, 6, 11, 21, 51, 101, 201]  # 各区间的下界
+LENGTH_LABELS = ["1-2", "3-5", "6-10", "11-20", "21-50", "51-100", "101-200", "200+"]
+MAX_LENGTH = 500
+REPLY_WINDOW_SECONDS = 3600
+CATCH_PHRASE_MAX_CHARS = 8
+CATCH_PHRASE_MIN_COUNT = 3
+
+# 频繁项摘要的容量
+EMOJI_CAPACITY = 100
+WORD_CAPACITY = 500
+PHRASE_CAPACITY = 200
+SUMMARY_VERSION = 1
+
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def _epoch_seconds(timestamps: List[datetime]) -> np.ndarray:
+    """datetime列表转Unix秒（比 np.array(..., "datetime64[s]") 快约5倍）"""
+    try:
+        return np.fromiter(
+            ((ts - _EPOCH) // _SECOND for ts in timestamps),
+            dtype=np.int64,
+            count=len(timestamps)
+        )
+    except TypeError:
+        # 混入带时区或非datetime的值时走通用转换
+        return np.array(timestamps, dtype="datetime64[s]").astype(np.int64)
+
+
+def _percentile(counts: np.ndarray, q: float) -> float:
+    """从计数直方图（下标即取值）求分位数"""
+    total = counts.sum()
+    if not total:
+        return 0.0
+    return float(np.searchsorted(np.cumsum(counts), q * total))
+
+
+def _messages_at(positions: List[int], starts: np.ndarray) -> np.ndarray:
+    """文本位置 -> 所在消息的下标（去重）"""
+    if not positions:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.searchsorted(starts, positions, side="right") - 1)
+
+
+def _sparse(counts: np.ndarray) -> List[List[int]]:
+    """直方图 -> [[下标, 计数], ...]，只保存非零项"""
+    index = np.flatnonzero(counts)
+    return [[int(i), int(counts[i])] for i in index]
+
+
+def _dense(pairs: List[List[int]], size: int) -> np.ndarray:
+    counts = np.zeros(size, dtype=np.int64)
+    for i, count in pairs or []:
+        counts[i] = count
+    return counts
+
+
+class SpaceSaving:
+    """
+    Space-Saving 频繁项摘要
+
+    最多跟踪 capacity 个项，计数是真实频次的上界，error 为可能的高估量。
+    一批精确计数并入时，未被跟踪的项以当前最小计数为基准加入，
+    再保留计数最大的 capacity 项，代价为 O(批内不同项数)。
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def update(self, batch: Dict[str, int]):
+        floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        for item, count in batch.items():
+            if item in self.counts:
+                self.counts[item] += count
+            else:
+                self.counts[item] = floor + count
+                self.errors[item] = floor
+        if len(self.counts) > self.capacity:
+            kept = heapq.nlargest(self.capacity, self.counts.items(), key=itemgetter(1))
+            self.counts = dict(kept)
+            self.errors = {item: self.errors.get(item, 0) for item in self.counts}
+
+    def subtract(self, batch: Dict[str, int]):
+        """删除消息时扣减已跟踪项的计数"""
+        for item, count in batch.items():
+            if item not in self.counts:
+                continue
+            remaining = self.counts[item] - count
+            if remaining > 0:
+                self.counts[item] = remaining
+                self.errors[item] = min(self.errors.get(item, 0), remaining)
+            else:
+                del self.counts[item]
+                self.errors.pop(item, None)
+
+    def top(self, k: int) -> List[tuple]:
+        # 计数相同时按项排序，保证序列化前后结果一致
+        return sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+
+    def to_list(self) -> List[list]:
+        return [[item, count, self.errors.get(item, 0)] for item, count in self.top(self.capacity)]
+
+    @classmethod
+    def from_list(cls, items: List[list], capacity: int) -> "SpaceSaving":
+        sketch = cls(capacity)
+        for item, count, error in items or []:
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+        return sketch
+
+
+class StyleAccumulator:
+    """
+    逐批累积的风格统计
+
+    文本类统计只针对目标发送者（被模拟的人），回复间隔需要全部消息：
+    目标发送者在他人消息之后 REPLY_WINDOW_SECONDS 内的发言计为一次回复。
+    批次需按时间顺序送入；删除消息时用 subtract 扣减（回复间隔不回退）。
+    """
+
+    def __init__(self, target_sender: Optional[str] = None, top_k: int = 20):
+        self.target_sender = target_sender
+        self.top_k = top_k
+
+        self.total_messages = 0
+        self.message_count = 0
+        self.length_counts = np.zeros(MAX_LENGTH + 1, dtype=np.int64)
+        self.question_count = 0
+        self.exclamation_count = 0
+        self.emoji_message_count = 0
+        self.positive_count = 0
+        self.negative_count = 0
+        self.punctuation = Counter()
+        self.endings = Counter()
+        self.emojis = SpaceSaving(EMOJI_CAPACITY)
+        self.words = SpaceSaving(WORD_CAPACITY)
+        self.short_messages = SpaceSaving(PHRASE_CAPACITY)
+        self.hours = np.zeros(24, dtype=np.int64)
+        self.weekdays = np.zeros(7, dtype=np.int64)
+        self.reply_counts = np.zeros(REPLY_WINDOW_SECONDS + 1, dtype=np.int64)
+
+        self._last_sender: Optional[str] = None
+        self._last_time: Optional[np.int64] = None
+
+    def update(
+        self,
+        contents: List[str],
+        senders: List[str],
+        timestamps: List,
+        filter_reasons: Optional[List[Optional[str]]] = None
+    ):
+        """处理一批按时间排序的消息"""
+        n = len(contents)
+        if not n:
+            return
+        self.total_messages += n
+
+        sender_array = np.array(senders, dtype=object)
+        seconds = _epoch_seconds(timestamps)
+        is_target = (
+            sender_array == self.target_sender if self.target_sender
+            else np.ones(n, dtype=bool)
+        )
+
+        self._update_replies(sender_array, seconds, is_target)
+
+        # 占位消息只计入活跃度和回复间隔
+        text_mask = is_target.copy()
+        if filter_reasons is not None:
+            text_mask &= np.array([reason != PLACEHOLDER for reason in filter_reasons])
+
+        target_seconds = seconds[is_target]
+        self.hours += np.bincount((target_seconds // 3600) % 24, minlength=24)
+        # 1970-01-01是星期四，周一为0
+        self.weekdays += np.bincount((target_seconds // 86400 + 3) % 7, minlength=7)
+
+        texts = [contents[i] for i in np.flatnonzero(text_mask)]
+        if texts:
+            self._update_text(texts)
+
+    def _update_replies(self, senders: np.ndarray, seconds: np.ndarray, is_target: np.ndarray):
+        previous_sender = np.empty(len(senders), dtype=object)
+        previous_sender[1:] = senders[:-1]
+        previous_sender[0] = self._last_sender
+        previous_time = np.empty(len(seconds), dtype=np.int64)
+        previous_time[1:] = seconds[:-1]
+        previous_time[0] = self._last_time if self._last_time is not None else seconds[0]
+
+        delta = seconds - previous_time
+        replies = (
+            is_target
+            & (previous_sender != senders)
+            & np.not_equal(previous_sender, None)
+            & (delta >= 0) & (delta <= REPLY_WINDOW_SECONDS)
+        )
+        self.reply_counts += np.bincount(delta[replies], minlength=REPLY_WINDOW_SECONDS + 1)
+
+        self._last_sender = senders[-1]
+        self._last_time = seconds[-1]
+
+    def _update_text(self, texts: List[str]):
+        n = len(texts)
+        self.message_count += n
+
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+        self.length_counts += np.bincount(np.minimum(lengths, MAX_LENGTH), minlength=MAX_LENGTH + 1)
+
+        # 以换行拼接成一段文本，starts为每条消息的起始码点位置
+        joined = "\n".join(texts)
+        starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        codepoints = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+        message_index = np.repeat(np.arange(n), lengths + 1)[:len(codepoints)]
+
+        def messages_with(chars: str) -> int:
+            hit = np.isin(codepoints, [ord(c) for c in chars])
+            return int(np.count_nonzero(np.bincount(message_index[hit], minlength=n)))
+
+        self.question_count += messages_with(QUESTION_MARKS)
+        self.exclamation_count += messages_with(EXCLAMATION_MARKS)
+        for char in PUNCTUATION:
+            count = int(np.count_nonzero(codepoints == ord(char)))
+            if count:
+                self.punctuation[char] += count
+
+        # 句末语气词（去掉结尾标点后的最后一个字）
+        for text in texts:
+            stripped = text.rstrip(PUNCTUATION + " ")
+            if stripped and stripped[-1] in SENTENCE_ENDINGS:
+                self.endings[stripped[-1]] += 1
+
+        emoji_matches = list(EMOJI_PATTERN.finditer(joined))
+        if emoji_matches:
+            self.emojis.update(Counter(m.group() for m in emoji_matches))
+            self.emoji_message_count += len(_messages_at([m.start() for m in emoji_matches], starts))
+
+        # 情绪词典整段文本扫描一次
+        emotion_positions = {POSITIVE: [], NEGATIVE: []}
+        for position, category, _ in get_lexicon().finditer(joined):
+            if category in emotion_positions:
+                emotion_positions[category].append(position)
+        positive = _messages_at(emotion_positions[POSITIVE], starts)
+        negative = _messages_at(emotion_positions[NEGATIVE], starts)
+        self.positive_count += len(np.setdiff1d(positive, negative, assume_unique=True))
+        self.negative_count += len(np.setdiff1d(negative, positive, assume_unique=True))
+
+        # 中文二字组: 相邻两个码点都是汉字
+        cjk = (codepoints >= 0x4E00) & (codepoints <= 0x9FFF)
+        pairs = cjk[:-1] & cjk[1:]
+        keys = (codepoints[:-1].astype(np.uint64) << np.uint64(32)) | codepoints[1:]
+        unique, counts = np.unique(keys[pairs], return_counts=True)
+        words = Counter(ASCII_WORD_PATTERN.findall(joined.lower()))
+        for key, count in zip(unique.tolist(), counts.tolist()):
+            word = chr(key >> 32) + chr(key & 0xFFFFFFFF)
+            if not STOP_CHARS.intersection(word):
+                words[word] += count
+        self.words.update(words)
+
+        self.short_messages.update(Counter(
+            text.strip() for text in texts
+            if 2 <= len(text.strip()) <= CATCH_PHRASE_MAX_CHARS
+        ))
+
+    def subtract(self, removed: "StyleAccumulator"):
+        """扣减另一个摘要（由被删除的消息构建）"""
+        for name in (
+            "total_messages", "message_count", "question_count", "exclamation_count",
+            "emoji_message_count", "positive_count", "negative_count",
+        ):
+            setattr(self, name, max(getattr(self, name) - getattr(removed, name), 0))
+        for name in ("length_counts", "hours", "weekdays"):
+            setattr(self, name, np.maximum(getattr(self, name) - getattr(removed, name), 0))
+        self.punctuation = +(self.punctuation - removed.punctuation)
+        self.endings = +(self.endings - removed.endings)
+        for name in ("emojis", "words", "short_messages"):
+            getattr(self, name).subtract(getattr(removed, name).counts)
+
+    def to_summary(self) -> Dict:
+        """序列化为可存入MongoDB的摘要（键都不含"."）"""
+        return {
+            "version": SUMMARY_VERSION,
+            "target_sender": self.target_sender,
+            "total_messages": self.total_messages,
+            "message_count": self.message_count,
+            "question_count": self.question_count,
+            "exclamation_count": self.exclamation_count,
+            "emoji_message_count": self.emoji_message_count,
+            "positive_count": self.positive_count,
+            "negative_count": self.negative_count,
+            "length_counts": _sparse(self.length_counts),
+            "reply_counts": _sparse(self.reply_counts),
+            "hours": self.hours.tolist(),
+            "weekdays": self.weekdays.tolist(),
+            "punctuation": [[c, n] for c, n in self.punctuation.items()],
+            "endings": [[c, n] for c, n in self.endings.items()],
+            "emojis": self.emojis.to_list(),
+            "words": self.words.to_list(),
+            "short_messages": self.short_messages.to_list(),
+            "last_sender": self._last_sender,
+            "last_time": int(self._last_time) if self._last_time is not None else None,
+        }
+
+    @classmethod
+    def from_summary(cls, summary: Dict, top_k: int = 20) -> "StyleAccumulator":
+        accumulator = cls(target_sender=summary.get("target_sender"), top_k=top_k)
+        for name in (
+            "total_messages", "message_count", "question_count", "exclamation_count",
+            "emoji_message_count", "positive_count", "negative_count",
+        ):
+            setattr(accumulator, name, summary.get(name, 0))
+        accumulator.length_counts = _dense(summary.get("length_counts"), MAX_LENGTH + 1)
+        accumulator.reply_counts = _dense(summary.get("reply_counts"), REPLY_WINDOW_SECONDS + 1)
+        accumulator.hours = np.array(summary.get("hours") or [0] * 24, dtype=np.int64)
+        accumulator.weekdays = np.array(summary.get("weekdays") or [0] * 7, dtype=np.int64)
+        accumulator.punctuation = Counter(dict(summary.get("punctuation") or []))
+        accumulator.endings = Counter(dict(summary.get("endings") or []))
+        accumulator.emojis = SpaceSaving.from_list(summary.get("emojis"), EMOJI_CAPACITY)
+        accumulator.words = SpaceSaving.from_list(summary.get("words"), WORD_CAPACITY)
+        accumulator.short_messages = SpaceSaving.from_list(summary.get("short_messages"), PHRASE_CAPACITY)
+        accumulator._last_sender = summary.get("last_sender")
+        accumulator._last_time = summary.get("last_time")
+        return accumulator
+
+    def result(self) -> Dict:
+        """生成风格画像"""
+        n = self.message_count or 1
+        replies = int(self.reply_counts.sum())
+        reply_seconds = np.arange(REPLY_WINDOW_SECONDS + 1)
+        length_hist = np.add.reduceat(self.length_counts, LENGTH_BUCKETS)
+        peak_hour = int(self.hours.argmax()) if self.hours.any() else None
+
+        return {
+            "total_messages": self.total_messages,
+            "message_count": self.message_count,
+            "length": {
+                "mean": float((self.length_counts * np.arange(MAX_LENGTH + 1)).sum() / n),
+                "p50": _percentile(self.length_counts, 0.5),
+                "p90": _percentile(self.length_counts, 0.9),
+                "histogram": dict(zip(LENGTH_LABELS, length_hist.tolist())),
+            },
+            "question_rate": self.question_count / n,
+            "exclamation_rate": self.exclamation_count / n,
+            "emoji_rate": self.emoji_message_count / n,
+            "emojis": dict(self.emojis.top(self.top_k)),
+            "emotion": {
+                "positive": self.positive_count / n,
+                "negative": self.negative_count / n,
+                "neutral": (self.message_count - self.positive_count - self.negative_count) / n,
+            },
+            "punctuation": {c: count / n for c, count in self.punctuation.most_common()},
+            "sentence_endings": {c: count / n for c, count in self.endings.most_common(5)},
+            "frequent_words": [w for w, _ in self.words.top(self.top_k)],
+            "catch_phrases": [
+                phrase for phrase, count in self.short_messages.top(self.top_k)
+                if count >= CATCH_PHRASE_MIN_COUNT
+            ],
+            "activity": {
+                "hours": self.hours.tolist(),
+                "weekdays": self.weekdays.tolist(),
+                "peak_period": f"{peak_hour}:00-{(peak_hour + 1) % 24}:00" if peak_hour is not None else "未知",
+            },
+            "reply_latency": {
+                "count": replies,
+                "mean_seconds": float((self.reply_counts * reply_seconds).sum() / replies) if replies else 0.0,
+                "p50_seconds": _percentile(self.reply_counts, 0.5),
+                "p90_seconds": _percentile(self.reply_counts, 0.9),
+            },
+        }
+
+
+def persona_fields(profile: Dict) -> Dict:
+    """将风格画像映射为Persona上的字段"""
+    if not profile or not profile.get("message_count"):
+        return {}
+    return {
+        "style_features": {
+            **profile["emotion"],
+            "question_rate": profile["question_rate"],
+            "exclamation_rate": profile["exclamation_rate"],
+            "emoji_rate": profile["emoji_rate"],
+        },
+        "emoji_profile": profile["emojis"],
+        "frequent_words": profile["frequent_words"],
+        "sentence_patterns": {
+            "average_message_length": profile["length"]["mean"],
+            "length": profile["length"],
+            # 标点含"."，不能作为MongoDB字段名
+            "punctuation": [[c, rate] for c, rate in profile["punctuation"].items()],
+            "sentence_endings": profile["sentence_endings"],
+            "catch_phrases": profile["catch_phrases"],
+            "average_response_time_seconds": profile["reply_latency"]["mean_seconds"],
+        },
+        "activity_profile": {
+            **profile["activity"],
+            "reply_latency": profile["reply_latency"],
+        },
+    }
+
+
+class StyleAnalyticsService:
+    """从数据库流式读取人格的全部消息并生成风格画像"""
+
+    def __init__(self, batch_size: int = 50000):
+        self.batch_size = batch_size
+
+    async def build_accumulator(
+        self,
+        persona_id: str,
+        target_sender: Optional[str] = None
+    ) -> StyleAccumulator:
+        """全量扫描人格的消息，构建风格摘要"""
+        accumulator = StyleAccumulator(target_sender=target_sender)
+        cursor = Message.get_motor_collection().find(
+            {"persona_id": PydanticObjectId(persona_id)},
+            {"content": 1, "sender": 1, "timestamp": 1, "filter_reason": 1, "_id": 0}
+        ).sort("timestamp", 1).batch_size(10000)
+
+        columns = ([], [], [], [])
+        async for doc in cursor:
+            columns[0].append(doc.get("content", ""))
+            columns[1].append(doc.get("sender"))
+            columns[2].append(doc.get("timestamp"))
+            columns[3].append(doc.get("filter_reason"))
+            if len(columns[0]) >= self.batch_size:
+                accumulator.update(*columns)
+                columns = ([], [], [], [])
+        accumulator.update(*columns)
+
+        logger.info(
+            f"风格分析完成: {persona_id}，{accumulator.total_messages} 条消息，"
+            f"目标发送者 {accumulator.message_count} 条"
+        )
+        return accumulator
+
+    async def analyze_persona(
+        self,
+        persona_id: str,
+        target_sender: Optional[str] = None
+    ) -> Dict:
+        accumulator = await self.build_accumulator(persona_id, target_sender)
+        return accumulator.result()
@@ -0,0 +1,148 @@
+"""
+中文分词服务 - 进程内共享的jieba分词器
+
+词典每个进程只加载一次；jieba把前缀词典序列化缓存到 TOKENIZER_CACHE_DIR，
+之后的进程（包括批量分词的子进程）直接读缓存，冷启动从约1秒降到约0.1秒。
+
+- keywords(): 单条查询的低延迟路径（关闭HMM新词发现）
+- keywords_batch(): 导入时的批量路径，大批量时分块交给进程池
+- add_words(): 人格口头禅作为用户词典，避免被切碎
+"""
+
+import asyncio
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+from backend.core.config import settings
+from backend.core.logger import logger
+
+STOP_WORDS = set("的 了 是 我 你 他 她 它 在 就 都 也 和 与 这 那 有 个 吗 么 啊 吧 呢 哦 嗯".split())
+# 只含标点、空白或数字的词不作为关键词
+NON_WORD_PATTERN = re.compile(r"^[\W\d_]+$")
+MAX_KEYWORDS = 20
+
+
+class Tokenizer:
+    """jieba分词器的进程内单例"""
+
+    _instance: Optional["Tokenizer"] = None
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or settings.TOKENIZER_CACHE_DIR
+        self.user_words: Set[str] = set()
+        self._jieba = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "Tokenizer":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _load(self):
+        if self._jieba is None:
+            with self._lock:
+                if self._jieba is None:
+                    import jieba
+
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tokenizer = jieba.Tokenizer()
+                    tokenizer.tmp_dir = self.cache_dir
+                    tokenizer.initialize()
+                    for word in self.user_words:
+                        tokenizer.add_word(word)
+                    self._jieba = tokenizer
+                    logger.info(f"分词词典已加载，缓存目录: {self.cache_dir}")
+        return self._jieba
+
+    def warm(self):
+        """预先加载词典（应用启动时调用）"""
+        self._load()
+
+    def add_words(self, words: Iterable[str]):
+        """加入用户词（人格口头禅等），已加入的词跳过"""
+        new_words = [w for w in words if w and w not in self.user_words]
+        if not new_words:
+            return
+        self.user_words.update(new_words)
+        if self._jieba is not None:
+            for word in new_words:
+                self._jieba.add_word(word)
+
+    def cut(self, text: str) -> List[str]:
+        return self._load().lcut(text, HMM=False) if text else []
+
+    def keywords(self, text: str) -> List[str]:
+        """单条文本的关键词（去停用词、去标点，按出现顺序去重）"""
+        seen = []
+        for word in self.cut(text):
+            word = word.strip().lower()
+            if (
+                len(word) > 1
+                and word not in STOP_WORDS
+                and not NON_WORD_PATTERN.match(word)
+                and word not in seen
+            ):
+                seen.append(word)
+                if len(seen) >= MAX_KEYWORDS:
+                    break
+        return seen
+
+    def keywords_many(self, texts: Sequence[str]) -> List[List[str]]:
+        return [self.keywords(text) for text in texts]
+
+    async def keywords_batch(self, texts: Sequence[str]) -> List[List[str]]:
+        """导入用的批量分词，不阻塞事件循环"""
+        if not texts:
+            return []
+        workers = settings.TOKENIZER_WORKERS
+        if workers <= 1 or len(texts) < settings.TOKENIZER_POOL_MIN_TEXTS:
+            return await asyncio.to_thread(self.keywords_many, texts)
+
+        loop = asyncio.get_running_loop()
+        chunk_size = -(-len(texts) // workers)
+        user_words = tuple(sorted(self.user_words))
+        results = await asyncio.gather(*(
+            loop.run_in_executor(_pool(), _keywords_chunk, list(texts[i:i + chunk_size]), user_words)
+            for i in range(0, len(texts), chunk_size)
+        ))
+        return [keywords for chunk in results for keywords in chunk]
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_worker():
+    Tokenizer.instance().warm()
+
+
+def _keywords_chunk(texts: List[str], user_words: Tuple[str, ...]) -> List[List[str]]:
+    """子进程内执行，复用该进程已加载的词典"""
+    tokenizer = Tokenizer.instance()
+    tokenizer.add_words(user_words)
+    return tokenizer.keywords_many(texts)
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 不用fork: 父进程中的事件循环、Motor连接和线程锁在子进程里会处于不一致状态；
+        # spawn的子进程从缓存加载词典，由initializer预热
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.TOKENIZER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    return _executor
+
+
+def shutdown_pool():
+    """关闭分词进程池（应用退出时调用）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,224 @@
+"""
+话题聚类 - 人格检索单元（窗口或消息）向量的 mini-batch k-means
+
+- 全量训练: 读取人格全部向量，训练后按话题批量写回 topic_id，
+  保存话题中心、成员数和代表词，并用代表词更新 Persona.topic_preferences
+- 增量分配: 新导入的文档写入前直接分配到最近的话题并更新中心，
+  累计增量达到训练规模的 TOPIC_REFIT_RATIO 后在后台重新训练
+"""
+
+import asyncio
+import math
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from beanie import PydanticObjectId
+from pymongo import UpdateMany
+
+from backend.core.config import settings
+from backend.core.identity_map import document_cache
+from backend.core.logger import logger
+from backend.models.persona import Persona
+from backend.models.persona_topics import PersonaTopics
+from backend.services.embedding_backfill import TARGETS, default_target
+from backend.services.rag_service import RAGService
+from backend.services.tokenizer import Tokenizer
+from backend.services.vector_search import MiniBatchKMeans, normalize_rows
+
+LABEL_WORDS = 3  # 每个话题的代表词数
+LABEL_SAMPLE = 200  # 每个话题取离中心最近的多少个成员提取代表词
+TOPIC_PREFERENCES = 5
+ID_CHUNK = 10000  # 按话题批量写回时每个$in的id数
+ASSIGN_RETRIES = 3  # 增量分配遇到并发更新时的重试次数
+
+
+def choose_k(n: int) -> int:
+    """话题数取 sqrt(n/2)，限制在 [2, TOPIC_CLUSTERS_MAX]"""
+    return max(2, min(settings.TOPIC_CLUSTERS_MAX, int(math.sqrt(n / 2))))
+
+
+def label_topics(texts_by_topic: List[List[str]], tokenizer: Tokenizer) -> List[List[str]]:
+    """每个话题取区分度最高的词: 话题内出现的成员数 × log(话题数 / 含该词的话题数)"""
+    counters = [
+        Counter(word for text in texts for word in set(tokenizer.keywords(text)))
+        for texts in texts_by_topic
+    ]
+    topic_freq = Counter(word for counter in counters for word in counter)
+    k = len(counters)
+    labels = []
+    for counter in counters:
+        scored = sorted(
+            counter.items(),
+            key=lambda item: (-item[1] * math.log((k + 1) / topic_freq[item[0]]), item[0])
+        )
+        labels.append([word for word, _ in scored[:LABEL_WORDS]])
+    return labels
+
+
+class TopicClusteringService:
+    """人格话题聚类"""
+
+    # 进程内正在训练的任务: persona_id -> Task
+    _running: Dict[str, asyncio.Task] = {}
+
+    def __init__(self, rag_service: Optional[RAGService] = None):
+        self.rag_service = rag_service or RAGService()
+        self.tokenizer = Tokenizer.instance()
+
+    def _invalidate(self, persona_id: str, target: str):
+        # topic_id写回不改变文档数，检索缓存需要显式清除
+        if target == "message_windows":
+            self.rag_service.window_cache.invalidate(persona_id)
+
+    async def cluster_persona(self, persona_id: str, target: Optional[str] = None) -> Optional[PersonaTopics]:
+        """全量训练，文档数不足TOPIC_MIN_DOCS时返回None"""
+        target = target or default_target()
+        document, text_field = TARGETS[target]
+        collection = document.get_motor_collection()
+        persona_oid = PydanticObjectId(persona_id)
+
+        ids, vectors, texts = [], [], []
+        cursor = collection.find(
+            {"persona_id": persona_oid, "embedding": {"$ne": None}},
+            {"embedding": 1, text_field: 1}
+        )
+        async for doc in cursor:
+            ids.append(doc["_id"])
+            vectors.append(doc["embedding"])
+            texts.append(doc.get(text_field) or "")
+        if len(ids) < settings.TOPIC_MIN_DOCS:
+            logger.info(f"人格 {persona_id} 只有 {len(ids)} 个向量，暂不聚类")
+            return None
+
+        started = datetime.utcnow()
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        del vectors
+        model = MiniBatchKMeans(choose_k(len(ids)))
+        labels = await asyncio.to_thread(model.fit, matrix)
+
+        # 代表词取自离中心最近的成员
+        samples = []
+        for topic in range(model.k):
+            members = np.flatnonzero(labels == topic)
+            nearest = members[np.argsort(-(matrix[members] @ model.centroids[topic]))[:LABEL_SAMPLE]]
+            samples.append([texts[i] for i in nearest])
+        topic_labels = await asyncio.to_thread(label_topics, samples, self.tokenizer)
+
+        # 每个话题一条UpdateMany，而不是逐文档更新
+        operations = []
+        for topic in range(model.k):
+            members = [ids[i] for i in np.flatnonzero(labels == topic)]
+            for i in range(0, len(members), ID_CHUNK):
+                operations.append(UpdateMany(
+                    {"_id": {"$in": members[i:i + ID_CHUNK]}}, {"$set": {"topic_id": topic}}
+                ))
+        if operations:
+            await collection.bulk_write(operations, ordered=False)
+
+        topics = await PersonaTopics.find_one({"persona_id": persona_oid})
+        if topics is None:
+            topics = PersonaTopics(persona_id=persona_oid, target=target)
+        topics.target = target
+        topics.centroids = model.centroids.tolist()
+        topics.counts = model.counts.tolist()
+        topics.labels = topic_labels
+        topics.fitted_count = len(ids)
+        topics.assigned_since_fit = 0
+        topics.version += 1
+        topics.fitted_at = topics.updated_at = datetime.utcnow()
+        await topics.save()
+
+        largest = np.argsort(-model.counts)[:TOPIC_PREFERENCES]
+        await Persona.find_one({"_id": persona_oid}).update({"$set": {
+            "topic_preferences": ["、".join(topic_labels[i]) for i in largest if topic_labels[i]],
+        }})
+        document_cache.invalidate(Persona, persona_oid)
+        self._invalidate(persona_id, target)
+
+        logger.info(
+            f"人格 {persona_id} 聚类完成: {len(ids)} 个文档，{model.k} 个话题，"
+            f"{(datetime.utcnow() - started).total_seconds():.1f}s"
+        )
+        return topics
+
+    async def assign(self, persona_id: str, docs: List[Dict], target: Optional[str] = None) -> int:
+        """
+        为即将写入的文档（原始字典，含embedding）分配话题并增量更新中心
+
+        人格尚未聚类、或正在后台重新训练时不做处理（topic_id留空，检索时总会参与打分），
+        返回分配的文档数。中心按读取时的version条件更新，与并发的分配或训练冲突时
+        重新读取后再试，多次冲突则放弃分配。
+        """
+        target = target or default_target()
+        embedded = [doc for doc in docs if doc.get("embedding")]
+        if not embedded:
+            return 0
+        # 训练完成后会用新模型写回topic_id，期间按旧模型分配的编号会与新话题错位
+        task = self._running.get(persona_id)
+        if task is not None and not task.done():
+            return 0
+
+        persona_oid = PydanticObjectId(persona_id)
+        vectors = normalize_rows(np.asarray([doc["embedding"] for doc in embedded], dtype=np.float32))
+        for _ in range(ASSIGN_RETRIES):
+            topics = await PersonaTopics.find_one({"persona_id": persona_oid})
+            if topics is None or topics.target != target or not topics.centroids:
+                return 0
+
+            model = MiniBatchKMeans(len(topics.centroids))
+            model.centroids = np.asarray(topics.centroids, dtype=np.float32)
+            model.counts = np.asarray(topics.counts, dtype=np.int64)
+            labels = model.partial_fit(vectors)
+
+            result = await PersonaTopics.get_motor_collection().update_one(
+                {"persona_id": persona_oid, "version": topics.version},
+                {
+                    "$set": {
+                        "centroids": model.centroids.tolist(),
+                        "counts": model.counts.tolist(),
+                        "updated_at": datetime.utcnow(),
+                    },
+                    "$inc": {"assigned_since_fit": len(embedded), "version": 1},
+                }
+            )
+            if result.matched_count:
+                for doc, topic in zip(embedded, labels.tolist()):
+                    doc["topic_id"] = topic
+                return len(embedded)
+
+        logger.info(f"人格 {persona_id} 话题中心并发更新冲突，本批 {len(embedded)} 个文档不分配话题")
+        return 0
+
+    async def needs_refit(self, persona_id: str, target: Optional[str] = None) -> bool:
+        target = target or default_target()
+        topics = await PersonaTopics.find_one({"persona_id": PydanticObjectId(persona_id)})
+        if topics is not None and topics.target == target:
+            return topics.assigned_since_fit >= settings.TOPIC_REFIT_RATIO * max(topics.fitted_count, 1)
+        document, _ = TARGETS[target]
+        count = await document.get_motor_collection().count_documents(
+            {"persona_id": PydanticObjectId(persona_id), "embedding": {"$ne": None}}
+        )
+        return count >= settings.TOPIC_MIN_DOCS
+
+    async def _run(self, persona_id: str, target: Optional[str]):
+        try:
+            await self.cluster_persona(persona_id, target)
+        except Exception as e:
+            logger.error(f"人格 {persona_id} 话题聚类失败: {str(e)}")
+
+    def start(self, persona_id: str, target: Optional[str] = None) -> asyncio.Task:
+        """后台训练，同一人格同时只有一个训练任务"""
+        task = self._running.get(persona_id)
+        if task is not None and not task.done():
+            return task
+        task = asyncio.create_task(self._run(persona_id, target))
+        self._running[persona_id] = task
+        task.add_done_callback(lambda _: self._running.pop(persona_id, None))
+        return task
+
+    async def maybe_refit(self, persona_id: str, target: Optional[str] = None):
+        """导入后调用: 首次达到聚类规模或增量过多时在后台重新训练"""
+        if await self.needs_refit(persona_id, target):
+            self.start(persona_id, target)
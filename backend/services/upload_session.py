@@ -0,0 +1,255 @@
+"""
+分块上传服务 - 支持断点续传
+
+协议: init -> put-chunk(offset) -> complete，可随时 abort
+分块直接流式写入磁盘，同时增量计算SHA-256，完成时无需重新读取文件。
+SHA-256校验失败时会话重置到偏移量0，客户端从头重传；
+超过 UPLOAD_SESSION_TTL 无活动的未完成会话在读取或创建新会话时删除。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+from uuid import uuid4
+
+import aiofiles
+
+from backend.core.config import settings
+from backend.core.logger import logger
+
+ALLOWED_EXTENSIONS = ['.zip', '.db', '.txt', '.json', '.html']
+
+
+class OffsetMismatchError(ValueError):
+    """分块偏移量与服务端已接收的字节数不一致"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"偏移量不匹配，应从 {expected} 继续上传")
+        self.expected = expected
+
+
+class ChecksumMismatchError(ValueError):
+    """完成上传时SHA-256不匹配，会话已重置"""
+
+    def __init__(self):
+        super().__init__("文件校验失败，SHA-256不匹配，上传会话已重置，请从头重新上传")
+        self.expected = 0
+
+
+class UploadSessionService:
+    """分块上传会话管理"""
+
+    # 进程内的增量哈希状态: upload_id -> (hasher, 已哈希字节数)
+    _hashers: Dict[str, tuple] = {}
+    _locks: Dict[str, asyncio.Lock] = {}
+
+    def __init__(self, upload_dir: Optional[str] = None):
+        self.upload_dir = upload_dir or settings.UPLOAD_DIR
+        os.makedirs(self.upload_dir, exist_ok=True)
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{upload_id}.json")
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.upload_dir, f"{upload_id}.part")
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        if upload_id not in self._locks:
+            self._locks[upload_id] = asyncio.Lock()
+        return self._locks[upload_id]
+
+    async def _save_meta(self, meta: Dict):
+        meta["updated_at"] = datetime.utcnow().isoformat()
+        async with aiofiles.open(self._meta_path(meta["upload_id"]), 'w') as f:
+            await f.write(json.dumps(meta))
+
+    def _forget(self, upload_id: str):
+        """释放会话的进程内状态"""
+        self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+
+    def _discard(self, upload_id: str):
+        """删除会话的分片和元数据"""
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._forget(upload_id)
+
+    @staticmethod
+    def _is_expired(meta: Dict) -> bool:
+        if meta["status"] != "uploading":
+            return False
+        last_active = datetime.fromisoformat(meta.get("updated_at") or meta["created_at"])
+        return (datetime.utcnow() - last_active).total_seconds() > settings.UPLOAD_SESSION_TTL
+
+    async def cleanup_expired(self) -> int:
+        """删除超时未完成的会话，返回删除数量"""
+        removed = 0
+        for name in os.listdir(self.upload_dir):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            try:
+                async with aiofiles.open(self._meta_path(upload_id), 'r') as f:
+                    meta = json.loads(await f.read())
+            except (OSError, ValueError):
+                continue
+            if self._is_expired(meta):
+                self._discard(upload_id)
+                removed += 1
+        if removed:
+            logger.info(f"清理过期上传会话 {removed} 个")
+        return removed
+
+    async def get_session(self, upload_id: str, user_id: str) -> Dict:
+        """读取会话元数据并校验归属"""
+        # upload_id由服务端生成，拒绝任何路径字符
+        if not upload_id or os.path.basename(upload_id) != upload_id:
+            raise KeyError(upload_id)
+        try:
+            async with aiofiles.open(self._meta_path(upload_id), 'r') as f:
+                meta = json.loads(await f.read())
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+        if self._is_expired(meta):
+            self._discard(upload_id)
+            raise KeyError(upload_id)
+        if meta["user_id"] != user_id:
+            raise PermissionError("无权访问该上传会话")
+        return meta
+
+    async def init_session(
+        self,
+        user_id: str,
+        filename: str,
+        total_size: int,
+        sha256: Optional[str] = None,
+        persona_id: Optional[str] = None
+    ) -> Dict:
+        """创建上传会话"""
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in ALLOWED_EXTENSIONS:
+            raise ValueError(f"不支持的文件类型 {file_ext}")
+        if total_size <= 0 or total_size > settings.MAX_UPLOAD_SIZE:
+            raise ValueError(f"文件大小必须在1字节到{settings.MAX_UPLOAD_SIZE}字节之间")
+
+        await self.cleanup_expired()
+        upload_id = str(uuid4())
+        meta = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "filename": filename,
+            "file_ext": file_ext,
+            "total_size": total_size,
+            "expected_sha256": sha256.lower() if sha256 else None,
+            "persona_id": persona_id,
+            "offset": 0,
+            "status": "uploading",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        # 预先创建空文件，续传时按偏移量追加
+        async with aiofiles.open(self._part_path(upload_id), 'wb'):
+            pass
+        await self._save_meta(meta)
+        self._hashers[upload_id] = (hashlib.sha256(), 0)
+
+        return meta
+
+    async def _get_hasher(self, upload_id: str, offset: int):
+        """获取覆盖到offset的哈希状态，进程重启后从已写入的分片重建"""
+        hasher, hashed = self._hashers.get(upload_id, (None, -1))
+        if hasher is not None and hashed == offset:
+            # 返回副本，分块写入失败时缓存的状态保持不变
+            return hasher.copy()
+
+        hasher = hashlib.sha256()
+        remaining = offset
+        async with aiofiles.open(self._part_path(upload_id), 'rb') as f:
+            while remaining > 0:
+                block = await f.read(min(settings.UPLOAD_CHUNK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    async def put_chunk(
+        self,
+        upload_id: str,
+        user_id: str,
+        offset: int,
+        stream: AsyncIterator[bytes]
+    ) -> Dict:
+        """从指定偏移量追加一个分块，边接收边写盘"""
+        async with self._lock(upload_id):
+            meta = await self.get_session(upload_id, user_id)
+            if meta["status"] != "uploading":
+                raise ValueError("上传会话已结束")
+            if offset != meta["offset"]:
+                raise OffsetMismatchError(meta["offset"])
+
+            hasher = await self._get_hasher(upload_id, offset)
+            written = 0
+            async with aiofiles.open(self._part_path(upload_id), 'r+b') as f:
+                # 截断上次中断时可能残留的不完整数据
+                await f.truncate(offset)
+                await f.seek(offset)
+                async for piece in stream:
+                    if not piece:
+                        continue
+                    written += len(piece)
+                    if written > settings.UPLOAD_CHUNK_SIZE or offset + written > meta["total_size"]:
+                        await f.truncate(offset)
+                        raise ValueError("分块大小超出限制")
+                    await f.write(piece)
+                    hasher.update(piece)
+
+            meta["offset"] = offset + written
+            self._hashers[upload_id] = (hasher, meta["offset"])
+            await self._save_meta(meta)
+
+            return meta
+
+    async def complete(self, upload_id: str, user_id: str) -> Dict:
+        """完成上传：校验大小和哈希，返回最终文件路径"""
+        async with self._lock(upload_id):
+            meta = await self.get_session(upload_id, user_id)
+            if meta["status"] != "uploading":
+                raise ValueError("上传会话已结束")
+            if meta["offset"] != meta["total_size"]:
+                raise OffsetMismatchError(meta["offset"])
+
+            digest = (await self._get_hasher(upload_id, meta["offset"])).hexdigest()
+            if meta["expected_sha256"] and digest != meta["expected_sha256"]:
+                # 无法定位损坏的分块，清空已接收的数据，客户端从偏移量0重传
+                async with aiofiles.open(self._part_path(upload_id), 'r+b') as f:
+                    await f.truncate(0)
+                meta["offset"] = 0
+                await self._save_meta(meta)
+                self._forget(upload_id)
+                raise ChecksumMismatchError()
+
+            file_path = os.path.join(self.upload_dir, f"{upload_id}{meta['file_ext']}")
+            os.replace(self._part_path(upload_id), file_path)
+
+            meta.update({"status": "completed", "sha256": digest, "file_path": file_path})
+            await self._save_meta(meta)
+            self._forget(upload_id)
+
+            logger.info(f"分块上传完成: {upload_id} ({meta['total_size']} bytes)")
+            return meta
+
+    async def abort(self, upload_id: str, user_id: str):
+        """放弃未完成的上传，删除已接收的数据"""
+        async with self._lock(upload_id):
+            meta = await self.get_session(upload_id, user_id)
+            if meta["status"] != "uploading":
+                raise ValueError("上传会话已结束")
+            self._discard(upload_id)
+            logger.info(f"分块上传已取消: {upload_id}")
@@ -0,0 +1,187 @@
+"""
+进程内向量检索
+
+小规模人格直接对全部向量做暴力余弦相似度；向量矩阵按人格缓存，
+集合中的文档数变化时自动失效。
+
+做过话题聚类的大人格走两阶段检索: 先比较话题中心选出最近的几个话题，
+再只对这些话题的成员打分。缓存的矩阵按话题排序，每个话题是一段连续的行。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """行归一化，之后点积即余弦相似度"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_top_k(
+    query: List[float],
+    matrix: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """返回与query最相似的k行的下标和分数（matrix需已行归一化）"""
+    if matrix.size == 0 or k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    q = np.asarray(query, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm:
+        q = q / norm
+    scores = matrix @ q
+
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+def sort_by_topic(
+    ids: list,
+    matrix: np.ndarray,
+    topics: np.ndarray
+) -> Tuple[list, np.ndarray, np.ndarray]:
+    """按话题编号重排行，使每个话题的成员连续（未分配的-1排在最前）"""
+    order = np.argsort(topics, kind="stable")
+    return [ids[i] for i in order], matrix[order], topics[order]
+
+
+def probe_top_k(
+    query: List[float],
+    matrix: np.ndarray,
+    topics: np.ndarray,
+    centroids: np.ndarray,
+    k: int,
+    n_probe: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    两阶段检索: 只对最近的n_probe个话题及未分配的行打分
+
+    matrix/topics 需已按话题排序（sort_by_topic），centroids需已行归一化。
+    """
+    if matrix.size == 0 or k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    q = np.asarray(query, dtype=np.float32)
+    norm = np.linalg.norm(q)
+    if norm:
+        q = q / norm
+
+    probe, _ = cosine_top_k(q, centroids, n_probe)
+    # 每个话题在排序后矩阵中的行区间，-1（新写入尚未分配）始终参与打分
+    starts = np.searchsorted(topics, probe, side="left")
+    ends = np.searchsorted(topics, probe, side="right")
+    ranges = [(0, int(np.searchsorted(topics, 0, side="left")))]
+    ranges += [(int(s), int(e)) for s, e in zip(starts, ends) if e > s]
+
+    rows = np.concatenate([np.arange(s, e) for s, e in ranges])
+    scores = np.concatenate([matrix[s:e] @ q for s, e in ranges])
+    if not len(rows):
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return rows[top], scores[top]
+
+
+class MiniBatchKMeans:
+    """
+    球面 mini-batch k-means（输入为行归一化向量，相似度为点积）
+
+    每个中心按累计分配数做学习率递减的滑动平均，更新后重新归一化；
+    partial_fit 可在新文档写入时继续更新中心，无需重新训练。
+    """
+
+    def __init__(self, k: int, batch_size: int = 1024, iterations: int = 100, seed: int = 0):
+        self.k = k
+        self.batch_size = batch_size
+        self.iterations = iterations
+        self.rng = np.random.default_rng(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self.counts: Optional[np.ndarray] = None
+
+    def _init_centroids(self, X: np.ndarray):
+        """在样本上做k-means++初始化"""
+        sample = X[self.rng.choice(len(X), min(len(X), 50 * self.k), replace=False)]
+        centroids = [sample[self.rng.integers(len(sample))]]
+        distance = 1 - sample @ centroids[0]
+        for _ in range(1, self.k):
+            weights = np.clip(distance, 0, None)
+            total = weights.sum()
+            index = self.rng.choice(len(sample), p=weights / total) if total > 0 else self.rng.integers(len(sample))
+            centroids.append(sample[index])
+            distance = np.minimum(distance, 1 - sample @ sample[index])
+        self.centroids = np.array(centroids, dtype=np.float32)
+        self.counts = np.zeros(self.k, dtype=np.int64)
+
+    def partial_fit(self, batch: np.ndarray) -> np.ndarray:
+        """用一批向量更新中心，返回这批向量的话题编号"""
+        labels = np.argmax(batch @ self.centroids.T, axis=1)
+        sizes = np.bincount(labels, minlength=self.k)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, batch)
+
+        updated = sizes > 0
+        self.counts += sizes
+        rate = (sizes[updated] / self.counts[updated])[:, None]
+        means = sums[updated] / sizes[updated][:, None]
+        self.centroids[updated] = (1 - rate) * self.centroids[updated] + rate * means
+        self.centroids = normalize_rows(self.centroids)
+        return labels
+
+    def fit(self, X: np.ndarray) -> np.ndarray:
+        """训练并返回全部向量的话题编号"""
+        self.k = min(self.k, len(X))
+        self._init_centroids(X)
+        for _ in range(self.iterations):
+            self.partial_fit(X[self.rng.integers(0, len(X), self.batch_size)])
+        labels = self.predict(X)
+        # 计数改为最终分配数，后续增量更新以此为基准
+        self.counts = np.bincount(labels, minlength=self.k).astype(np.int64)
+        return labels
+
+    def predict(self, X: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(X[i:i + chunk] @ self.centroids.T, axis=1)
+            for i in range(0, len(X), chunk)
+        ]) if len(X) else np.array([], dtype=np.int64)
+
+
+class VectorCache:
+    """按人格缓存的向量矩阵: persona_id -> (文档数, id列表, 归一化矩阵, 话题编号)"""
+
+    def __init__(self, max_personas: int = 32):
+        self.max_personas = max_personas
+        self._entries: Dict[str, Tuple[int, list, np.ndarray, Optional[np.ndarray]]] = {}
+
+    def get(self, persona_id: str, count: int) -> Optional[Tuple[list, np.ndarray]]:
+        entry = self._entries.get(persona_id)
+        if entry is None or entry[0] != count:
+            return None
+        return entry[1], entry[2]
+
+    def get_topics(self, persona_id: str) -> Optional[np.ndarray]:
+        """与缓存矩阵逐行对应的话题编号（未聚类时为None）"""
+        entry = self._entries.get(persona_id)
+        return entry[3] if entry is not None else None
+
+    def put(
+        self,
+        persona_id: str,
+        count: int,
+        ids: list,
+        matrix: np.ndarray,
+        topics: Optional[np.ndarray] = None
+    ):
+        if persona_id not in self._entries and len(self._entries) >= self.max_personas:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[persona_id] = (count, ids, matrix, topics)
+
+    def invalidate(self, persona_id: str):
+        self._entries.pop(persona_id, None)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+向量回填 - 为缺失向量或降级写入了模拟向量的消息/窗口补生成向量
+
+用法:
+    python backfill_embeddings.py                      # 全部人格，只补缺失向量
+    python backfill_embeddings.py --include-mock       # 同时替换模拟向量
+    python backfill_embeddings.py --persona <id> --target messages
+
+中断后重新执行同样的命令即可从检查点继续。
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.core.database import init_db
+from backend.services.embedding_backfill import TARGETS, EmbeddingBackfillJob
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="向量回填")
+    parser.add_argument("--persona", help="只处理指定人格")
+    parser.add_argument("--target", choices=sorted(TARGETS), help="默认按EMBEDDING_UNIT选择")
+    parser.add_argument("--include-mock", action="store_true", help="重新生成模拟向量")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--concurrency", type=int)
+    args = parser.parse_args()
+
+    await init_db()
+
+    job = EmbeddingBackfillJob(
+        persona_id=args.persona,
+        target=args.target,
+        include_mock=args.include_mock,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        on_progress=lambda cp: print(
+            f"  {cp.processed}/{cp.total}  {cp.rate:.1f} docs/s  "
+            f"ETA {cp.eta_seconds or 0:.0f}s"
+        ),
+    )
+    print(f"🔄 回填任务 {job.job_id}")
+    checkpoint = await job.run()
+
+    if checkpoint.status == "completed":
+        print(f"✅ 完成: {checkpoint.processed} 条")
+    else:
+        print(f"❌ 失败: {checkpoint.error}")
+        print(f"   已处理 {checkpoint.processed}/{checkpoint.total}，重新运行将从 {checkpoint.last_id} 继续")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
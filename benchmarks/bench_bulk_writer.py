@@ -0,0 +1,109 @@
+"""
+消息批量写入性能基准
+
+对比 Beanie 模型 + 单次 insert_many 与 BulkWriter 原始文档分块并发写入，
+在本地 mongod 上测量 docs/s。
+
+用法:
+    python benchmarks/bench_bulk_writer.py --count 50000 --dim 1536
+    python benchmarks/bench_bulk_writer.py --url mongodb://localhost:27017 --in-flight 1 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beanie import PydanticObjectId, init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.write_concern import WriteConcern
+
+from backend.models.message import Message
+from backend.services.bulk_writer import BulkWriter
+
+TEXTS = ["哈哈哈哈太好笑了", "今天加班到很晚，好累啊", "周末一起去爬山吧？", "好的没问题"]
+
+
+def build_docs(count: int, dim: int):
+    persona_id = PydanticObjectId()
+    start = datetime(2024, 1, 1)
+    rng = random.Random(0)
+    return [
+        {
+            "_id": PydanticObjectId(),
+            "persona_id": persona_id,
+            "content": f"{TEXTS[i % len(TEXTS)]} {i}",
+            "sender": "小明" if i % 3 else "我",
+            "timestamp": start + timedelta(seconds=i * 30),
+            "embedding": [rng.random() for _ in range(dim)] if dim else None,
+            "filter_reason": None,
+            "message_type": "text",
+            "media_url": None,
+            "emotion": None,
+            "keywords": [],
+            "original_id": None,
+            "import_batch": "bench",
+            "fingerprint": f"bench-{i}",
+        }
+        for i in range(count)
+    ]
+
+
+async def bench_beanie(docs):
+    """改造前的写法: 逐条构造模型，整批一次insert_many"""
+    await Message.get_motor_collection().delete_many({})
+    start = time.perf_counter()
+    messages = [
+        Message(id=doc["_id"], **{k: v for k, v in doc.items() if k != "_id"})
+        for doc in docs
+    ]
+    await Message.insert_many(messages)
+    return time.perf_counter() - start
+
+
+async def bench_bulk_writer(docs, in_flight: int, write_concern: WriteConcern):
+    await Message.get_motor_collection().delete_many({})
+    start = time.perf_counter()
+    async with BulkWriter(
+        Message.get_motor_collection(),
+        max_in_flight=in_flight,
+        write_concern=write_concern,
+    ) as writer:
+        await writer.insert_many(docs)
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="secondself_bench")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536, help="向量维度，0表示不带向量")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--journal", action="store_true", help="写关注使用 j=true")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.url)
+    await init_beanie(database=client[args.database], document_models=[Message])
+
+    print(f"生成 {args.count} 条文档 (向量维度 {args.dim})...")
+    docs = build_docs(args.count, args.dim)
+    write_concern = WriteConcern(w=1, j=True if args.journal else None)
+
+    elapsed = await bench_beanie(docs)
+    print(f"Beanie insert_many:        {args.count / elapsed:8.0f} docs/s ({elapsed:.2f} s)")
+
+    for in_flight in args.in_flight:
+        elapsed = await bench_bulk_writer(docs, in_flight, write_concern)
+        print(f"BulkWriter in_flight={in_flight:<3}   {args.count / elapsed:8.0f} docs/s ({elapsed:.2f} s)")
+
+    await client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
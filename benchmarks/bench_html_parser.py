@@ -0,0 +1,101 @@
+"""
+HTML聊天记录解析性能基准
+
+生成指定大小的Telegram风格HTML导出，测量增量解析的吞吐(MB/s)和峰值RSS。
+
+用法:
+    python benchmarks/bench_html_parser.py --size-mb 200
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.html_chat_parser import iter_html_chat_batches
+
+MESSAGE_TEMPLATE = (
+    '<div class="message default clearfix" id="message{i}">\n'
+    ' <div class="body">\n'
+    '  <div class="pull_right date details" title="01.01.2024 10:{m:02d}:{s:02d}">10:{m:02d}</div>\n'
+    '  <div class="from_name">{sender}</div>\n'
+    '  <div class="text">{text}<br>第{i}条消息 <img class="emoji" alt="😊"></div>\n'
+    ' </div>\n'
+    '</div>\n'
+)
+
+TEXTS = ["哈哈哈哈太好笑了", "今天加班到很晚，好累啊", "周末一起去爬山吧？", "好的没问题"]
+
+
+def build_fixture(path: str, size_mb: int) -> int:
+    """写入不小于size_mb的测试文件，返回消息数"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<html><body><div class="history">\n')
+        while written < target:
+            block = "".join(
+                MESSAGE_TEMPLATE.format(
+                    i=count + j,
+                    m=(count + j) % 60,
+                    s=(count + j * 7) % 60,
+                    sender="小明" if (count + j) % 3 else "我",
+                    text=TEXTS[(count + j) % len(TEXTS)],
+                )
+                for j in range(1000)
+            )
+            f.write(block)
+            written += len(block.encode("utf-8"))
+            count += 1000
+        f.write("</div></body></html>\n")
+    return count
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux返回KB，macOS返回字节
+    return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--fixture", help="使用已有的HTML文件")
+    args = parser.parse_args()
+
+    tmp = None
+    path = args.fixture
+    if not path:
+        tmp = tempfile.NamedTemporaryFile(suffix=".html", delete=False)
+        tmp.close()
+        path = tmp.name
+        print(f"生成 {args.size_mb}MB 测试文件...")
+        build_fixture(path, args.size_mb)
+
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    total = 0
+    for batch in iter_html_chat_batches(path, batch_size=args.batch_size):
+        total += len(batch)
+    elapsed = time.perf_counter() - start
+
+    print(f"文件大小: {size_mb:.1f} MB")
+    print(f"消息数: {total}")
+    print(f"耗时: {elapsed:.2f} s")
+    print(f"吞吐: {size_mb / elapsed:.1f} MB/s, {total / elapsed:.0f} msg/s")
+    print(f"峰值RSS: {peak_rss_mb():.1f} MB (解析前 {rss_before:.1f} MB)")
+
+    if tmp:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+登录风暴下的事件循环延迟基准
+
+模拟 N 个并发登录（每个做一次bcrypt校验），同时有一个“对话流”协程每隔 interval
+毫秒被调度一次，记录其调度延迟的 p50/p99。对比改造前在事件循环上直接校验
+与改造后在哈希线程池中校验:
+    - 登录吞吐（logins/s）
+    - 登录期间对话流的调度延迟 p99（即聊天流式输出会被卡住多久）
+
+用法:
+    python benchmarks/bench_login_storm.py --logins 64
+    python benchmarks/bench_login_storm.py --logins 128 --workers 4 --rounds 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core import security
+from backend.core.config import settings
+
+PASSWORD = "SecurePassword123!"
+
+
+async def chat_stream(interval: float, delays: list, stop: asyncio.Event):
+    """按固定间隔“输出一个token”，记录实际间隔超出预期的部分"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def login_inline(hashed: str):
+    """改造前: 直接在事件循环上做bcrypt"""
+    return security.verify_password(PASSWORD, hashed)
+
+
+async def login_off_loop(hashed: str):
+    """改造后: 在哈希线程池中做bcrypt"""
+    return await security.verify_password_async(PASSWORD, hashed)
+
+
+async def run(login, hashed: str, logins: int, interval: float):
+    delays = []
+    stop = asyncio.Event()
+    stream = asyncio.create_task(chat_stream(interval, delays, stop))
+    await asyncio.sleep(interval * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login(hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await stream
+    assert all(results)
+    delays.sort()
+    return {
+        "logins_per_s": logins / elapsed,
+        "p50_ms": statistics.median(delays),
+        "p99_ms": delays[min(len(delays) - 1, int(len(delays) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64, help="并发登录数")
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS, help="哈希线程数")
+    parser.add_argument("--interval", type=float, default=5, help="对话流输出间隔(ms)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    settings.PASSWORD_HASH_MAX_PENDING = max(settings.PASSWORD_HASH_MAX_PENDING, args.logins)
+    security._hash_executor = security.ThreadPoolExecutor(
+        max_workers=args.workers, thread_name_prefix="password-hash"
+    )
+    hashed = security.get_password_hash(PASSWORD)
+
+    for name, login in [("inline", login_inline), ("off-loop", login_off_loop)]:
+        rounds = [
+            asyncio.run(run(login, hashed, args.logins, args.interval / 1000))
+            for _ in range(args.rounds)
+        ]
+        print(
+            f"{name:>9}: {statistics.median(r['logins_per_s'] for r in rounds):8.1f} logins/s  "
+            f"chat p50 {statistics.median(r['p50_ms'] for r in rounds):7.1f}ms  "
+            f"p99 {statistics.median(r['p99_ms'] for r in rounds):7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
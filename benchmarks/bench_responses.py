@@ -0,0 +1,108 @@
+"""
+响应序列化性能基准
+
+对比改造前后把Beanie文档编码成HTTP响应体的耗时:
+    - encoder: 未声明response_model时，jsonable_encoder（纯Python遍历，ObjectId/datetime
+               逐个转换）+ json.dumps（对话路由改造前）
+    - model:   声明response_model，pydantic-core校验并序列化 + json.dumps（人格列表改造前）
+    - orjson:  声明response_model + orjson编码（改造后）
+    - direct:  直接返回 ORJSONResponse(文档)，跳过校验
+场景为长对话详情（messages数组）和人格列表。不需要数据库。
+
+用法:
+    python benchmarks/bench_responses.py --messages 5000 --personas 500
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from beanie import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from backend.core.responses import ORJSONResponse
+from backend.models.chat_model import Chat, ChatMessage
+from backend.schemas.chat import ChatDetail
+from backend.schemas.persona import PersonaResponse, PersonaSummary
+
+TEXTS = ["哈哈哈哈太好笑了", "今天加班到很晚，好累啊", "周末一起去爬山吧？", "好的没问题，明天见"]
+
+
+def build_chat(count: int) -> Chat:
+    start = datetime(2024, 1, 1)
+    messages = [
+        ChatMessage(
+            role="user" if i % 2 == 0 else "assistant",
+            content=TEXTS[i % len(TEXTS)] * 3,
+            timestamp=start + timedelta(seconds=i * 30),
+        )
+        for i in range(count)
+    ]
+    chat = Chat.model_construct(
+        id=PydanticObjectId(), user_id=PydanticObjectId(), persona_id=PydanticObjectId(),
+        title="与小明的对话", messages=messages, revision_id=None,
+        created_at=start, updated_at=start,
+    )
+    chat.refresh_summary()
+    return chat
+
+
+def build_personas(count: int) -> List[PersonaSummary]:
+    start = datetime(2024, 1, 1)
+    return [
+        PersonaSummary(
+            id=str(PydanticObjectId()), user_id=str(PydanticObjectId()), name=f"人格{i}",
+            status="ready", source_platform="wechat", message_count=i * 100,
+            date_range_start=start, date_range_end=start + timedelta(days=365),
+            style_features=None, emoji_profile={"😂": 0.3, "👍": 0.1}, topic_preferences=["工作", "旅行"],
+            personality_summary=None, created_at=start, updated_at=start,
+        )
+        for i in range(count)
+    ]
+
+
+def timed(func, rounds: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def bench(name: str, content, response_type, rounds: int):
+    adapter = TypeAdapter(response_type)
+
+    def serialize():
+        value = adapter.validate_python(content, from_attributes=True)
+        return adapter.dump_python(value, mode="json")
+
+    cases = [
+        ("encoder", lambda: JSONResponse(jsonable_encoder(content)).body),
+        ("model", lambda: JSONResponse(serialize()).body),
+        ("orjson", lambda: ORJSONResponse(serialize()).body),
+        ("direct", lambda: ORJSONResponse(content).body),
+    ]
+    results = "  ".join(f"{label} {timed(func, rounds):7.2f}ms" for label, func in cases)
+    print(f"{name:>16}: {results}  {len(cases[2][1]()) / 1024:.0f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="对话详情中的消息数")
+    parser.add_argument("--personas", type=int, default=500, help="人格列表长度")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    bench(f"chat({args.messages})", build_chat(args.messages), ChatDetail, args.rounds)
+    bench(f"personas({args.personas})", build_personas(args.personas), List[PersonaResponse], args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+风格分析性能基准
+
+生成指定条数的合成聊天记录，按列式批次送入 StyleAccumulator，
+测量全量画像的耗时（不含数据库读取）。
+
+用法:
+    python benchmarks/bench_style_analytics.py --count 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.style_analytics import StyleAccumulator
+
+TEXTS = [
+    "哈哈哈哈太好笑了😂", "今天加班到很晚，好累啊", "周末一起去爬山吧？", "好的没问题",
+    "[捂脸] 我又忘了", "在吗", "晚安~", "这个电影真的不错！推荐你去看",
+]
+
+
+def build_columns(count: int):
+    start = datetime(2024, 1, 1)
+    contents = [f"{TEXTS[i % len(TEXTS)]}" for i in range(count)]
+    senders = ["小明" if i % 3 else "我" for i in range(count)]
+    timestamps = [start + timedelta(seconds=i * 37) for i in range(count)]
+    return contents, senders, timestamps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"生成 {args.count} 条消息...")
+    contents, senders, timestamps = build_columns(args.count)
+
+    accumulator = StyleAccumulator(target_sender="小明")
+    start = time.perf_counter()
+    for i in range(0, args.count, args.batch_size):
+        accumulator.update(
+            contents[i:i + args.batch_size],
+            senders[i:i + args.batch_size],
+            timestamps[i:i + args.batch_size],
+        )
+    profile = accumulator.result()
+    elapsed = time.perf_counter() - start
+
+    print(f"消息数: {profile['total_messages']}，目标发送者 {profile['message_count']}")
+    print(f"耗时: {elapsed:.2f} s ({args.count / elapsed:.0f} msg/s)")
+    print(f"常用词: {profile['frequent_words'][:5]}，口头禅: {profile['catch_phrases'][:3]}")
+
+
+if __name__ == "__main__":
+    main()
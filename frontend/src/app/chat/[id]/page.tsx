@@ -13,6 +13,14 @@ interface ChatData {
   messages: any[]
 }
 
+interface ChatSummary {
+  id: string
+  title: string
+  persona_id: string
+  message_count: number
+  last_message: string | null
+}
+
 interface PersonaData {
   id: string
   name: string
@@ -25,7 +33,7 @@ export default function ChatPage() {
   
   const [chat, setChat] = useState<ChatData | null>(null)
   const [persona, setPersona] = useState<PersonaData | null>(null)
-  const [recentChats, setRecentChats] = useState<ChatData[]>([])
+  const [recentChats, setRecentChats] = useState<ChatSummary[]>([])
   const [showSidebar, setShowSidebar] = useState(false)
   const [isLoading, setIsLoading] = useState(true)
 
@@ -132,7 +140,7 @@ export default function ChatPage() {
               >
                 <p className="font-medium text-sm truncate">{recentChat.title}</p>
                 <p className="text-xs text-gray-500 mt-1">
-                  {recentChat.messages.length} 条消息
+                  {recentChat.message_count} 条消息
                 </p>
               </button>
             ))}
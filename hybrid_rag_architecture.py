@@ -8,6 +8,9 @@ import numpy as np
 from dataclasses import dataclass
 from enum import Enum
 
+from backend.services.lexicon import QUESTION, emotion_of, get_lexicon
+from backend.services.tokenizer import Tokenizer
+
 class RetrievalStrategy(Enum):
     SEMANTIC = "semantic"          # 语义相似
     KEYWORD = "keyword"            # 关键词匹配
@@ -201,23 +204,15 @@ class HybridRAGPersonality:
     
     # 辅助方法
     def _is_question(self, text: str) -> bool:
-        question_markers = ['？', '?', '吗', '呢', '么', '哪', '什么', '怎么', '为什么']
-        return any(marker in text for marker in question_markers)
+        return QUESTION in get_lexicon().scan(text)
     
     def _detect_emotion(self, text: str) -> str:
-        # 简化的情绪检测
-        if any(word in text for word in ['开心', '高兴', '哈哈', '😊', '😄']):
-            return 'positive'
-        elif any(word in text for word in ['难过', '伤心', '唉', '😔', '😢']):
-            return 'negative'
-        return 'neutral'
+        # 共享词典自动机，一次扫描得到所有类别命中
+        return emotion_of(get_lexicon().scan(text))
     
     def _extract_keywords(self, text: str) -> List[str]:
-        # 提取关键词和口头禅
-        import jieba
-        words = jieba.lcut(text)
-        # 过滤停用词，保留特征词
-        return [w for w in words if len(w) > 1]
+        # 提取关键词和口头禅（进程内共享分词器，词典只加载一次）
+        return Tokenizer.instance().keywords(text)
 
 # 使用示例
 if __name__ == "__main__":
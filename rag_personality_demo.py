@@ -6,7 +6,8 @@
 import json
 from typing import List, Dict
 from collections import Counter
-import jieba
+from backend.services.lexicon import emotion_of, get_lexicon
+from backend.services.tokenizer import Tokenizer
 
 class PersonalityRAG:
     def __init__(self, api_key: str):
@@ -66,14 +67,11 @@ class PersonalityRAG:
     
     def _get_frequent_words(self, messages: List[Dict]) -> List[str]:
         """提取高频词汇"""
-        all_words = []
-        stop_words = {'的', '了', '是', '我', '你', '在', '吗', '啊', '吧'}
-        
-        for msg in messages:
-            words = jieba.lcut(msg['content'])
-            all_words.extend([w for w in words if w not in stop_words and len(w) > 1])
-        
-        word_freq = Counter(all_words)
+        word_freq = Counter(
+            word
+            for keywords in Tokenizer.instance().keywords_many([m['content'] for m in messages])
+            for word in keywords
+        )
         return [word for word, freq in word_freq.most_common(50)]
     
     def _analyze_sentence_patterns(self, messages: List[Dict]) -> Dict:
@@ -151,8 +149,11 @@ class PersonalityRAG:
         return 0.5
     
     def _analyze_emotion(self, messages):
-        """情绪分析 - 简化实现"""
-        return {'positive': 0.6, 'neutral': 0.3, 'negative': 0.1}
+        """情绪分析 - 共享词典自动机，每条消息扫描一次"""
+        lexicon = get_lexicon()
+        emotions = Counter(emotion_of(lexicon.scan(m['content'])) for m in messages)
+        total = len(messages) or 1
+        return {label: emotions[label] / total for label in ('positive', 'neutral', 'negative')}
     
     def _extract_topics(self, messages):
         """话题提取 - 简化实现"""
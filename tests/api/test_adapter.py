@@ -0,0 +1,46 @@
+"""兼容路径适配器测试"""
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from backend.api import adapter
+from backend.api.adapter import PathAliasMiddleware
+
+
+class TestAdapter:
+    """兼容路径测试类"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_alias_rewrites_path_before_routing(self):
+        """测试兼容路径按方法改写为实际路径，其他请求原样传递"""
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append((scope["path"], scope.get("raw_path")))
+
+        middleware = PathAliasMiddleware(app)
+        for method, path in [("POST", "/api/upload"), ("GET", "/api/personas"), ("DELETE", "/api/personas")]:
+            await middleware({"type": "http", "method": method, "path": path}, None, None)
+
+        assert seen == [
+            ("/api/upload/", b"/api/upload/"),
+            ("/api/personas/", b"/api/personas/"),
+            ("/api/personas", None),
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_login_adapter_calls_token_handler(self):
+        """测试JSON登录请求转换为表单后直接调用token处理函数"""
+        request = AsyncMock()
+        request.json.return_value = {"email": "user@example.com", "password": "secret"}
+        login = AsyncMock(return_value={"access_token": "t", "token_type": "bearer"})
+
+        with patch.object(adapter.auth, "login", login):
+            result = await adapter.login_adapter(request)
+
+        form_data = login.await_args.args[0]
+        assert (form_data.username, form_data.password, form_data.grant_type) == (
+            "user@example.com", "secret", "password"
+        )
+        assert result["access_token"] == "t"
@@ -3,9 +3,15 @@ import pytest
 from fastapi import status
 from httpx import AsyncClient
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
+from beanie import PydanticObjectId
+
+from backend.api.personas import update_persona
 from backend.models.user import User
 from backend.models.persona import Persona
+from backend.schemas.persona import PersonaUpdate
 
 
 class TestPersonasAPI:
@@ -169,4 +175,24 @@ class TestPersonasAPI:
         assert "message_count" in data
         assert "chat_count" in data
         assert "last_chat_date" in data
-        assert "created_at" in data
\ No newline at end of file
+        assert "created_at" in data
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_update_persona_sets_only_given_fields(self):
+        """测试更新人格不经缓存读取，只$set请求中的名称、头像字段"""
+        user_id = PydanticObjectId()
+        persona = SimpleNamespace(user_id=user_id, status="ready", set=AsyncMock(), save=AsyncMock())
+
+        with patch("backend.api.personas.Persona.get", AsyncMock(return_value=persona)) as get, \
+                patch("backend.api.personas.load") as load:
+            await update_persona(
+                str(PydanticObjectId()),
+                PersonaUpdate(name="新名字", message_count=0),
+                SimpleNamespace(id=user_id)
+            )
+
+        get.assert_awaited_once()
+        load.assert_not_called()
+        persona.save.assert_not_awaited()
+        assert set(persona.set.await_args.args[0]) == {"name", "updated_at"}
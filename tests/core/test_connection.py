@@ -0,0 +1,70 @@
+"""MongoDB连接管理与命令监控测试"""
+import pytest
+from types import SimpleNamespace
+
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from backend.core.connection import (
+    ANALYTICS,
+    CommandMetrics,
+    MongoConnectionManager,
+    RequestStats,
+    current_request,
+)
+
+
+def command_events(name, command, request_id, duration_ms):
+    started = SimpleNamespace(
+        command_name=name, command=command, connection_id=("localhost", 27017), request_id=request_id
+    )
+    finished = SimpleNamespace(
+        connection_id=("localhost", 27017), request_id=request_id, duration_micros=int(duration_ms * 1000)
+    )
+    return started, finished
+
+
+class TestConnection:
+    """连接管理测试类"""
+
+    @pytest.mark.unit
+    def test_metrics_aggregate_by_command_and_route(self):
+        """测试按 命令:集合 聚合延迟，并把命令计入当前请求"""
+        metrics = CommandMetrics(slow_ms=100)
+        request = RequestStats("GET /api/chats/")
+        token = current_request.set(request)
+        try:
+            for request_id, (name, command, duration) in enumerate([
+                ("find", {"find": "chats"}, 5),
+                ("getMore", {"getMore": 1, "collection": "chats"}, 3),
+                ("find", {"find": "chats"}, 150),
+            ]):
+                started, finished = command_events(name, command, request_id, duration)
+                metrics.started(started)
+                metrics.succeeded(finished)
+        finally:
+            current_request.reset(token)
+        started, finished = command_events("insert", {"insert": "messages"}, 9, 2)
+        metrics.started(started)
+        metrics.failed(finished)
+        metrics.record_request(request)
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot["commands"]["find:chats"]["count"] == 2
+        assert snapshot["commands"]["find:chats"]["max_ms"] == 150
+        assert snapshot["commands"]["getMore:chats"]["count"] == 1
+        assert snapshot["commands"]["insert:messages"]["failures"] == 1
+        assert snapshot["slow_queries"] == 1
+        assert request.commands == 3
+        assert snapshot["routes"]["GET /api/chats/"]["max_commands"] == 3
+
+    @pytest.mark.unit
+    def test_manager_options_and_workloads(self):
+        """测试客户端选项包含连接池和监听器，analytics负载使用配置的读偏好"""
+        manager = MongoConnectionManager("mongodb://localhost:27017")
+        options = manager.client_options()
+
+        assert options["event_listeners"] == [manager.metrics]
+        assert options["maxPoolSize"] > 0
+        assert isinstance(manager.read_preference(), Primary)
+        assert isinstance(manager.read_preference(ANALYTICS), SecondaryPreferred)
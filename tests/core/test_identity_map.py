@@ -0,0 +1,58 @@
+"""请求级身份映射与读穿缓存测试"""
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from beanie import PydanticObjectId
+
+from backend.core.identity_map import document_cache, identity_scope, load
+from backend.models.chat_model import Chat
+from backend.models.persona import Persona
+
+
+class TestIdentityMap:
+    """文档加载测试类"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        document_cache.clear()
+        yield
+        document_cache.clear()
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_scope_dedupes_loads(self):
+        """测试同一请求内重复加载同一文档只查一次库，拿到同一实例"""
+        chat = Chat.model_construct(id=PydanticObjectId(), messages=[])
+        get = AsyncMock(return_value=chat)
+
+        with patch.object(Chat, "get", get):
+            with identity_scope():
+                first = await load(Chat, str(chat.id))
+                second = await load(Chat, chat.id)
+            await load(Chat, chat.id)
+
+        assert first is second is chat
+        # Chat不在进程缓存中，作用域外每次都查库
+        assert get.await_count == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_read_through_cache_and_invalidate(self):
+        """测试Persona跨请求命中缓存、返回副本，失效后重新查库"""
+        persona = Persona.model_construct(
+            id=PydanticObjectId(), user_id=PydanticObjectId(), name="小明", deletion_progress={}
+        )
+        get = AsyncMock(return_value=persona)
+
+        with patch.object(Persona, "get", get):
+            await load(Persona, persona.id)
+            cached = await load(Persona, persona.id)
+            cached.name = "改名"
+            assert (await load(Persona, persona.id)).name == "小明"
+            assert get.await_count == 1
+
+            document_cache.invalidate(Persona, persona.id)
+            await load(Persona, persona.id)
+
+        assert cached is not persona
+        assert get.await_count == 2
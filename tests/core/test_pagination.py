@@ -0,0 +1,74 @@
+"""键集分页测试"""
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+
+from beanie import PydanticObjectId
+from fastapi.testclient import TestClient
+
+from backend.core.config import settings
+from backend.core.pagination import (
+    NEXT_CURSOR_HEADER,
+    InvalidCursor,
+    after_cursor,
+    decode_cursor,
+    encode_cursor,
+    next_cursor,
+)
+from backend.main import app
+
+
+class TestPagination:
+    """分页游标测试类"""
+
+    @pytest.mark.unit
+    def test_cursor_round_trip(self):
+        """测试游标编码后可原样解出"""
+        value = datetime(2024, 3, 1, 12, 30, 5, 123000)
+        doc_id = PydanticObjectId()
+
+        cursor = encode_cursor(value, doc_id)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (value, doc_id)
+
+    @pytest.mark.unit
+    def test_invalid_cursor(self):
+        """测试无法解析的游标"""
+        for cursor in ["abc", encode_cursor(datetime(2024, 1, 1), "not-an-id")]:
+            with pytest.raises(InvalidCursor):
+                decode_cursor(cursor)
+
+    @pytest.mark.unit
+    def test_after_cursor_query(self):
+        """测试游标转换为 (排序字段, _id) 倒序的范围条件"""
+        value = datetime(2024, 3, 1)
+        doc_id = PydanticObjectId()
+        base = {"user_id": "u1"}
+
+        assert after_cursor(base, "updated_at", None) is base
+        assert after_cursor(base, "updated_at", encode_cursor(value, doc_id)) == {"$and": [
+            base,
+            {"$or": [
+                {"updated_at": {"$lt": value}},
+                {"updated_at": value, "_id": {"$lt": doc_id}},
+            ]},
+        ]}
+
+    @pytest.mark.unit
+    def test_next_cursor(self):
+        """测试只有取满一页时才返回下一页游标"""
+        items = [
+            SimpleNamespace(id=PydanticObjectId(), created_at=datetime(2024, 1, day))
+            for day in (3, 2, 1)
+        ]
+
+        assert next_cursor(items, 4, "created_at") is None
+        assert decode_cursor(next_cursor(items, 3, "created_at")) == (items[-1].created_at, items[-1].id)
+
+    @pytest.mark.unit
+    def test_cursor_header_exposed_to_browsers(self):
+        """测试跨域请求时翻页游标响应头对前端可见"""
+        response = TestClient(app).get("/health", headers={"Origin": settings.CORS_ORIGINS[0]})
+
+        assert NEXT_CURSOR_HEADER in response.headers.get("access-control-expose-headers", "")
@@ -0,0 +1,47 @@
+"""orjson响应测试"""
+import json
+import pytest
+from datetime import datetime
+
+from beanie import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+
+from backend.core.responses import ORJSONResponse
+from backend.models.chat_model import Chat, ChatMessage
+from backend.schemas.chat import ChatDetail
+
+
+class TestResponses:
+    """响应编码测试类"""
+
+    def _chat(self) -> Chat:
+        chat = Chat.model_construct(
+            id=PydanticObjectId(), user_id=PydanticObjectId(), persona_id=PydanticObjectId(),
+            title="与小明的对话", revision_id=None,
+            messages=[ChatMessage(role="user", content="你好", timestamp=datetime(2024, 1, 1, 8, 0, 0, 123000))],
+            created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 2),
+        )
+        chat.refresh_summary()
+        return chat
+
+    @pytest.mark.unit
+    def test_document_matches_jsonable_encoder(self):
+        """测试直接编码Beanie文档与jsonable_encoder结果一致（ObjectId转字符串、datetime为ISO格式）"""
+        chat = self._chat()
+
+        body = ORJSONResponse(chat).body
+
+        assert json.loads(body) == jsonable_encoder(chat)
+        assert "你好".encode() in body
+
+    @pytest.mark.unit
+    def test_detail_response_model(self):
+        """测试对话详情响应模型由文档属性构建，id以字符串输出"""
+        chat = self._chat()
+
+        detail = ChatDetail.model_validate(chat)
+        data = json.loads(ORJSONResponse(detail.model_dump(mode="json")).body)
+
+        assert data["id"] == str(chat.id)
+        assert data["messages"][0]["timestamp"] == "2024-01-01T08:00:00.123000"
+        assert data["message_count"] == 1
@@ -1,13 +1,20 @@
 """安全模块测试"""
+import asyncio
+import time
 import pytest
 from datetime import datetime, timedelta
+from unittest.mock import patch
 import jwt
 
+from backend.core import security
 from backend.core.security import (
     verify_password,
     get_password_hash,
     create_access_token,
-    decode_access_token
+    decode_access_token,
+    PasswordHashBusy,
+    TokenCache,
+    verify_password_async,
 )
 from backend.core.config import settings
 
@@ -173,4 +180,53 @@ class TestSecurity:
         empty_hash = get_password_hash("")
         assert empty_hash is not None
         assert verify_password("", empty_hash) is True
-        assert verify_password("not empty", empty_hash) is False
\ No newline at end of file
+        assert verify_password("not empty", empty_hash) is False
+    
+    @pytest.mark.unit
+    def test_token_cache_until_expiry(self):
+        """测试已验证令牌缓存到exp，过期和超出容量的条目被移除"""
+        cache = TokenCache(max_size=2)
+        cache.put("t1", "u1", time.time() + 60)
+        cache.put("expired", "u2", time.time() - 1)
+        cache.put("no-exp", "u3", None)
+        
+        assert cache.get("t1") == "u1"
+        assert cache.get("expired") is None
+        assert cache.get("no-exp") is None
+        
+        cache.put("t2", "u2", time.time() + 60)
+        cache.put("t3", "u3", time.time() + 60)
+        assert cache.get("t1") is None
+        assert cache.get("t3") == "u3"
+    
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_password_hash_off_loop_and_bounded(self):
+        """测试密码校验在线程池中执行，排队超过上限时拒绝"""
+        def slow_verify(plain, hashed):
+            time.sleep(0.05)
+            return plain == hashed
+        
+        with patch.object(security, "verify_password", slow_verify), \
+                patch.object(security.settings, "PASSWORD_HASH_MAX_PENDING", 2):
+            ticks = 0
+            
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+            
+            tick_task = asyncio.create_task(ticker())
+            results = await asyncio.gather(
+                verify_password_async("a", "a"),
+                verify_password_async("a", "b"),
+                verify_password_async("a", "a"),
+                return_exceptions=True,
+            )
+            tick_task.cancel()
+        
+        assert results[:2] == [True, False]
+        assert isinstance(results[2], PasswordHashBusy)
+        # 哈希期间事件循环仍在调度其他任务
+        assert ticks > 3
@@ -0,0 +1,63 @@
+"""
+索引计划回归测试 - 热点查询不能退化为全表扫描或内存排序
+
+需要本地可连接的MongoDB，连接不上时跳过。
+"""
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from backend.core.config import settings
+from backend.core.indexes import HOT_QUERIES, INDEXES, ensure_indexes
+
+SCRATCH_DB = f"{settings.DATABASE_NAME}_index_plans"
+
+
+def _stages(plan):
+    """递归收集计划树中的所有stage"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+
+@pytest.fixture
+async def scratch_db():
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=1000)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip("本地MongoDB不可用")
+    await client.drop_database(SCRATCH_DB)
+    db = client[SCRATCH_DB]
+    await ensure_indexes(db)
+    yield db
+    await client.drop_database(SCRATCH_DB)
+    client.close()
+
+
+@pytest.mark.integration
+class TestIndexPlans:
+    """热点查询的执行计划"""
+
+    async def test_registry_built(self, scratch_db):
+        for name, indexes in INDEXES.items():
+            existing = await scratch_db[name].index_information()
+            for index in indexes:
+                assert index.document["name"] in existing
+
+    @pytest.mark.parametrize("name,collection,query,sort", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+    async def test_hot_query_uses_index(self, scratch_db, name, collection, query, sort):
+        cursor = scratch_db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(20).explain()
+        stages = set(_stages(explain["queryPlanner"]["winningPlan"]))
+        assert "COLLSCAN" not in stages, f"{name}: {stages}"
+        assert "SORT" not in stages, f"{name}: {stages}"
@@ -0,0 +1,51 @@
+"""列表读模型测试"""
+import pytest
+from datetime import datetime
+
+from beanie.odm.utils.projection import get_projection
+from bson import ObjectId
+
+from backend.models.chat_model import PREVIEW_CHARS, Chat, ChatMessage
+from backend.schemas.chat import ChatSummary
+from backend.schemas.message import MessageSummary
+from backend.schemas.persona import PersonaSummary
+
+
+class TestReadModels:
+    """读模型与写入时维护的摘要字段测试类"""
+
+    @pytest.mark.unit
+    def test_chat_refresh_summary(self):
+        """测试保存前由messages重算对话摘要"""
+        chat = Chat.model_construct(messages=[
+            ChatMessage(role="user", content="你好"),
+            ChatMessage(role="assistant", content="好" * 100, timestamp=datetime(2024, 1, 1)),
+        ])
+
+        chat.refresh_summary()
+
+        assert chat.message_count == 2
+        assert chat.last_message == "好" * PREVIEW_CHARS
+        assert chat.last_message_role == "assistant"
+        assert chat.last_message_at == datetime(2024, 1, 1)
+
+        chat.messages = []
+        chat.refresh_summary()
+        assert (chat.message_count, chat.last_message, chat.last_message_at) == (0, None, None)
+
+    @pytest.mark.unit
+    def test_projections_skip_heavy_fields(self):
+        """测试列表投影不读取messages数组、向量和风格摘要"""
+        assert "messages" not in get_projection(ChatSummary)
+        assert "embedding" not in get_projection(MessageSummary)
+        assert "style_summary" not in get_projection(PersonaSummary)
+
+    @pytest.mark.unit
+    def test_summary_from_raw_document(self):
+        """测试读模型直接由投影后的原始文档构建，id输出为字符串"""
+        doc_id = ObjectId()
+        summary = MessageSummary.model_validate({
+            "_id": doc_id, "content": "在吗", "sender": "小明", "timestamp": datetime(2024, 1, 1),
+        })
+
+        assert summary.model_dump(mode="json")["id"] == str(doc_id)
@@ -0,0 +1,117 @@
+"""批量写入器测试"""
+import asyncio
+import pytest
+from pymongo.errors import BulkWriteError
+
+from backend.services.bulk_writer import BulkWriter, estimate_bson_size
+
+
+class FakeCollection:
+    """记录每次bulk_write的假集合"""
+
+    def __init__(self, delay: float = 0, errors=None):
+        self.delay = delay
+        self.errors = errors or {}
+        self.chunks = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.write_concern = None
+
+    def with_options(self, write_concern=None):
+        self.write_concern = write_concern
+        return self
+
+    async def bulk_write(self, requests, ordered=True):
+        assert ordered is False
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            docs = [r._doc for r in requests]
+            index = len(self.chunks)
+            self.chunks.append(docs)
+            if index in self.errors:
+                raise BulkWriteError(self.errors[index])
+            return type("Result", (), {"inserted_count": len(docs)})()
+        finally:
+            self.in_flight -= 1
+
+
+class TestBulkWriter:
+    """批量写入器测试类"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_chunks_and_coalesced_counter(self):
+        """测试按条数分块，每块回调一次"""
+        collection = FakeCollection()
+        increments = []
+
+        async def on_chunk(inserted):
+            increments.append(inserted)
+
+        async with BulkWriter(collection, chunk_docs=4, on_chunk=on_chunk) as writer:
+            await writer.insert_many({"n": i} for i in range(10))
+
+        assert [len(chunk) for chunk in collection.chunks] == [4, 4, 2]
+        assert increments == [4, 4, 2]
+        assert writer.stats.inserted == 10
+        assert writer.stats.chunks == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_chunk_bytes_limit(self):
+        """测试按估算字节数分块（带向量的文档）"""
+        collection = FakeCollection()
+        doc_size = estimate_bson_size({"embedding": [0.1] * 1536})
+
+        async with BulkWriter(collection, chunk_docs=1000, chunk_bytes=doc_size * 3) as writer:
+            await writer.insert_many({"embedding": [0.1] * 1536} for _ in range(7))
+
+        assert [len(chunk) for chunk in collection.chunks] == [3, 3, 1]
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_max_in_flight(self):
+        """测试同时在途的块数受限"""
+        collection = FakeCollection(delay=0.01)
+
+        async with BulkWriter(collection, chunk_docs=1, max_in_flight=3) as writer:
+            await writer.insert_many({"n": i} for i in range(12))
+
+        assert len(collection.chunks) == 12
+        assert 1 < collection.max_in_flight <= 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_duplicate_keys_tolerated(self):
+        """测试重复键错误计入duplicates，不中断导入"""
+        collection = FakeCollection(errors={
+            0: {"nInserted": 1, "writeErrors": [{"index": 1, "code": 11000}]}
+        })
+
+        counted = []
+
+        async def on_chunk(inserted):
+            counted.append(inserted)
+
+        async with BulkWriter(collection, chunk_docs=2, on_chunk=on_chunk) as writer:
+            await writer.insert_many({"_id": i} for i in range(4))
+
+        assert writer.stats.inserted == 3
+        assert writer.stats.duplicates == 1
+        assert writer.duplicate_ids == {1}
+        # 计数回调只计实际写入的文档（nInserted），不计被拒绝的重复文档
+        assert sorted(counted) == [1, 2]
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_other_errors_raised(self):
+        """测试非重复键错误会抛出"""
+        collection = FakeCollection(errors={
+            0: {"nInserted": 0, "writeErrors": [{"index": 0, "code": 121}]}
+        })
+
+        with pytest.raises(BulkWriteError):
+            async with BulkWriter(collection, chunk_docs=2) as writer:
+                await writer.insert_many({"n": i} for i in range(2))
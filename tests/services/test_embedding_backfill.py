@@ -0,0 +1,84 @@
+"""向量回填任务测试"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from beanie import PydanticObjectId
+
+from backend.services.embedding_backfill import EmbeddingBackfillJob, backfill_query
+
+
+class FakeCollection:
+    """记录bulk_write操作的假集合"""
+
+    def __init__(self):
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+class TestEmbeddingBackfill:
+    """向量回填测试类"""
+
+    PERSONA_ID = "507f1f77bcf86cd799439011"
+
+    @pytest.mark.unit
+    def test_backfill_query(self):
+        """测试缺失/模拟向量的查询条件及续传位置"""
+        last_id = PydanticObjectId()
+
+        query = backfill_query("messages", self.PERSONA_ID, after_id=last_id)
+        assert query["embedding"] is None
+        assert query["filter_reason"] is None
+        assert query["_id"] == {"$gt": last_id}
+
+        query = backfill_query("message_windows", include_mock=True)
+        assert query == {"embedding": {"$not": {"$elemMatch": {"$lt": 0}}}}
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_process_batch(self):
+        """测试分组生成向量、批量写回并推进检查点"""
+        rag_service = SimpleNamespace(
+            batch_generate_embeddings=AsyncMock(
+                side_effect=lambda texts, fallback: [[-0.1, 0.2]] * len(texts)
+            )
+        )
+        job = EmbeddingBackfillJob(
+            persona_id=self.PERSONA_ID, target="messages", batch_size=40, rag_service=rag_service
+        )
+        batch = [{"_id": PydanticObjectId(), "content": f"消息{i}"} for i in range(40)]
+        checkpoint = SimpleNamespace(last_id=None, processed=0)
+        collection = FakeCollection()
+
+        await job._process_batch(collection, batch, "content", checkpoint)
+
+        # 40条按每次请求16条分成3组，且不允许降级到模拟向量
+        assert rag_service.batch_generate_embeddings.await_count == 3
+        assert all(
+            call.kwargs["fallback"] is False
+            for call in rag_service.batch_generate_embeddings.await_args_list
+        )
+        assert len(collection.operations) == 40
+        assert checkpoint.last_id == batch[-1]["_id"]
+        assert checkpoint.processed == 40
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_failure_keeps_checkpoint(self):
+        """测试向量服务持续失败时不写回也不推进检查点"""
+        rag_service = SimpleNamespace(
+            batch_generate_embeddings=AsyncMock(side_effect=RuntimeError("404 deployment not found"))
+        )
+        job = EmbeddingBackfillJob(target="messages", rag_service=rag_service)
+        batch = [{"_id": PydanticObjectId(), "content": "你好"}]
+        checkpoint = SimpleNamespace(last_id=None, processed=0)
+        collection = FakeCollection()
+
+        with patch("backend.services.embedding_backfill.asyncio.sleep", new=AsyncMock()):
+            with pytest.raises(RuntimeError):
+                await job._process_batch(collection, batch, "content", checkpoint)
+
+        assert collection.operations == []
+        assert checkpoint.last_id is None
@@ -0,0 +1,106 @@
+"""HTML聊天记录解析器测试"""
+import pytest
+from datetime import datetime
+
+from backend.services.html_chat_parser import ChatHTMLParser, iter_html_chat_batches
+from backend.services.data_processor import DataProcessorService
+
+
+TELEGRAM_HTML = """<html><body><div class="history">
+<div class="message service" id="message-1"><div class="body details">1 January 2024</div></div>
+<div class="message default clearfix" id="message1">
+ <div class="body">
+  <div class="pull_right date details" title="01.01.2024 10:30:45 UTC+08:00">10:30</div>
+  <div class="from_name">Alice </div>
+  <div class="text">Hello<br>world <img class="emoji" alt="😊"></div>
+ </div>
+</div>
+<div class="message default clearfix joined" id="message2">
+ <div class="body">
+  <div class="pull_right date details" title="01.01.2024 10:31:00">10:31</div>
+  <div class="text">还在吗？</div>
+ </div>
+</div>
+<div class="message default clearfix" id="message3">
+ <div class="body">
+  <div class="pull_right date details" title="01.01.2024 10:32:00">10:32</div>
+  <div class="from_name">Bob</div>
+  <div class="text">在的 &amp; 刚到家</div>
+ </div>
+</div>
+</div></body></html>"""
+
+WECHAT_HTML = """<div class="chat">
+<div class="msg-item"><span class="nickname">小明</span><span class="time">2024-01-01 10:00:00</span>
+<p class="content">早上好！</p></div>
+<div class="msg-item"><span class="nickname">我</span><span class="time">2024-01-01 10:01:00</span>
+<p class="content">早<p class="content">安</div>
+</div>"""
+
+
+class TestChatHTMLParser:
+    """HTML解析器测试类"""
+
+    def _parse(self, html: str, step: int = None):
+        parser = ChatHTMLParser()
+        if step:
+            for i in range(0, len(html), step):
+                parser.feed(html[i:i + step])
+        else:
+            parser.feed(html)
+        parser.close()
+        return parser.drain()
+
+    @pytest.mark.unit
+    def test_parse_telegram_export(self):
+        """测试Telegram导出格式"""
+        messages = self._parse(TELEGRAM_HTML)
+
+        assert len(messages) == 3
+        assert messages[0]["sender"] == "Alice"
+        assert messages[0]["timestamp"] == "01.01.2024 10:30:45"
+        assert messages[0]["content"] == "Hello\nworld 😊"
+        # 连续消息沿用上一条的发送者
+        assert messages[1]["sender"] == "Alice"
+        assert messages[2]["content"] == "在的 & 刚到家"
+
+    @pytest.mark.unit
+    def test_parse_wechat_export(self):
+        """测试微信导出格式（含未闭合标签）"""
+        messages = self._parse(WECHAT_HTML)
+
+        assert [m["sender"] for m in messages] == ["小明", "我"]
+        assert messages[0]["timestamp"] == "2024-01-01 10:00:00"
+        assert messages[1]["content"].startswith("早")
+
+    @pytest.mark.unit
+    def test_incremental_feed(self):
+        """测试任意切分输入时结果一致"""
+        assert self._parse(TELEGRAM_HTML, step=7) == self._parse(TELEGRAM_HTML)
+
+    @pytest.mark.unit
+    def test_iter_batches(self, tmp_path):
+        """测试按批产出消息"""
+        body = "".join(
+            f'<div class="message"><div class="from_name">U{i % 2}</div>'
+            f'<div class="text">msg {i}</div></div>'
+            for i in range(25)
+        )
+        path = tmp_path / "chat.html"
+        path.write_text(f"<html><body>{body}</body></html>", encoding="utf-8")
+
+        batches = list(iter_html_chat_batches(str(path), batch_size=10, chunk_size=64))
+
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert batches[2][-1]["content"] == "msg 24"
+
+    @pytest.mark.asyncio
+    async def test_data_processor_html(self, tmp_path):
+        """测试数据处理服务接入HTML解析"""
+        path = tmp_path / "chat.html"
+        path.write_text(TELEGRAM_HTML, encoding="utf-8")
+
+        messages = await DataProcessorService()._parse_html_chat(str(path))
+
+        assert len(messages) == 3
+        assert messages[0]["timestamp"] == datetime(2024, 1, 1, 10, 30, 45)
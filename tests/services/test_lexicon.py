@@ -0,0 +1,63 @@
+"""词典匹配测试"""
+import pytest
+
+from backend.services.lexicon import (
+    GREETING,
+    NEGATIVE,
+    NEUTRAL,
+    POSITIVE,
+    QUESTION,
+    Lexicon,
+    annotate,
+    emotion_of,
+    get_lexicon,
+)
+
+
+class TestLexicon:
+    """词典自动机测试类"""
+
+    @pytest.mark.unit
+    def test_overlapping_matches(self):
+        """测试一次扫描返回所有类别的重叠命中及其位置"""
+        lexicon = Lexicon({"a": ["人们", "女人们", "人们的女"], "b": ["女", "人们的女"]})
+
+        hits = sorted(lexicon.finditer("我女人们的女"))
+
+        assert hits == [
+            (1, "a", "女人们"), (1, "b", "女"), (2, "a", "人们"),
+            (2, "a", "人们的女"), (2, "b", "人们的女"), (5, "b", "女"),
+        ]
+
+    @pytest.mark.unit
+    def test_ascii_terms_match_whole_words(self):
+        """测试英文词只在单词边界处命中，中文词不受影响"""
+        lexicon = get_lexicon()
+
+        assert GREETING not in lexicon.scan("this is nothing")
+        assert GREETING not in lexicon.scan("shipping")
+        assert lexicon.scan("hi，在吗")[GREETING] == ["hi", "在吗"]
+        assert lexicon.scan("Oh hi!")[GREETING] == ["hi"]
+        assert lexicon.scan("你好hi")[GREETING] == ["你好", "hi"]
+
+    @pytest.mark.unit
+    def test_scan_categories(self):
+        """测试默认词典的类别命中"""
+        hits = get_lexicon().scan("你好呀，今天好开心！你呢？")
+
+        assert hits[GREETING] == ["你好"]
+        assert hits[POSITIVE] == ["好", "开心"]
+        assert hits[QUESTION] == ["呢", "？"]
+        assert NEGATIVE not in hits
+        assert get_lexicon().scan("") == {}
+
+    @pytest.mark.unit
+    def test_emotion_and_keywords(self):
+        """测试情绪标签及口头禅关键词"""
+        assert emotion_of({POSITIVE: ["开心"]}) == POSITIVE
+        assert emotion_of({POSITIVE: ["好"], NEGATIVE: ["不"]}) == NEUTRAL
+
+        lexicon = get_lexicon(["绝绝子"])
+        assert annotate("早安，绝绝子😢", lexicon) == (NEGATIVE, ["早安", "绝绝子"])
+        assert get_lexicon(["绝绝子"]) is lexicon
+        assert annotate("随便聊聊") == (NEUTRAL, [])
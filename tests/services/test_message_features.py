@@ -0,0 +1,33 @@
+"""单条消息特征测试"""
+import pytest
+
+from backend.services.lexicon import get_lexicon
+from backend.services.message_features import length_bucket, message_features
+from backend.services.style_analytics import LENGTH_LABELS
+
+
+class TestMessageFeatures:
+    """消息特征测试类"""
+
+    @pytest.mark.unit
+    def test_length_bucket(self):
+        """测试长度区间与风格画像直方图一致"""
+        assert LENGTH_LABELS[length_bucket(0)] == "1-2"
+        assert LENGTH_LABELS[length_bucket(2)] == "1-2"
+        assert LENGTH_LABELS[length_bucket(3)] == "3-5"
+        assert LENGTH_LABELS[length_bucket(20)] == "11-20"
+        assert LENGTH_LABELS[length_bucket(1000)] == "200+"
+
+    @pytest.mark.unit
+    def test_message_features(self):
+        """测试一次扫描得到情绪、提问和关键词"""
+        features = message_features("早安，今天开心吗？", ["今天", "开心", "早安"], get_lexicon())
+
+        assert features == {
+            "emotion": "positive",
+            "keywords": ["早安", "今天", "开心"],
+            "is_question": True,
+            "length_bucket": 2,
+        }
+        assert message_features("随便")["is_question"] is False
+        assert message_features("随便")["emotion"] == "neutral"
@@ -0,0 +1,83 @@
+"""消息过滤服务测试"""
+import pytest
+
+from backend.services.message_filter import (
+    DUPLICATE,
+    LOW_INFO,
+    NEAR_DUPLICATE,
+    PLACEHOLDER,
+    MessageFilter,
+    jaccard,
+    shingles,
+)
+
+
+class TestMessageFilter:
+    """消息过滤器测试类"""
+
+    @pytest.fixture
+    def message_filter(self):
+        return MessageFilter()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("content,message_type", [
+        ("[图片]", "image"),
+        ("[动画表情]", "sticker"),
+        ("<Media omitted>", "media"),
+        ("‎image omitted", "image"),
+        ("【语音】", "voice"),
+    ])
+    def test_placeholders(self, message_filter, content, message_type):
+        """测试占位消息识别"""
+        reason, detected_type, _ = message_filter.classify(content)
+        assert reason == PLACEHOLDER
+        assert detected_type == message_type
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("content", ["哈哈哈哈哈", "hhhh", "😂😂😂", "好", "嗯嗯", "？？", "233333"])
+    def test_low_info(self, message_filter, content):
+        """测试低信息量消息识别"""
+        assert message_filter.classify(content)[0] == LOW_INFO
+
+    @pytest.mark.unit
+    def test_informative_message_kept(self, message_filter):
+        """测试正常消息不被过滤"""
+        assert message_filter.classify("图片") is not None  # 不带括号的两个字按短消息处理
+        assert message_filter.classify("今天去看了展览") is None
+
+    @pytest.mark.unit
+    def test_duplicates(self, message_filter):
+        """测试完全重复和近似重复"""
+        result = message_filter.filter([
+            "明天一起去爬山吧，早上八点在公园门口见",
+            "明天一起去爬山吧，早上八点在公园门口见！",
+            "明天一起去爬山吧，早上八点在公园门口见面",
+            "明天一起去看电影吧",
+            "[图片]",
+        ])
+
+        assert result.reasons == [None, DUPLICATE, NEAR_DUPLICATE, None, PLACEHOLDER]
+        assert result.embed_indices == [0, 3]
+        assert result.stats["embedded"] == 2
+        assert result.stats["placeholders"] == {"图片": 1}
+
+    @pytest.mark.unit
+    def test_subset_recounts_stats(self, message_filter):
+        """测试只保留实际写入的消息时统计随之重算"""
+        result = message_filter.filter(["[图片]", "[图片]", "哈哈哈哈", "今天去看了展览"])
+
+        kept = result.subset([1, 3])
+
+        assert kept.reasons == [PLACEHOLDER, None]
+        assert kept.stats["total"] == 2
+        assert kept.stats["embedded"] == 1
+        assert kept.stats["placeholders"] == {"图片": 1}
+        assert kept.stats[LOW_INFO] == 0 and kept.stats["low_info_kinds"] == {}
+
+    @pytest.mark.unit
+    def test_jaccard(self):
+        """测试shingle相似度"""
+        a = shingles("今天加班到很晚真的好累啊")
+        b = shingles("今天加班到很晚真的好累呀")
+        assert jaccard(a, b) > 0.8
+        assert jaccard(a, shingles("周末去爬山")) == 0.0
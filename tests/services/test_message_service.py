@@ -0,0 +1,78 @@
+"""消息服务测试"""
+import pytest
+from datetime import datetime
+
+from backend.services.message_service import (
+    coerce_timestamp,
+    compute_fingerprint,
+    fingerprint_messages,
+)
+
+
+class TestMessageFingerprint:
+    """消息指纹测试类"""
+
+    @pytest.mark.unit
+    def test_fingerprint_stable(self):
+        """测试相同消息指纹一致，datetime与字符串时间分别稳定"""
+        ts = datetime(2024, 1, 1, 10, 30, 45)
+
+        assert compute_fingerprint("Alice", ts, "Hello") == compute_fingerprint("Alice", ts, "Hello")
+        assert compute_fingerprint("Alice", ts, "Hello") != compute_fingerprint("Bob", ts, "Hello")
+        assert compute_fingerprint("Alice", ts, "Hello") != compute_fingerprint("Alice", ts, "Hello!")
+
+    @pytest.mark.unit
+    def test_repeated_messages_get_distinct_fingerprints(self):
+        """测试同一时间的重复消息按出现序号区分"""
+        ts = datetime(2024, 1, 1, 10, 30)
+        messages = [
+            {"sender": "Alice", "timestamp": ts, "content": "好"},
+            {"sender": "Alice", "timestamp": ts, "content": "好"},
+            {"sender": "Bob", "timestamp": ts, "content": "好"},
+        ]
+
+        fingerprints = fingerprint_messages(messages)
+
+        assert len(set(fingerprints)) == 3
+
+    @pytest.mark.unit
+    def test_reimport_fingerprints_match(self):
+        """测试更新后的导出中旧消息指纹不变，只有新增部分不同"""
+        old_export = [
+            {"sender": "Alice", "timestamp": "2024-01-01 10:00:00", "content": "早"},
+            {"sender": "Bob", "timestamp": "2024-01-01 10:01:00", "content": "早啊"},
+        ]
+        new_export = old_export + [
+            {"sender": "Alice", "timestamp": "2024-02-01 09:00:00", "content": "好久不见"},
+        ]
+
+        old = set(fingerprint_messages(old_export))
+        new = fingerprint_messages(new_export)
+
+        assert [fp for fp in new if fp not in old] == new[2:]
+
+    @pytest.mark.unit
+    def test_batched_fingerprints_match_whole_import(self):
+        """测试分批计算时共用出现序号，结果与整体计算一致"""
+        ts = datetime(2024, 1, 1, 10, 30)
+        messages = [{"sender": "Alice", "timestamp": ts, "content": "好"} for _ in range(4)]
+
+        occurrences = {}
+        batched = fingerprint_messages(messages[:3], occurrences) + fingerprint_messages(messages[3:], occurrences)
+
+        assert batched == fingerprint_messages(messages)
+
+
+class TestCoerceTimestamp:
+    """原始文档时间转换测试类"""
+
+    @pytest.mark.unit
+    def test_coerce_timestamp(self):
+        """测试datetime、ISO字符串和Unix时间戳"""
+        expected = datetime(2024, 1, 1, 10, 30, 45)
+        assert coerce_timestamp(expected) is expected
+        assert coerce_timestamp("2024-01-01 10:30:45") == expected
+        assert coerce_timestamp("2024-01-01T10:30:45Z") == expected
+        assert coerce_timestamp(1704105045) == expected
+        assert coerce_timestamp(1704105045000) == expected
+        assert isinstance(coerce_timestamp("昨天"), datetime)
@@ -0,0 +1,149 @@
+"""N-gram倒排索引测试"""
+import random
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.models.message import Message
+from backend.models.persona import Persona
+from backend.services.ngram_index import NgramIndex, NgramSearchService
+
+TEXTS = [
+    "今天去吃火锅吧",
+    "火锅太辣了",
+    "我想吃火烧",
+    "Hello 世界 (test)",
+    "锅火不是火锅",
+    "晚安",
+]
+SENDERS = ["小明", "小红", "小明", "Bob", "小红", "小明"]
+
+
+def build(texts=TEXTS, senders=SENDERS):
+    start = datetime(2024, 1, 1)
+    return NgramIndex(
+        ids=list(range(len(texts))),
+        texts=texts,
+        senders=senders,
+        timestamps=[start + timedelta(hours=i) for i in range(len(texts))],
+    )
+
+
+class TestNgramIndex:
+    """N-gram索引测试类"""
+
+    @pytest.mark.unit
+    def test_substring_match(self):
+        """测试子串匹配需要二元组连续出现"""
+        index = build()
+
+        assert index.match("火锅").tolist() == [0, 1, 4]
+        assert index.match("吃火锅").tolist() == [0]
+        # "锅火"的二元组都在第4条里，但"火锅火"并不连续出现
+        assert index.match("火锅火").tolist() == []
+        assert index.match("晚").tolist() == [5]
+
+    @pytest.mark.unit
+    def test_case_and_metacharacters(self):
+        """测试不区分大小写，正则元字符按字面匹配"""
+        index = build()
+
+        assert index.match("hello").tolist() == [3]
+        assert index.match("(test)").tolist() == [3]
+        assert index.match(".*").tolist() == []
+
+    @pytest.mark.unit
+    def test_find_newest_first(self):
+        """测试子串搜索按时间倒序并支持时间范围"""
+        index = build()
+
+        assert index.find("火锅", limit=2) == [4, 1]
+        assert index.find("火锅", limit=10, time_range={"end": datetime(2024, 1, 1, 2)}) == [1, 0]
+
+    @pytest.mark.unit
+    def test_search_ranking(self):
+        """测试多词检索: 命中更多、更少见的词排在前面，发送者匹配计分"""
+        index = build()
+
+        hits = index.search(["吃火锅", "火锅", "吃"], limit=10)
+        assert [message_id for message_id, _ in hits][:2] == [0, 2]
+        assert {message_id for message_id, _ in hits} == {0, 1, 2, 4}
+
+        hits = index.search(["bob"], limit=10, sender_term="bob")
+        assert hits[0][0] == 3
+
+    @pytest.mark.unit
+    def test_matches_plain_scan(self):
+        """测试与逐条子串扫描的结果一致"""
+        rng = random.Random(7)
+        alphabet = "火锅吃辣好的AbC?*"
+        texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+        index = build(texts, ["s"] * len(texts))
+
+        for _ in range(100):
+            term = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+            expected = [i for i, text in enumerate(texts) if re.search(re.escape(term), text, re.I)]
+            assert index.match(term).tolist() == expected
+
+
+class TestNgramSearchService:
+    """N-gram检索服务测试类"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_fetch_skips_embedding(self):
+        """测试未指定投影时按给定顺序取回消息且不读取向量字段"""
+        ids = [PydanticObjectId(), PydanticObjectId()]
+        persona_id = PydanticObjectId()
+
+        async def cursor():
+            for message_id, content in [(ids[1], "晚安"), (ids[0], "早安")]:
+                yield {
+                    "_id": message_id, "persona_id": persona_id, "content": content,
+                    "sender": "小明", "timestamp": datetime(2024, 1, 1),
+                }
+
+        collection = MagicMock()
+        collection.find.return_value = cursor()
+        with patch.object(Message, "get_motor_collection", return_value=collection):
+            messages = await NgramSearchService()._fetch(ids)
+
+        assert collection.find.call_args.args[1] == {"embedding": 0}
+        assert [m.content for m in messages] == ["早安", "晚安"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_index_rebuilt_when_version_changes(self):
+        """测试消息数不变但messages_version变化（删除后等量追加）时重建索引"""
+        persona_id = str(PydanticObjectId())
+        contents = [["火锅"], ["烧烤"]]
+
+        def find(query, projection):
+            async def cursor():
+                for content in contents[0]:
+                    yield {"_id": PydanticObjectId(), "content": content, "sender": "小明",
+                           "timestamp": datetime(2024, 1, 1)}
+            return cursor()
+
+        messages = MagicMock()
+        messages.count_documents = AsyncMock(return_value=1)
+        messages.find.side_effect = find
+        personas = MagicMock()
+        personas.find_one = AsyncMock(return_value={"messages_version": 1})
+        service = NgramSearchService()
+
+        with patch.object(Message, "get_motor_collection", return_value=messages), \
+                patch.object(Persona, "get_motor_collection", return_value=personas), \
+                patch.dict(NgramSearchService._indexes, clear=True):
+            first = await service.get_index(persona_id)
+            assert await service.get_index(persona_id) is first
+
+            contents.pop(0)
+            personas.find_one.return_value = {"messages_version": 2}
+            second = await service.get_index(persona_id)
+
+        assert second is not first
+        assert second.find("烧烤", 10) and not second.find("火锅", 10)
@@ -0,0 +1,135 @@
+"""人格后台删除任务测试"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from beanie import PydanticObjectId
+
+from backend.services.persona_deletion import CASCADE, PersonaDeletionJob, PersonaImporting, mark_for_deletion
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """按persona_id保存文档、记录每次delete_many批量的假集合"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.batches = []
+
+    def find(self, query, projection=None):
+        return FakeCursor([d for d in self.docs if d["persona_id"] == query["persona_id"]])
+
+    async def delete_many(self, query):
+        ids = set(query["_id"]["$in"])
+        self.batches.append(len(ids))
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if d["_id"] not in ids]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+
+class TestPersonaDeletion:
+    """人格删除测试类"""
+
+    PERSONA_ID = "507f1f77bcf86cd799439011"
+
+    @pytest.mark.unit
+    def test_cascade_covers_persona_collections(self):
+        """测试级联删除覆盖所有按persona_id关联的集合，消息最后删除"""
+        names = [name for name, _ in CASCADE]
+
+        assert set(names) >= {"messages", "message_windows", "reply_pairs", "chats", "persona_topics"}
+        assert names[-1] == "messages"
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_delete_in_batches_with_progress(self):
+        """测试按批删除、只删除目标人格的文档，并逐批记录进度"""
+        persona_oid = PydanticObjectId(self.PERSONA_ID)
+        other = PydanticObjectId()
+        collection = FakeCollection(
+            [{"_id": PydanticObjectId(), "persona_id": persona_oid} for _ in range(25)]
+            + [{"_id": PydanticObjectId(), "persona_id": other} for _ in range(3)]
+        )
+        document = SimpleNamespace(get_motor_collection=lambda: collection)
+        query = MagicMock()
+        query.update = AsyncMock()
+        progress = {}
+
+        job = PersonaDeletionJob(self.PERSONA_ID, batch_size=10, pause=0)
+        with patch("backend.services.persona_deletion.Persona.find_one", return_value=query):
+            await job._delete_batches(document, persona_oid, "messages", progress)
+
+        assert collection.batches == [10, 10, 5]
+        assert progress == {"messages": 25}
+        assert [d["persona_id"] for d in collection.docs] == [other] * 3
+        assert query.update.await_count == 3
+        assert query.update.await_args.args[0]["$set"]["deletion_progress.messages"] == 25
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_run_sweeps_cascade_twice_before_delete(self):
+        """测试删除人格本身前再扫一遍所有集合，清理期间并发写入的文档"""
+        persona = MagicMock(status="deleting", deletion_progress={})
+        persona.delete = AsyncMock()
+        job = PersonaDeletionJob(self.PERSONA_ID, pause=0)
+        swept = []
+
+        async def delete_batches(document, persona_oid, name, progress):
+            swept.append(name)
+
+        with patch("backend.services.persona_deletion.Persona.get", AsyncMock(return_value=persona)), \
+                patch.object(job, "_delete_batches", delete_batches), \
+                patch.object(job, "_invalidate_caches"):
+            assert await job.run() is True
+
+        names = [name for name, _ in CASCADE]
+        assert swept == names + names
+        persona.delete.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_mark_for_deletion_rejects_importing_persona(self):
+        """测试缓存副本显示就绪、数据库中已在导入时不标记删除"""
+        persona = SimpleNamespace(id=PydanticObjectId(self.PERSONA_ID), status="ready")
+        collection = MagicMock()
+        collection.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=0))
+        current = SimpleNamespace(status="processing")
+
+        with patch("backend.services.persona_deletion.Persona.get_motor_collection", return_value=collection), \
+                patch("backend.services.persona_deletion.Persona.get", AsyncMock(return_value=current)), \
+                patch.object(PersonaDeletionJob, "start") as start:
+            with pytest.raises(PersonaImporting):
+                await mark_for_deletion(persona)
+
+        query = collection.update_one.await_args.args[0]
+        assert set(query["status"]["$nin"]) == {"processing", "deleting"}
+        start.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_mark_for_deletion_starts_job(self):
+        """测试条件更新生效后启动后台删除任务"""
+        persona = SimpleNamespace(id=PydanticObjectId(self.PERSONA_ID), status="ready")
+        collection = MagicMock()
+        collection.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=1))
+
+        with patch("backend.services.persona_deletion.Persona.get_motor_collection", return_value=collection), \
+                patch.object(PersonaDeletionJob, "start", return_value=True) as start:
+            assert await mark_for_deletion(persona) is True
+
+        assert collection.update_one.await_args.args[1]["$set"]["status"] == "deleting"
+        start.assert_called_once()
@@ -0,0 +1,74 @@
+"""人格统计聚合测试"""
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.core.connection import DEFAULT
+from backend.services.persona_stats import (
+    PersonaStatsService,
+    length_stats_pipeline,
+    parse_time_stats,
+    time_stats_pipeline,
+)
+
+
+class TestPersonaStats:
+    """人格统计测试类"""
+
+    PERSONA_ID = "507f1f77bcf86cd799439011"
+
+    @pytest.mark.unit
+    def test_time_pipeline_is_covered(self):
+        """测试时间类管道只投影索引内的字段"""
+        pipeline = time_stats_pipeline(self.PERSONA_ID)
+
+        assert list(pipeline[0]) == ["$match"]
+        assert pipeline[1]["$project"] == {"_id": 0, "sender": 1, "timestamp": 1}
+        assert set(pipeline[2]["$facet"]) == {"senders", "hours", "weekdays"}
+
+    @pytest.mark.unit
+    def test_length_pipeline_excludes_filtered(self):
+        """测试长度统计排除被过滤的消息"""
+        match = length_stats_pipeline(self.PERSONA_ID)[0]["$match"]
+        assert match["filter_reason"] is None
+
+    @pytest.mark.unit
+    def test_parse_time_stats(self):
+        """测试整理聚合结果"""
+        facets = {
+            "senders": [
+                {"_id": "小明", "count": 3,
+                 "first": datetime(2024, 1, 2), "last": datetime(2024, 3, 1)},
+                {"_id": "我", "count": 2,
+                 "first": datetime(2024, 1, 1), "last": datetime(2024, 2, 1)},
+            ],
+            "hours": [{"_id": 21, "count": 4}, {"_id": 8, "count": 1}],
+            "weekdays": [{"_id": 1, "count": 5}],
+        }
+
+        stats = parse_time_stats(facets)
+
+        assert stats["message_count"] == 5
+        assert stats["senders"] == {"小明": 3, "我": 2}
+        assert stats["date_range_start"] == datetime(2024, 1, 1)
+        assert stats["date_range_end"] == datetime(2024, 3, 1)
+        assert stats["hours"][21] == 4
+        assert stats["weekdays"]["周一"] == 5
+        assert parse_time_stats({})["message_count"] == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_date_range_reads_primary(self):
+        """测试导入后写回人格的时间范围默认读主节点"""
+        collection = MagicMock()
+        collection.find_one = AsyncMock(side_effect=[
+            {"timestamp": datetime(2024, 1, 1)}, {"timestamp": datetime(2024, 3, 1)},
+        ])
+
+        with patch("backend.services.persona_stats.Message.get_motor_collection"), \
+                patch("backend.services.persona_stats.connection_manager.for_workload",
+                      return_value=collection) as for_workload:
+            result = await PersonaStatsService().date_range(self.PERSONA_ID)
+
+        assert for_workload.call_args.args[1] == DEFAULT
+        assert result == {"date_range_start": datetime(2024, 1, 1), "date_range_end": datetime(2024, 3, 1)}
@@ -0,0 +1,152 @@
+"""会话窗口切分测试"""
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+
+from backend.services.session_windows import (
+    build_turn_text,
+    build_window_text,
+    extract_reply_pairs,
+    segment_windows,
+)
+from backend.services.vector_search import (
+    MiniBatchKMeans,
+    VectorCache,
+    cosine_top_k,
+    normalize_rows,
+    probe_top_k,
+    sort_by_topic,
+)
+
+
+def _messages(spec):
+    """spec: [(发送者, 距上一条的分钟数)]"""
+    t = datetime(2024, 1, 1, 9, 0)
+    messages = []
+    for i, (sender, minutes) in enumerate(spec):
+        t += timedelta(minutes=minutes)
+        messages.append({"sender": sender, "content": f"消息{i}", "timestamp": t})
+    return messages
+
+
+class TestSessionWindows:
+    """会话窗口测试类"""
+
+    @pytest.mark.unit
+    def test_split_on_time_gap(self):
+        """测试时间间隔切分会话"""
+        messages = _messages([("A", 0), ("B", 1), ("A", 2), ("B", 90), ("A", 1)])
+
+        assert segment_windows(messages, gap_minutes=30) == [[0, 1, 2], [3, 4]]
+
+    @pytest.mark.unit
+    def test_split_on_turn_boundary(self):
+        """测试窗口满后在发送者切换处结束"""
+        messages = _messages([("A", 1), ("B", 1), ("B", 1), ("B", 1), ("A", 1), ("B", 1)])
+
+        windows = segment_windows(messages, max_messages=2)
+
+        assert windows == [[0, 1, 2, 3], [4, 5]]
+
+    @pytest.mark.unit
+    def test_monologue_hard_cap(self):
+        """测试同一人连续刷屏时强制切分"""
+        messages = _messages([("A", 1)] * 9)
+
+        windows = segment_windows(messages, max_messages=2)
+
+        assert [len(w) for w in windows] == [4, 4, 1]
+
+    @pytest.mark.unit
+    def test_window_text_skips_placeholders(self):
+        """测试窗口文本跳过占位和重复消息"""
+        messages = [
+            {"sender": "A", "content": "在吗"},
+            {"sender": "A", "content": "[图片]"},
+            {"sender": "B", "content": "在的"},
+        ]
+
+        text = build_window_text(messages, [0, 1, 2], [None, "placeholder", "low_info"])
+
+        assert text == "A: 在吗\nB: 在的"
+
+    @pytest.mark.unit
+    def test_reply_pairs(self):
+        """测试对方一轮发言之后人格的下一轮发言成为回复对，超时不算"""
+        messages = _messages([
+            ("B", 0), ("B", 1), ("A", 2), ("A", 1),  # B两条 -> A两条
+            ("A", 5),                                 # A继续说，不产生新回复对
+            ("B", 1), ("A", 60),                      # 间隔过长，不算回复
+            ("B", 1), ("B", 1), ("B", 1), ("A", 1),   # 对方一侧只保留最后两条
+        ])
+
+        pairs = extract_reply_pairs(messages, "A", max_gap_minutes=30, max_messages=2)
+
+        assert pairs == [([0, 1], [2, 3]), ([8, 9], [10])]
+        assert build_turn_text(messages, pairs[0][1]) == "消息2\n消息3"
+
+    @pytest.mark.unit
+    def test_reply_pairs_skip_placeholders(self):
+        """测试占位消息不参与回复对，前后对方的发言合并为一轮"""
+        messages = _messages([("B", 0), ("A", 1), ("B", 1), ("A", 1)])
+
+        pairs = extract_reply_pairs(messages, "A", [None, "placeholder", None, None])
+
+        assert pairs == [([0, 2], [3])]
+
+
+class TestVectorSearch:
+    """向量检索测试类"""
+
+    @pytest.mark.unit
+    def test_cosine_top_k(self):
+        """测试余弦相似度排序"""
+        matrix = normalize_rows(np.array([[1, 0], [0, 1], [1, 1]], dtype=np.float32))
+
+        top, scores = cosine_top_k([1.0, 0.1], matrix, 2)
+
+        assert list(top) == [0, 2]
+        assert scores[0] > scores[1]
+
+    @pytest.mark.unit
+    def test_vector_cache_invalidated_by_count(self):
+        """测试文档数变化时缓存失效"""
+        cache = VectorCache()
+        cache.put("p1", 3, ["a", "b", "c"], np.zeros((3, 2)))
+
+        assert cache.get("p1", 3)[0] == ["a", "b", "c"]
+        assert cache.get("p1", 4) is None
+
+    @pytest.mark.unit
+    def test_kmeans_and_probe_search(self):
+        """测试聚类后两阶段检索与暴力检索结果一致，未分配的行始终参与打分"""
+        rng = np.random.default_rng(0)
+        centers = normalize_rows(rng.normal(size=(6, 32)).astype(np.float32))
+        matrix = normalize_rows(
+            (centers[np.repeat(np.arange(6), 200)] + 0.2 * rng.normal(size=(1200, 32))).astype(np.float32)
+        )
+
+        model = MiniBatchKMeans(6, batch_size=256, iterations=50)
+        topics = model.fit(matrix)
+        assert model.counts.sum() == 1200
+
+        topics[5] = -1  # 新写入尚未分配
+        ids, ordered, ordered_topics = sort_by_topic(list(range(1200)), matrix, topics)
+        assert list(ordered_topics) == sorted(ordered_topics)
+
+        for query_row in (5, 700):
+            top, _ = probe_top_k(matrix[query_row], ordered, ordered_topics, model.centroids, 3, 2)
+            expected, _ = cosine_top_k(matrix[query_row], matrix, 3)
+            assert [ids[i] for i in top] == list(expected)
+
+    @pytest.mark.unit
+    def test_kmeans_partial_fit(self):
+        """测试增量分配更新计数"""
+        model = MiniBatchKMeans(2)
+        model.centroids = np.array([[1, 0], [0, 1]], dtype=np.float32)
+        model.counts = np.array([10, 10])
+
+        labels = model.partial_fit(normalize_rows(np.array([[1, 0.1], [0.1, 1], [1, 0]], dtype=np.float32)))
+
+        assert list(labels) == [0, 1, 0]
+        assert list(model.counts) == [12, 11]
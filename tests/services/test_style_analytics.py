@@ -0,0 +1,134 @@
+"""说话风格分析测试"""
+import pytest
+from datetime import datetime, timedelta
+
+from backend.services.style_analytics import SpaceSaving, StyleAccumulator, persona_fields
+
+
+def _columns(rows, start=datetime(2024, 1, 1, 21, 0)):
+    """rows: (发送者, 内容, 相对秒数)"""
+    return (
+        [content for _, content, _ in rows],
+        [sender for sender, _, _ in rows],
+        [start + timedelta(seconds=offset) for _, _, offset in rows],
+        ["placeholder" if content == "[图片]" else None for _, content, _ in rows],
+    )
+
+
+class TestStyleAccumulator:
+    """风格统计测试类"""
+
+    ROWS = [
+        ("我", "在吗？", 0),
+        ("小明", "在的😊😊 [捂脸]", 60),
+        ("小明", "哈哈哈哈好的吧", 90),
+        ("我", "[图片]", 100),
+        ("小明", "[图片]", 4000),
+        ("小明", "OK 没问题！", 4100),
+        ("我", "今天好累", 4200),
+        ("小明", "好的吧", 4300),
+    ]
+
+    @pytest.mark.unit
+    def test_target_sender_profile(self):
+        """测试只统计目标发送者的文本，占位消息不计入文本统计"""
+        accumulator = StyleAccumulator(target_sender="小明")
+        accumulator.update(*_columns(self.ROWS))
+        profile = accumulator.result()
+
+        assert profile["total_messages"] == 8
+        assert profile["message_count"] == 4
+        assert profile["emojis"] == {"😊": 2, "[捂脸]": 1}
+        assert profile["emoji_rate"] == 0.25
+        assert profile["exclamation_rate"] == 0.25
+        assert profile["question_rate"] == 0
+        assert profile["sentence_endings"] == {"吧": 0.5}
+        assert "哈哈" in profile["frequent_words"]
+        assert sum(profile["activity"]["hours"]) == 5
+        assert profile["activity"]["weekdays"][0] == 5  # 2024-01-01是周一
+
+    @pytest.mark.unit
+    def test_reply_latency_across_batches(self):
+        """测试回复间隔跨批次计算，超过一小时的不算回复"""
+        accumulator = StyleAccumulator(target_sender="小明")
+        columns = _columns(self.ROWS)
+        accumulator.update(*(column[:1] for column in columns))
+        accumulator.update(*(column[1:] for column in columns))
+        latency = accumulator.result()["reply_latency"]
+
+        # 60s（跨批次）和100s；4000s那条间隔3900s被排除
+        assert latency["count"] == 2
+        assert latency["mean_seconds"] == 80
+        assert latency["p50_seconds"] == 60
+
+    @pytest.mark.unit
+    def test_catch_phrases_and_persona_fields(self):
+        """测试口头禅及映射到Persona字段"""
+        rows = [("小明", "好的吧", i * 10) for i in range(3)] + [("小明", "收到", 40)]
+        accumulator = StyleAccumulator(target_sender="小明")
+        accumulator.update(*_columns(rows))
+        fields = persona_fields(accumulator.result())
+
+        assert fields["sentence_patterns"]["catch_phrases"] == ["好的吧"]
+        assert fields["style_features"]["positive"] == 0.75
+        assert set(fields) == {
+            "style_features", "emoji_profile", "frequent_words",
+            "sentence_patterns", "activity_profile",
+        }
+        assert persona_fields({}) == {}
+
+    @pytest.mark.unit
+    def test_summary_roundtrip_and_incremental_update(self):
+        """测试摘要序列化后继续增量更新，与一次性计算的结果一致"""
+        columns = _columns(self.ROWS)
+        whole = StyleAccumulator(target_sender="小明")
+        whole.update(*columns)
+
+        first = StyleAccumulator(target_sender="小明")
+        first.update(*(column[:4] for column in columns))
+        restored = StyleAccumulator.from_summary(first.to_summary())
+        restored.update(*(column[4:] for column in columns))
+
+        assert restored.result() == whole.result()
+
+    @pytest.mark.unit
+    def test_subtract_removed_messages(self):
+        """测试删除消息后扣减摘要"""
+        columns = _columns(self.ROWS)
+        accumulator = StyleAccumulator(target_sender="小明")
+        accumulator.update(*columns)
+
+        removed = StyleAccumulator(target_sender="小明")
+        removed.update(*(column[1:2] for column in columns))
+        accumulator.subtract(removed)
+        profile = accumulator.result()
+
+        assert profile["message_count"] == 3
+        assert profile["emojis"] == {}
+        assert sum(profile["activity"]["hours"]) == 4
+
+
+class TestSpaceSaving:
+    """频繁项摘要测试类"""
+
+    @pytest.mark.unit
+    def test_heavy_hitters_survive_batches(self):
+        """测试容量有限时高频项跨批次保留，计数为上界"""
+        sketch = SpaceSaving(capacity=3)
+        for i in range(20):
+            sketch.update({"哈哈": 5, "好的": 3, f"噪声{i}": 1})
+
+        top = dict(sketch.top(2))
+        assert top["哈哈"] >= 100
+        assert top["好的"] >= 60
+        assert len(sketch.counts) == 3
+
+    @pytest.mark.unit
+    def test_subtract_and_serialize(self):
+        """测试扣减与序列化"""
+        sketch = SpaceSaving(capacity=10)
+        sketch.update({"哈哈": 5, "好的": 2})
+        sketch.subtract({"好的": 2, "未跟踪": 1})
+
+        restored = SpaceSaving.from_list(sketch.to_list(), capacity=10)
+        assert restored.counts == {"哈哈": 5}
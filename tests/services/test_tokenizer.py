@@ -0,0 +1,56 @@
+"""中文分词服务测试"""
+import pytest
+from unittest.mock import patch
+
+from backend.services.message_features import merge_keywords
+from backend.services import tokenizer as tokenizer_module
+from backend.services.tokenizer import MAX_KEYWORDS, Tokenizer
+
+
+class TestTokenizer:
+    """分词服务测试类"""
+
+    @pytest.mark.unit
+    def test_keywords_with_user_words(self, tmp_path):
+        """测试关键词过滤及口头禅作为用户词不被切碎"""
+        pytest.importorskip("jieba")
+        tokenizer = Tokenizer(cache_dir=str(tmp_path))
+        tokenizer.add_words(["绝绝子"])
+
+        keywords = tokenizer.keywords("今天的火锅绝绝子！！我们明天还去吃火锅吧")
+
+        assert "绝绝子" in keywords
+        assert "火锅" in keywords
+        assert keywords.count("火锅") == 1
+        assert not {"的", "吧", "！！"} & set(keywords)
+        assert any(path.name.endswith(".cache") for path in tmp_path.iterdir())
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_small_batch_stays_in_process(self):
+        """测试小批量不启动进程池"""
+        tokenizer = Tokenizer()
+        with patch.object(Tokenizer, "keywords_many", return_value=[["你好"], []]) as keywords_many, \
+                patch("backend.services.tokenizer._pool") as pool:
+            result = await tokenizer.keywords_batch(["你好", "嗯"])
+
+        assert result == [["你好"], []]
+        keywords_many.assert_called_once()
+        pool.assert_not_called()
+        assert await tokenizer.keywords_batch([]) == []
+
+    @pytest.mark.unit
+    def test_pool_uses_spawn(self):
+        """测试进程池以spawn方式启动子进程，不fork父进程状态"""
+        with patch.object(tokenizer_module, "_executor", None), \
+                patch.object(tokenizer_module, "ProcessPoolExecutor") as executor:
+            tokenizer_module._pool()
+
+        assert executor.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+
+    @pytest.mark.unit
+    def test_merge_keywords(self):
+        """测试词典命中在前、分词结果去重追加并截断"""
+        assert merge_keywords(["早安"], ["早安", "火锅"]) == ["早安", "火锅"]
+        tokens = [f"词{i}" for i in range(MAX_KEYWORDS + 5)]
+        assert len(merge_keywords([], tokens)) == MAX_KEYWORDS
@@ -0,0 +1,89 @@
+"""话题聚类测试"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.services.topic_clustering import (
+    ASSIGN_RETRIES,
+    TopicClusteringService,
+    choose_k,
+    label_topics,
+)
+
+PERSONA_ID = "507f1f77bcf86cd799439011"
+
+
+class TestTopicClustering:
+    """话题聚类测试类"""
+
+    @pytest.mark.unit
+    def test_choose_k(self):
+        """测试话题数随文档数增长并受上限约束"""
+        assert choose_k(10) == 2
+        assert choose_k(800) == 20
+        assert choose_k(10 ** 7) == 64
+
+    @pytest.mark.unit
+    def test_label_topics(self):
+        """测试代表词偏向本话题独有的词"""
+        tokenizer = SimpleNamespace(keywords=str.split)
+        samples = [
+            ["火锅 周末 哈哈", "火锅 好吃 哈哈", "周末 火锅"],
+            ["加班 老板 哈哈", "加班 开会", "老板 开会 哈哈"],
+        ]
+
+        labels = label_topics(samples, tokenizer)
+
+        assert labels[0][0] == "火锅"
+        assert set(labels[1][:2]) == {"加班", "开会"}
+        assert "哈哈" not in labels[0][:2]
+
+    def _topics(self, version):
+        return SimpleNamespace(
+            target="messages", centroids=[[1.0, 0.0], [0.0, 1.0]], counts=[10, 10],
+            assigned_since_fit=0, version=version,
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_assign_conditional_on_version(self):
+        """测试中心按读取时的version条件更新，一直冲突时不分配话题"""
+        service = TopicClusteringService.__new__(TopicClusteringService)
+        collection = MagicMock()
+        collection.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=1))
+        docs = [{"embedding": [0.9, 0.1]}, {"embedding": [0.1, 0.9]}, {"embedding": None}]
+
+        with patch("backend.services.topic_clustering.PersonaTopics.find_one",
+                   AsyncMock(return_value=self._topics(7))), \
+                patch("backend.services.topic_clustering.PersonaTopics.get_motor_collection",
+                      return_value=collection):
+            assert await service.assign(PERSONA_ID, docs, "messages") == 2
+            query, update = collection.update_one.await_args.args
+            assert query["version"] == 7
+            assert update["$inc"] == {"assigned_since_fit": 2, "version": 1}
+            assert [doc.get("topic_id") for doc in docs] == [0, 1, None]
+
+            collection.update_one = AsyncMock(return_value=SimpleNamespace(matched_count=0))
+            conflicted = [{"embedding": [0.9, 0.1]}]
+            assert await service.assign(PERSONA_ID, conflicted, "messages") == 0
+            assert collection.update_one.await_count == ASSIGN_RETRIES
+            assert "topic_id" not in conflicted[0]
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_assign_skipped_during_refit(self):
+        """测试后台训练进行中时不按旧模型分配"""
+        service = TopicClusteringService.__new__(TopicClusteringService)
+        refit = asyncio.get_running_loop().create_future()
+        find_one = AsyncMock()
+        docs = [{"embedding": [0.9, 0.1]}]
+
+        with patch.dict(TopicClusteringService._running, {PERSONA_ID: refit}), \
+                patch("backend.services.topic_clustering.PersonaTopics.find_one", find_one):
+            assert await service.assign(PERSONA_ID, docs, "messages") == 0
+
+        refit.cancel()
+        find_one.assert_not_awaited()
+        assert "topic_id" not in docs[0]
+
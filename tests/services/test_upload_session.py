@@ -0,0 +1,140 @@
+"""分块上传服务测试"""
+import hashlib
+import os
+import pytest
+from unittest.mock import patch
+
+from backend.services.upload_session import ChecksumMismatchError, OffsetMismatchError, UploadSessionService
+
+
+async def _stream(data: bytes, piece: int = 5):
+    for i in range(0, len(data), piece):
+        yield data[i:i + piece]
+
+
+class TestUploadSessionService:
+    """分块上传服务测试类"""
+
+    USER_ID = "507f1f77bcf86cd799439011"
+    DATA = "[2024/1/1, 10:30:45] Alice: Hello\n".encode("utf-8") * 3
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        return UploadSessionService(upload_dir=str(tmp_path))
+
+    async def _init(self, service, sha256=None):
+        return await service.init_session(
+            user_id=self.USER_ID,
+            filename="chat.txt",
+            total_size=len(self.DATA),
+            sha256=sha256
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_chunked_upload(self, service):
+        """测试分块上传并完成"""
+        digest = hashlib.sha256(self.DATA).hexdigest()
+        meta = await self._init(service, sha256=digest)
+        upload_id = meta["upload_id"]
+
+        meta = await service.put_chunk(upload_id, self.USER_ID, 0, _stream(self.DATA[:40]))
+        assert meta["offset"] == 40
+        await service.put_chunk(upload_id, self.USER_ID, 40, _stream(self.DATA[40:]))
+
+        result = await service.complete(upload_id, self.USER_ID)
+
+        assert result["sha256"] == digest
+        with open(result["file_path"], "rb") as f:
+            assert f.read() == self.DATA
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_resume_after_restart(self, service):
+        """测试哈希状态丢失后从已写入数据续传"""
+        upload_id = (await self._init(service))["upload_id"]
+        await service.put_chunk(upload_id, self.USER_ID, 0, _stream(self.DATA[:50]))
+
+        # 模拟进程重启
+        UploadSessionService._hashers.clear()
+        resumed = UploadSessionService(upload_dir=service.upload_dir)
+        session = await resumed.get_session(upload_id, self.USER_ID)
+        await resumed.put_chunk(
+            upload_id, self.USER_ID, session["offset"], _stream(self.DATA[session["offset"]:])
+        )
+        result = await resumed.complete(upload_id, self.USER_ID)
+
+        assert result["sha256"] == hashlib.sha256(self.DATA).hexdigest()
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_offset_mismatch(self, service):
+        """测试偏移量不一致时返回应续传的位置"""
+        upload_id = (await self._init(service))["upload_id"]
+        await service.put_chunk(upload_id, self.USER_ID, 0, _stream(self.DATA[:20]))
+
+        with pytest.raises(OffsetMismatchError) as exc_info:
+            await service.put_chunk(upload_id, self.USER_ID, 10, _stream(self.DATA[10:20]))
+        assert exc_info.value.expected == 20
+
+        with pytest.raises(OffsetMismatchError):
+            await service.complete(upload_id, self.USER_ID)
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_hash_mismatch(self, service):
+        """测试SHA-256校验失败后会话重置到偏移量0，可从头重传"""
+        digest = hashlib.sha256(self.DATA).hexdigest()
+        upload_id = (await self._init(service, sha256=digest))["upload_id"]
+        await service.put_chunk(upload_id, self.USER_ID, 0, _stream(self.DATA[:-1] + b"?"))
+
+        with pytest.raises(ChecksumMismatchError):
+            await service.complete(upload_id, self.USER_ID)
+        assert not os.path.exists(os.path.join(service.upload_dir, f"{upload_id}.txt"))
+        assert upload_id not in UploadSessionService._hashers
+        assert upload_id not in UploadSessionService._locks
+        assert (await service.get_session(upload_id, self.USER_ID))["offset"] == 0
+
+        await service.put_chunk(upload_id, self.USER_ID, 0, _stream(self.DATA))
+        assert (await service.complete(upload_id, self.USER_ID))["sha256"] == digest
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_abort(self, service):
+        """测试放弃上传时删除分片、元数据和进程内状态"""
+        upload_id = (await self._init(service))["upload_id"]
+        await service.put_chunk(upload_id, self.USER_ID, 0, _stream(self.DATA[:20]))
+
+        await service.abort(upload_id, self.USER_ID)
+
+        assert os.listdir(service.upload_dir) == []
+        assert upload_id not in UploadSessionService._hashers
+        assert upload_id not in UploadSessionService._locks
+        with pytest.raises(KeyError):
+            await service.get_session(upload_id, self.USER_ID)
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_expired_sessions_removed(self, service):
+        """测试超时未完成的会话在创建新会话时被清理"""
+        stale = (await self._init(service))["upload_id"]
+        await service.put_chunk(stale, self.USER_ID, 0, _stream(self.DATA[:20]))
+
+        with patch("backend.services.upload_session.settings.UPLOAD_SESSION_TTL", -1):
+            fresh = (await self._init(service))["upload_id"]
+
+        assert sorted(os.listdir(service.upload_dir)) == [f"{fresh}.json", f"{fresh}.part"]
+        assert stale not in UploadSessionService._hashers
+        with pytest.raises(KeyError):
+            await service.get_session(stale, self.USER_ID)
+
+    @pytest.mark.asyncio
+    @pytest.mark.unit
+    async def test_session_ownership(self, service):
+        """测试其他用户无法访问会话"""
+        upload_id = (await self._init(service))["upload_id"]
+
+        with pytest.raises(PermissionError):
+            await service.get_session(upload_id, "507f1f77bcf86cd799439012")
+        with pytest.raises(KeyError):
+            await service.get_session("../etc", self.USER_ID)
@@ -10,6 +10,7 @@ import pytest
 from pathlib import Path
 
 from backend.services.data_processor import DataProcessorService
+from backend.services.message_service import fingerprint_messages
 from backend.models.persona import Persona, PersonaStatus
 from backend.models.message import Message
 
@@ -110,6 +111,25 @@ class TestDataProcessor:
         
         os.unlink(temp_file)
     
+    @pytest.mark.asyncio
+    async def test_parse_json_chat_original_id(self, processor):
+        """测试JSON解析保留原平台消息ID"""
+        test_data = [
+            {'id': 101, 'timestamp': '2024-01-01 10:00:00', 'sender': 'Alice', 'content': 'Hello'},
+            {'timestamp': '2024-01-01 10:01:00', 'sender': 'Bob', 'content': 'Hi'}
+        ]
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            json.dump(test_data, f)
+            temp_file = f.name
+        
+        messages = processor._clean_messages(await processor._parse_json_chat(temp_file))
+        
+        assert messages[0]['original_id'] == '101'
+        assert messages[1]['original_id'] is None
+        
+        os.unlink(temp_file)
+    
     @pytest.mark.asyncio
     async def test_parse_txt_chat_whatsapp(self, processor):
         """测试WhatsApp格式TXT解析"""
@@ -129,6 +149,27 @@ class TestDataProcessor:
         assert messages[1]['sender'] == 'Bob'
         
         os.unlink(temp_file)
+    
+    @pytest.mark.asyncio
+    async def test_reimport_without_timestamps_dedupes(self, processor):
+        """测试没有或无法解析时间戳的消息，重复导入时指纹不变"""
+        content = """Alice: 在吗
+Bob: 在
+Bob: 在"""
+        
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write(content)
+            temp_file = f.name
+        
+        first = processor._clean_messages(await processor._parse_txt_chat(temp_file))
+        second = processor._clean_messages(await processor._parse_txt_chat(temp_file))
+        
+        assert fingerprint_messages(first) == fingerprint_messages(second)
+        assert len(set(fingerprint_messages(first))) == len(first)
+        # 无法解析的时间原样保留，不用当前时间兜底
+        assert processor._parse_timestamp("昨天 下午") == "昨天 下午"
+        
+        os.unlink(temp_file)
 
 
 # 创建测试数据文件